@@ -0,0 +1,192 @@
+import os
+import numpy as np
+import pandas as pd
+
+from sgd_trace import trace_run
+
+# 사용자 정의 경로 설정
+RESULTS_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/RESULTS"
+
+# 결측값
+MISSING_VALUE = -9990
+
+# 관측값으로 사용할 product 이름 (나머지 product 는 관측값과 비교)
+OBS_PRODUCT = "OBS"
+
+# 월(1~12) -> 계절 코드
+SEASON_NAMES = ["DJF", "MAM", "JJA", "SON"]
+MONTH_TO_SEASON = np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])
+
+# 시간 블록 크기 (한 달 시간자료 길이). 누적 메모리를 블록 크기로 제한함
+TIME_BLOCK = 744
+
+# 누적 모멘트 (모두 더할 수 있어 어떤 단위로든 다시 합칠 수 있음)
+MOMENTS = ("n", "sum_e", "sum_e2", "sum_abs_e", "sum_x", "sum_y", "sum_xx", "sum_yy", "sum_xy")
+
+
+def build_cube(df, obs_product=OBS_PRODUCT, time_col="time", station_col="station",
+               product_col="product", value_col="value"):
+    """
+    긴 형식(time, station, product, value) 테이블을 (time × station × product) 배열로 변환.
+
+    같은 (time, station, product) 가 여러 행이면 결측이 아닌 값의 평균을 쓰고 중복 행 수를 돌려준다.
+    입력 DataFrame 은 수정하지 않는다.
+
+    Args:
+        df (pd.DataFrame): 관측소 매칭 자료. product 열에 관측값(obs_product)과 자료별 값이 함께 있음.
+        obs_product (str): 관측값 product 이름.
+
+    Returns:
+        dict: times, stations, products (비교 대상), obs (T, S), pred (T, S, P) 배열, duplicates (중복 행 수).
+    """
+    t_idx, times = pd.factorize(pd.to_datetime(df[time_col]), sort=True)
+    s_idx, stations = pd.factorize(df[station_col], sort=True)
+    p_idx, products = pd.factorize(df[product_col], sort=True)
+    if obs_product not in products:
+        raise ValueError(f"관측값 product '{obs_product}' 가 없습니다.")
+
+    shape = (len(times), len(stations), len(products))
+    flat = np.ravel_multi_index((t_idx, s_idx, p_idx), shape)
+    values = df[value_col].to_numpy(dtype=np.float64, copy=True)   # 호출자의 열에 쓰지 않도록 복사
+    valid = (values != MISSING_VALUE) & ~np.isnan(values)
+    size = int(np.prod(shape))
+    sums = np.bincount(flat, weights=np.where(valid, values, 0.0), minlength=size)
+    counts = np.bincount(flat, weights=valid, minlength=size)
+    duplicates = len(flat) - len(np.unique(flat))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cube = np.where(counts > 0, sums / counts, np.nan).astype(np.float32).reshape(shape)
+
+    obs_pos = products.get_loc(obs_product)
+    pred_pos = [i for i in range(len(products)) if i != obs_pos]
+    return {
+        'times': pd.DatetimeIndex(times),
+        'stations': pd.Index(stations),
+        'products': pd.Index(products[pred_pos]),
+        'obs': cube[:, :, obs_pos],
+        'pred': cube[:, :, pred_pos],
+        'duplicates': duplicates,
+    }
+
+
+def time_groups(times, by):
+    """시간축 그룹 코드와 라벨 ('month', 'season', 'year_month', 'year', 'all')"""
+    times = pd.DatetimeIndex(times)
+    if by == "month":
+        return times.month.to_numpy() - 1, np.arange(1, 13)
+    if by == "season":
+        return MONTH_TO_SEASON[times.month.to_numpy() - 1], np.array(SEASON_NAMES)
+    if by == "year_month":
+        codes, labels = pd.factorize(times.to_period("M"), sort=True)
+        return codes, labels.astype(str).to_numpy()
+    if by == "year":
+        codes, labels = pd.factorize(times.year, sort=True)
+        return codes, np.asarray(labels)
+    if by == "all":
+        return np.zeros(len(times), dtype=np.int64), np.array(["all"])
+    raise ValueError(f"지원하지 않는 그룹: {by}")
+
+
+def group_moments(obs, pred, codes, n_groups, block=TIME_BLOCK):
+    """
+    그룹(G) × 관측소(S) × product(P) 단위 누적 모멘트를 계산하는 함수.
+
+    시간축을 block 단위로 잘라 one-hot(G × block) 행렬곱으로 그룹 합을 구하므로
+    파이썬 반복은 시간 블록 수만큼만 돈다.
+
+    Returns:
+        np.ndarray: (len(MOMENTS), G, S, P) float64 배열.
+    """
+    n_time, n_station, n_product = pred.shape
+    acc = np.zeros((len(MOMENTS), n_groups, n_station * n_product), dtype=np.float64)
+    group_ids = np.arange(n_groups)[:, None]
+
+    for start in range(0, n_time, block):
+        sl = slice(start, start + block)
+        x = np.broadcast_to(obs[sl].astype(np.float64)[:, :, None], pred[sl].shape)
+        y = pred[sl].astype(np.float64)
+        valid = np.isfinite(x) & np.isfinite(y)
+        x = np.where(valid, x, 0.0)
+        y = np.where(valid, y, 0.0)
+        e = y - x
+
+        onehot = (codes[sl][None, :] == group_ids).astype(np.float64)
+        b = x.shape[0]
+        for k, arr in enumerate((valid, e, e * e, np.abs(e), x, y, x * x, y * y, x * y)):
+            acc[k] += onehot @ arr.reshape(b, -1)
+
+    return acc.reshape(len(MOMENTS), n_groups, n_station, n_product)
+
+
+def metrics_from_moments(m):
+    """누적 모멘트에서 n, RMSE, MBE, MAE, 상관계수 계산 (모양은 m[0] 과 같음)"""
+    n = m[0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rmse = np.sqrt(m[2] / n)
+        mbe = m[1] / n
+        mae = m[3] / n
+        cov = n * m[8] - m[4] * m[5]
+        var_x = n * m[6] - m[4] ** 2
+        var_y = n * m[7] - m[5] ** 2
+        corr = cov / np.sqrt(var_x * var_y)
+    return {'n': n.astype(np.int64), 'rmse': rmse, 'mbe': mbe, 'mae': mae, 'corr': corr}
+
+
+def validate(cube, by="month", per_station=False, block=TIME_BLOCK):
+    """
+    자료별(product) 검증 지표를 그룹 단위로 계산하는 함수.
+
+    Args:
+        cube (dict): build_cube 결과.
+        by (str): 시간 그룹 ('month', 'season', 'year_month', 'year', 'all').
+        per_station (bool): 관측소별로 나눌지 여부 (False 면 전체 관측소 합산).
+
+    Returns:
+        pd.DataFrame: group, [station], product, n, rmse, mbe, mae, corr.
+    """
+    codes, labels = time_groups(cube['times'], by)
+    m = group_moments(cube['obs'], cube['pred'], codes, len(labels), block)
+
+    if per_station:
+        index = pd.MultiIndex.from_product([labels, cube['stations'], cube['products']],
+                                           names=["group", "station", "product"])
+    else:
+        m = m.sum(axis=2)
+        index = pd.MultiIndex.from_product([labels, cube['products']], names=["group", "product"])
+
+    metrics = metrics_from_moments(m)
+    df = pd.DataFrame({k: v.ravel() for k, v in metrics.items()}, index=index).reset_index()
+    df.insert(0, "by", by)
+    return df
+
+
+def load_matched(var, results_directory=RESULTS_DIRECTORY):
+    """관측소 매칭 자료 (matched_{var}.parquet) 로드"""
+    path = os.path.join(results_directory, f"matched_{var}.parquet")
+    return pd.read_parquet(path, columns=["time", "station", "product", "value"])
+
+
+@trace_run("RMSE_vaildation_6")
+def main():
+    print("\n=== SGD / MK-PRISM 관측소 검증 (RMSE, MBE, MAE, 상관계수) ===")
+    var = input("검증할 변수를 입력하세요 (ta, rn_day) [기본값: ta]: ").strip() or "ta"
+
+    cube = build_cube(load_matched(var))
+    print(f"시간 {len(cube['times']):,}개 × 관측소 {len(cube['stations']):,}개 × 자료 {list(cube['products'])}")
+    if cube['duplicates']:
+        print(f"⚠ 같은 (시각, 관측소, 자료) 중복 {cube['duplicates']:,}행은 평균으로 합침")
+
+    os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+    for by in ("month", "season", "all"):
+        df = validate(cube, by=by)
+        out_path = os.path.join(RESULTS_DIRECTORY, f"validation_{var}_{by}.csv")
+        df.to_csv(out_path, index=False)
+        print(f"{by} 단위 검증 결과 저장: {out_path}")
+
+    df_station = validate(cube, by="all", per_station=True)
+    out_path = os.path.join(RESULTS_DIRECTORY, f"validation_{var}_station.csv")
+    df_station.to_csv(out_path, index=False)
+    print(f"관측소별 검증 결과 저장: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,35 @@
 import os
-import pandas as pd
-# du -h /home/papalio/test_research/python_edu/test_2024/test_2024/DATA/* > /home/papalio/test_research/python_edu/test_2024/test_2024/DATA/file_sizes.txt
-# 파일 경로를 설정하세요
-file_path = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA/file_sizes.txt"  # 파일 경로를 입력
-
-# 크기 변환 함수 (KB, MB를 바이트로 변환)
-def convert_size_to_bytes(size_str):
-    try:
-        if size_str.endswith('K'):
-            return float(size_str[:-1]) * 1024
-        elif size_str.endswith('M'):
-            return float(size_str[:-1]) * 1024 * 1024
-        elif size_str.isdigit():
-            return float(size_str)
-    except ValueError:
-        return 0  # 크기가 잘못된 경우 0으로 처리
-
-# 파일 읽기 및 데이터 처리
-data = []
-with open(file_path, 'r') as file:
-    for line in file:
-        if '\t' in line:  # 탭으로 구분된 파일
-            size, path = line.strip().split('\t', 1)
-            size_in_bytes = convert_size_to_bytes(size)
-            data.append((size_in_bytes, path))
-
-# DataFrame 생성
-df = pd.DataFrame(data, columns=['Size(Bytes)', 'Path'])
 
-# 비정상 파일 기준 (예: 350KB 미만)
-abnormal_threshold = 350 * 1024  # 350KB
+from sgd_quarantine import ROOT_DIRECTORY, ABNORMAL_THRESHOLD, scan_small_files, quarantine
+
+# 검사할 경로 (du -h 출력 파일 대신 트리를 직접 한 번 순회해 정확한 파일 크기를 읽음)
+data_directory = os.path.join(ROOT_DIRECTORY, "org", "sgd")
 
-# 총 파일 수
-total_files = len(df)
+# 비정상 파일 기준 (예: 350KB 미만)
+threshold_kb = input(f"비정상 파일 기준(KB)을 입력하세요 [기본값: {ABNORMAL_THRESHOLD // 1024}]: ").strip()
+abnormal_threshold = int(threshold_kb) * 1024 if threshold_kb else ABNORMAL_THRESHOLD
 
-# 비정상 파일 수 (크기가 기준 미만인 파일)
-abnormal_files = df[df['Size(Bytes)'] < abnormal_threshold]
+# 비정상 파일 목록 (크기가 기준 미만인 파일)
+abnormal_files, total_files = scan_small_files(data_directory, abnormal_threshold)
 
 # 정상 파일 수
 normal_files = total_files - len(abnormal_files)
 
-# 비정상 파일 삭제
-for _, row in abnormal_files.iterrows():
-    file_path = row['Path']
-    try:
-        os.remove(file_path)
-        print(f"삭제 완료: {file_path}")
-    except Exception as e:
-        print(f"삭제 실패: {file_path} - {e}")
-
 # 결과 출력
 print(f"총 파일 수: {total_files}")
 print(f"비정상 파일 수: {len(abnormal_files)}")
 print(f"정상 파일 수: {normal_files}")
+if abnormal_files.empty:
+    raise SystemExit
+
+print(abnormal_files.head(20).to_string(index=False))
+print(f"비정상 파일 총 크기: {abnormal_files['size'].sum() / 1024 / 1024:.1f} MB")
+
+# 비정상 파일 격리 (삭제하지 않고 DATA/quarantine/sgd/<배치 ID> 로 옮김, 재다운로드 대기열에 추가)
+answer = input("비정상 파일을 격리 폴더로 옮길까요? (y/N): ").strip().lower()
+if answer == "y":
+    batch_id, journal = quarantine(ROOT_DIRECTORY, abnormal_files, reason="small", dry_run=False)
+    print(journal['status'].value_counts().to_string())
+    print(f"📁 격리 완료: 배치 {batch_id} (되돌리기: python sgd_quarantine.py)")
+else:
+    print("dry-run: 파일을 옮기지 않았습니다.")
@@ -2,10 +2,15 @@ import os
 import glob
 import pandas as pd
 import numpy as np
-import xarray as xr
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 
+from sgd_manifest import refresh_manifest, query_files
+from sgd_gaps import parse_timestamps, find_gaps, expand_gaps
+from sgd_kernels import masked_stats
+from sgd_mmap import open_sgd_data
+from sgd_trace import trace_run, traced
+
 # 📌 Data paths
 ROOT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
 OUTPUT_CSV = "/home/papalio/test_research/RMSE_TEST/missing_files_2020_2021.csv"
@@ -33,36 +38,49 @@ def format_size(size_bytes):
     return f"{size_bytes:.1f}TB"
 
 
-def find_missing_files():
-    """Scan for missing files between 2020-2021 and save to CSV."""
-    missing_files = {var: 0 for var in variables}
-    total_files = {var: 0 for var in variables}
-    valid_files = {var: 0 for var in variables}
-    missing_files_list = []
+@traced("scan")
+def load_file_index():
+    """Refresh the archive manifest and return {var: {YYYYMMDDHHMM: size}} for the time range."""
+    refresh_manifest(ROOT_DIRECTORY)
+    index = {}
+    for var in variables:
+        files = query_files(ROOT_DIRECTORY, var=var, start=start_date,
+                            end=end_date.replace(hour=23, minute=59))
+        index[var] = dict(zip(files["tm"], files["size"]))
+    return index
 
-    current_date = start_date
-    while current_date <= end_date:
-        for var in variables:
-            file_path = file_structure.format(
-                year=current_date.year,
-                month=current_date.month,
-                day=current_date.day,
-                var=var,
-                date=current_date.strftime("%Y%m%d")
-            )
-            total_files[var] += 1
-            if not os.path.exists(file_path):
-                missing_files[var] += 1
-                missing_files_list.append([var, current_date.strftime("%Y-%m-%d"), file_path])
-            else:
-                valid_files[var] += 1
 
-        current_date += timedelta(days=1)
+@traced("compute")
+def find_missing_files(file_index):
+    """Find missing daily (00:00) files between 2020-2021 as gap runs and save to CSV."""
+    missing_files = {}
+    total_files = {}
+    valid_files = {}
+    missing_frames, run_frames = [], []
 
-    df_missing = pd.DataFrame(missing_files_list, columns=["Variable", "Date", "Expected Path"])
+    for var in variables:
+        gaps = find_gaps(parse_timestamps(list(file_index[var])), "day", start_date, end_date)
+        run_frames.append(gaps.assign(Variable=var))
+
+        missing = expand_gaps(gaps, "day")
+        total_files[var] = (end_date - start_date).days + 1
+        missing_files[var] = len(missing)
+        valid_files[var] = total_files[var] - missing_files[var]
+        missing_frames.append(pd.DataFrame({
+            "Variable": var,
+            "Date": missing.strftime("%Y-%m-%d"),
+            "Expected Path": [file_structure.format(year=d.year, month=d.month, day=d.day, var=var,
+                                                    date=d.strftime("%Y%m%d")) for d in missing],
+        }))
+
+    df_missing = pd.concat(missing_frames, ignore_index=True)
     df_missing.to_csv(OUTPUT_CSV, index=False, encoding="utf-8-sig")
+    runs_csv = OUTPUT_CSV.replace(".csv", "_runs.csv")
+    pd.concat(run_frames, ignore_index=True)[["Variable", "start", "end", "length"]].to_csv(
+        runs_csv, index=False, encoding="utf-8-sig")
 
     print(f"\n📄 Missing file list saved: {OUTPUT_CSV}")
+    print(f"📄 Missing runs saved: {runs_csv}")
 
     # 📌 Print missing/valid/total file count per variable
     for var in variables:
@@ -72,26 +90,18 @@ def find_missing_files():
         print(f" - 📊 Total files: {total_files[var]:,}")
 
 
-def analyze_file_sizes():
+@traced("compute")
+def analyze_file_sizes(file_index):
     """Analyze file size distribution."""
     size_data = []
 
     for var in variables:
-        file_sizes = []
-        current_date = start_date
-        while current_date <= end_date:
-            file_path = file_structure.format(
-                year=current_date.year,
-                month=current_date.month,
-                day=current_date.day,
-                var=var,
-                date=current_date.strftime("%Y%m%d")
-            )
-            if os.path.exists(file_path):
-                file_sizes.append(os.path.getsize(file_path))
-            current_date += timedelta(days=1)
+        # Daily (00:00) files only, selected in one pass over the index
+        tms = np.array(list(file_index[var]), dtype="U12")
+        sizes = np.fromiter(file_index[var].values(), dtype=np.int64, count=len(tms))
+        file_sizes = sizes[np.char.endswith(tms, "0000")]
 
-        if not file_sizes:
+        if file_sizes.size == 0:
             print(f"❌ No {var} data found. Skipping file size analysis.")
             continue
 
@@ -128,7 +138,8 @@ def analyze_file_sizes():
     print(f"📄 File size statistics saved: {OUTPUT_SIZE_STATS}")
 
 
-def analyze_value_distribution():
+@traced("decode")
+def analyze_value_distribution(file_index):
     """Analyze -9990, 0, and valid value distributions."""
     os.makedirs(OUTPUT_IMG_DIR, exist_ok=True)
     value_data = []
@@ -147,15 +158,15 @@ def analyze_value_distribution():
                 date=current_date.strftime("%Y%m%d")
             )
 
-            if os.path.exists(file_path):
+            if current_date.strftime("%Y%m%d0000") in file_index[var]:
                 try:
-                    ds = xr.open_dataset(file_path, decode_times=False)
-                    data_values = ds["data"].values.flatten()
+                    grid = open_sgd_data(file_path)
 
-                    # Count occurrences
-                    count_dict["Missing (-9990)"] += np.sum(data_values == -9990)
-                    count_dict["Zero (0)"] += np.sum(data_values == 0)
-                    count_dict["Valid Data"] += np.sum((data_values != -9990) & (data_values != 0))
+                    # Count occurrences (single pass over the raw int16 grid)
+                    stats = masked_stats(grid["data"], missing=-9990)
+                    count_dict["Missing (-9990)"] += stats["missing"]
+                    count_dict["Zero (0)"] += stats["zero"]
+                    count_dict["Valid Data"] += stats["count"] - stats["zero"]
 
                     total_files += 1
                 except Exception as e:
@@ -180,7 +191,9 @@ def analyze_value_distribution():
 
 
 if __name__ == "__main__":
-    find_missing_files()
-    analyze_file_sizes()
-    analyze_value_distribution()
+    with trace_run("check_data_file_test"):
+        file_index = load_file_index()
+        find_missing_files(file_index)
+        analyze_file_sizes(file_index)
+        analyze_value_distribution(file_index)
     print("\n✅ Analysis Completed!")
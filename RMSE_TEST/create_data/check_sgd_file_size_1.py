@@ -1,7 +1,9 @@
 import os
-import glob
 import pandas as pd
 
+from sgd_manifest import refresh_manifest, query_files
+from sgd_trace import trace_run
+
 def format_size(size_bytes):
     """바이트 크기를 사람이 읽기 쉬운 형식으로 변환"""
     for unit in ['', 'K', 'M', 'G']:
@@ -12,30 +14,23 @@ def format_size(size_bytes):
 
 def check_file_sizes(base_dir, var, min_size):
     """SGD 파일 크기를 확인하고 비정상적인 파일을 기록"""
-    # 데이터 탐색 경로
-    search_pattern = os.path.join(base_dir, "**", f"sfc_grid_{var}*00.nc")
-    file_list = glob.glob(search_pattern, recursive=True)
+    # 인덱스 갱신 후 조회 (변경된 일 디렉토리만 다시 읽음)
+    refresh_manifest(base_dir)
+    files = query_files(base_dir, var=var)
 
-    if not file_list:
+    if files.empty:
         print(f"'{base_dir}' 경로에서 '{var}' 변수를 포함하는 파일이 없습니다.")
         return
 
-    print(f"탐색된 파일 수: {len(file_list):,}")
-
-    # 파일 크기 검사
-    data = []
-    for filepath in file_list:
-        filename = os.path.basename(filepath)
-        file_size = os.path.getsize(filepath)
-        data.append({
-            'filename': filename,
-            'size_bytes': file_size,
-            'size_human': format_size(file_size),
-            'path': filepath
-        })
+    print(f"탐색된 파일 수: {len(files):,}")
 
     # DataFrame 생성
-    df = pd.DataFrame(data)
+    df = pd.DataFrame({
+        'filename': files['path'].map(os.path.basename),
+        'size_bytes': files['size'],
+        'size_human': files['size'].map(format_size),
+        'path': files['path']
+    })
 
     # 기준 이하 파일 필터링
     abnormal_files = df[df['size_bytes'] < min_size]
@@ -61,6 +56,7 @@ def check_file_sizes(base_dir, var, min_size):
     print(f"- 전체 파일 목록: {all_files_path}")
     print(f"- 비정상 파일 목록: {abnormal_files_path}")
 
+@trace_run("check_sgd_file_size_1")
 def main():
     base_dir = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
 
@@ -0,0 +1,86 @@
+import os
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from sgd_netcdf import classic_sgd_bytes
+
+# 로컬 테스트용 apihub 대체 서버
+# sgd_downloader.download_all(...) 의 URL을 http://127.0.0.1:{port}/api/typ01/url/sfc_grid_nc_down.php 로 바꿔 사용
+DOWNLOAD_PATH = "/api/typ01/url/sfc_grid_nc_down.php"
+
+
+def make_handler(payload, latency=0.0, fail_rate=0.0, path=DOWNLOAD_PATH, required=("obs", "tm")):
+    """고정 payload를 돌려주는 요청 핸들러 클래스 생성 (path 와 필수 파라미터가 맞지 않으면 404)"""
+
+    class MockApihubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive 연결 재사용 확인용
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            query = parse_qs(parts.query)
+            if parts.path != path or any(name not in query for name in required):
+                self._reply(404, b"not found")
+                return
+            if latency > 0:
+                time.sleep(latency)
+            if fail_rate > 0 and random.random() < fail_rate:
+                self._reply(503, b"temporarily unavailable")
+                return
+            self._reply(200, payload, "application/x-netcdf")
+
+        def _reply(self, status, body, content_type="text/plain"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockApihubHandler
+
+
+def start_mock_server(payload_path=None, payload_size=400 * 1024, port=0, latency=0.0, fail_rate=0.0,
+                      path=DOWNLOAD_PATH, required=("obs", "tm")):
+    """
+    백그라운드 스레드에서 mock apihub 서버를 실행하는 함수.
+
+    Args:
+        payload_path (str): 응답으로 보낼 파일 경로 (없으면 payload_size 이상인 classic 표준격자).
+        payload_size (int): 더미 응답 최소 크기(bytes).
+        port (int): 사용할 포트 (0이면 임의 포트).
+        latency (float): 요청당 인위적 지연(초).
+        fail_rate (float): 503 응답을 돌려줄 확률.
+        path (str): 응답할 URL 경로 (관측 자료 테스트는 obs_ingest 의 ASOS/AWS 경로와 샘플 텍스트 사용).
+        required (tuple): 필수 쿼리 파라미터 (관측 자료는 ("tm1", "tm2")).
+
+    Returns:
+        tuple: (server, base_url). 종료 시 server.shutdown() 호출.
+    """
+    if payload_path:
+        with open(payload_path, 'rb') as f:
+            payload = f.read()
+    else:
+        side = int((payload_size / 2) ** 0.5) + 1
+        payload = classic_sgd_bytes(side, side, data=os.urandom(side * side * 2))
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(payload, latency, fail_rate, path, required))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    base_url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    return server, base_url
+
+
+if __name__ == "__main__":
+    server, base_url = start_mock_server(port=8765)
+    print(f"mock apihub 서버 실행 중: {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
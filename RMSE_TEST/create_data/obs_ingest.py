@@ -0,0 +1,350 @@
+import os
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from sgd_downloader import run_downloads
+from sgd_executor import bounded_map
+
+# 관측 자료 기본 경로
+OBS_DIRECTORY = "/home/papalio/test_research/RMSE_TEST_2/DATA/OBS"
+RAW_DIRECTORY = os.path.join(OBS_DIRECTORY, "raw")       # 내려받은 원본 텍스트 ({network}/YYYY/MM/)
+STORE_DIRECTORY = os.path.join(OBS_DIRECTORY, "store")   # Parquet 저장소 ({network}/year=YYYY/month=M/data.parquet)
+
+# 관측소 정보 (plot_test.py 등에서 쓰는 CSV 와 저장소용 Parquet)
+STATION_CSV = os.path.join(OBS_DIRECTORY, "station_meta.csv")
+STATION_PARQUET_NAME = "stations.parquet"
+
+# KMA API 허브 주소 (테스트 시 mock_apihub 주소로 교체)
+ASOS_URL = "https://apihub.kma.go.kr/api/typ01/url/kma_sfctm3.php"        # ASOS 시간자료
+AWS_URL = "https://apihub.kma.go.kr/api/typ01/cgi-bin/url/nph-aws2_min"   # AWS 분자료
+STATION_URL = "https://apihub.kma.go.kr/api/typ01/url/stn_inf.php"        # 지점 정보
+
+# 네트워크별 요청 단위 (ASOS: 하루 24시간, AWS: 1시간 60분) 와 지점 정보 종류
+REQUEST_SPAN = {'asos': datetime.timedelta(days=1), 'aws': datetime.timedelta(hours=1)}
+STATION_INF = {'asos': "SFC", 'aws': "AWS"}
+
+# 원본 텍스트 최소 크기 (이보다 작으면 오류 응답으로 봄)
+MIN_RAW_SIZE = 200
+
+# kma_sfctm3 출력 컬럼 (헤더 주석이 두 줄로 나뉘어 있어 이름을 고정)
+ASOS_TEXT_COLUMNS = [
+    "TM", "STN", "WD", "WS", "GST_WD", "GST_WS", "GST_TM", "PA", "PS", "PT", "PR", "TA", "TD", "HM", "PV",
+    "RN", "RN_DAY", "RN_JUN", "RN_INT", "SD_HR3", "SD_DAY", "SD_TOT", "WC", "WP", "WW", "CA_TOT", "CA_MID",
+    "CH_MIN", "CT", "CT_TOP", "CT_MID", "CT_LOW", "VS", "SS", "SI", "ST_GD", "TS", "TE_005", "TE_01",
+    "TE_02", "TE_03", "ST_SEA", "WH", "BF", "IR", "IX",
+]
+
+# nph-aws2_min 출력 컬럼 (헤더 주석 첫 줄과 같음, 주석을 못 찾을 때 사용)
+AWS_TEXT_COLUMNS = [
+    "YYMMDDHHMI", "STN", "WD1", "WS1", "WDS", "WSS", "WD10", "WS10", "TA", "RE",
+    "RN-15m", "RN-60m", "RN-12H", "RN-DAY", "HM", "PA", "PS", "TD",
+]
+
+TEXT_COLUMNS = {'asos': ASOS_TEXT_COLUMNS, 'aws': AWS_TEXT_COLUMNS}
+
+# 원본 컬럼 → 저장소 컬럼
+FIELD_MAP = {
+    'asos': {'TM': "time", 'STN': "stn_id", 'TA': "ta", 'HM': "hm", 'WS': "ws", 'WD': "wd",
+             'RN': "rn", 'RN_DAY': "rn_day", 'PA': "pa", 'PS': "ps", 'TD': "td"},
+    'aws': {'YYMMDDHHMI': "time", 'STN': "stn_id", 'TA': "ta", 'HM': "hm", 'WS10': "ws", 'WD10': "wd",
+            'RN-60m': "rn", 'RN-DAY': "rn_day", 'PA': "pa", 'PS': "ps", 'TD': "td"},
+    # 기상자료개방포털 CSV 내려받기 (cp949)
+    'csv': {'지점': "stn_id", '일시': "time", '기온(°C)': "ta", '습도(%)': "hm", '풍속(m/s)': "ws",
+            '풍향(16방위)': "wd", '강수량(mm)': "rn", '현지기압(hPa)': "pa", '해면기압(hPa)': "ps",
+            '이슬점온도(°C)': "td"},
+}
+
+# 저장소 값 컬럼 (float32)
+VALUE_COLUMNS = ["ta", "hm", "ws", "wd", "rn", "rn_day", "pa", "ps", "td"]
+
+# 음수가 나올 수 없는 컬럼 (-9 등 음수는 결측). 그 밖의 컬럼은 -99 이하만 결측
+NONNEGATIVE_COLUMNS = {"hm", "ws", "wd", "rn", "rn_day", "pa", "ps"}
+MISSING_BELOW = -99.0
+
+# 지점 정보 컬럼 (stn_inf.php 헤더 주석 이름 → 저장소 컬럼)
+STATION_FIELDS = {'STN_ID': "stn_id", 'LON': "lon", 'LAT': "lat", 'HT': "height", 'STN_KO': "stn_name"}
+STATION_COLUMNS = ["stn_id", "network", "stn_name", "lat", "lon", "height"]
+
+# Parquet 행 그룹 크기 (관측소·시간 순 정렬이라 stn_id/time 조건으로 행 그룹을 건너뛸 수 있음)
+ROW_GROUP_ROWS = 128 * 1024
+
+
+def _header_names(path, first_name, encoding="cp949"):
+    """파일 앞쪽 주석 줄 중 first_name 으로 시작하는 컬럼 이름 줄을 찾음 (없으면 None)"""
+    with open(path, encoding=encoding, errors="replace") as f:
+        for line in f:
+            if not line.startswith("#"):
+                break
+            tokens = line[1:].split()
+            if tokens and tokens[0] == first_name and len(set(tokens)) == len(tokens):
+                return tokens
+    return None
+
+
+def _read_whitespace(path, names, usecols, encoding="cp949"):
+    return pd.read_csv(path, sep=r"\s+", comment="#", header=None, names=names, usecols=usecols,
+                       index_col=False, dtype=str, encoding=encoding, encoding_errors="replace",
+                       on_bad_lines="skip")
+
+
+def normalize(df, fields, time_format="%Y%m%d%H%M"):
+    """
+    원본 컬럼을 저장소 형식으로 바꾸는 함수.
+
+    Returns:
+        pd.DataFrame: stn_id (int32), time (datetime64), VALUE_COLUMNS (float32, 결측 NaN).
+    """
+    df = df.rename(columns=fields)
+    out = pd.DataFrame({
+        'stn_id': pd.to_numeric(df['stn_id'], errors="coerce"),
+        'time': pd.to_datetime(df['time'], format=time_format, errors="coerce"),
+    })
+    for column in VALUE_COLUMNS:
+        if column not in df:
+            out[column] = np.float32(np.nan)
+            continue
+        values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float32)
+        bad = values < 0 if column in NONNEGATIVE_COLUMNS else values <= MISSING_BELOW
+        values[bad] = np.nan
+        out[column] = values
+    out = out.dropna(subset=["stn_id", "time"])
+    out['stn_id'] = out['stn_id'].astype(np.int32)
+    return out.reset_index(drop=True)
+
+
+def parse_kma_text(path, network):
+    """
+    API 허브 텍스트 출력(공백 구분, # 주석)을 읽는 함수.
+
+    컬럼 이름은 헤더 주석에서 찾고, 없으면 TEXT_COLUMNS 의 고정 이름을 쓴다.
+    필요한 컬럼만 읽어 normalize 로 넘긴다.
+    """
+    fields = FIELD_MAP[network]
+    fallback = TEXT_COLUMNS[network]
+    names = _header_names(path, fallback[0]) or fallback
+    usecols = [name for name in names if name in fields]
+    return normalize(_read_whitespace(path, names, usecols), fields)
+
+
+def parse_kma_csv(path):
+    """기상자료개방포털 CSV(지점, 일시, 기온(°C), ...)를 읽는 함수"""
+    fields = FIELD_MAP['csv']
+    df = pd.read_csv(path, encoding="cp949", usecols=lambda c: c in fields, dtype=str)
+    return normalize(df, fields, time_format=None)
+
+
+def parse_observations(path, network):
+    """확장자로 형식을 골라 읽음 (.csv: 개방포털 CSV, 그 밖: API 허브 텍스트)"""
+    if path.lower().endswith(".csv"):
+        return parse_kma_csv(path)
+    return parse_kma_text(path, network)
+
+
+def parse_stations(path, network):
+    """stn_inf.php 지점 정보 텍스트 → STATION_COLUMNS"""
+    names = _header_names(path, "STN_ID")
+    if names is None:
+        raise ValueError(f"지점 정보 헤더(# STN_ID ...)가 없습니다: {path}")
+    df = _read_whitespace(path, names, [name for name in names if name in STATION_FIELDS])
+    df = df.rename(columns=STATION_FIELDS)
+    out = pd.DataFrame({
+        'stn_id': pd.to_numeric(df['stn_id'], errors="coerce"),
+        'network': network,
+        'stn_name': df['stn_name'] if 'stn_name' in df else "",
+        'lat': pd.to_numeric(df['lat'], errors="coerce"),
+        'lon': pd.to_numeric(df['lon'], errors="coerce"),
+        'height': pd.to_numeric(df['height'], errors="coerce") if 'height' in df else np.nan,
+    }).dropna(subset=["stn_id", "lat", "lon"])
+    out['stn_id'] = out['stn_id'].astype(np.int32)
+    # 같은 지점이 이전 위치와 함께 여러 줄 나오면 마지막(최신) 줄 사용
+    return out.drop_duplicates("stn_id", keep="last").reset_index(drop=True)
+
+
+def raw_path(network, tm, raw_dir=RAW_DIRECTORY):
+    """원본 텍스트 경로: {raw_dir}/{network}/YYYY/MM/{network}_{tm}.txt (tm 은 요청 시작 시각)"""
+    return os.path.join(raw_dir, network, tm[:4], tm[4:6], f"{network}_{tm}.txt")
+
+
+def build_obs_url(network, tm1, tm2, key, base_url=None):
+    """요청 구간(tm1 ~ tm2, 양 끝 포함) 전체 지점 자료 URL (base_url 로 mock 서버 주소 지정 가능)"""
+    if network == "asos":
+        return f"{base_url or ASOS_URL}?tm1={tm1}&tm2={tm2}&stn=0&help=0&authKey={key}"
+    return f"{base_url or AWS_URL}?tm1={tm1}&tm2={tm2}&stn=0&disp=0&help=0&authKey={key}"
+
+
+def plan_requests(network, start_date, end_date, key, raw_dir=RAW_DIRECTORY, base_url=None):
+    """
+    기간을 REQUEST_SPAN 단위 요청으로 나눠 (url, save_path) 목록을 만드는 함수 (이미 받은 구간은 제외).
+
+    요청 구간은 (시작, 시작 + span] 이므로 ASOS 는 01시 ~ 다음날 00시, AWS 는 01분 ~ 다음 정시.
+    """
+    step = REQUEST_SPAN[network]
+    first = datetime.timedelta(hours=1) if network == "asos" else datetime.timedelta(minutes=1)
+    tasks = []
+    current = datetime.datetime(start_date.year, start_date.month, start_date.day)
+    stop = datetime.datetime(end_date.year, end_date.month, end_date.day) + datetime.timedelta(days=1)
+    while current < stop:
+        tm1 = (current + first).strftime("%Y%m%d%H%M")
+        tm2 = (current + step).strftime("%Y%m%d%H%M")
+        save_path = raw_path(network, current.strftime("%Y%m%d%H%M"), raw_dir)
+        if not os.path.exists(save_path):
+            tasks.append((build_obs_url(network, tm1, tm2, key, base_url), save_path))
+        current += step
+    return tasks
+
+
+def download_raw(network, start_date, end_date, key, raw_dir=RAW_DIRECTORY, concurrency=8, base_url=None):
+    """
+    원본 텍스트를 비동기로 내려받음 (sgd_downloader 의 연결 풀, 속도 제한, 재시도를 그대로 사용).
+
+    Returns:
+        (list, list): (받은 파일 경로 목록, 실패 목록 [(url, save_path, error)]).
+    """
+    tasks = plan_requests(network, start_date, end_date, key, raw_dir, base_url)
+    failed, _ = run_downloads(tasks, MIN_RAW_SIZE, concurrency=concurrency, validate=False)
+    failed_paths = {save_path for _, save_path, _ in failed}
+    return [save_path for _, save_path in tasks if save_path not in failed_paths], failed
+
+
+def partition_path(store_dir, network, year, month):
+    """월 파티션 파일 경로 (hive 형식이라 pyarrow.dataset 이 year/month 조건으로 파일을 건너뜀)"""
+    return os.path.join(store_dir, network, f"year={year}", f"month={month}", "data.parquet")
+
+
+def write_partitions(df, network, store_dir=STORE_DIRECTORY):
+    """
+    관측 자료를 연/월 파티션에 병합 저장하는 함수.
+
+    기존 파티션과 합친 뒤 (stn_id, time) 중복은 새 값으로 바꾸고 관측소·시간 순으로 정렬해 다시 쓴다.
+
+    Returns:
+        int: 저장 후 해당 파티션들의 전체 행 수.
+    """
+    if df.empty:
+        return 0
+    total = 0
+    times = df['time'].dt
+    for (year, month), part in df.groupby([times.year, times.month], sort=True):
+        path = partition_path(store_dir, network, int(year), int(month))
+        if os.path.exists(path):
+            part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+        part = (part.drop_duplicates(["stn_id", "time"], keep="last")
+                .sort_values(["stn_id", "time"], ignore_index=True))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".part"
+        part.to_parquet(tmp_path, index=False, compression="zstd", row_group_size=ROW_GROUP_ROWS)
+        os.replace(tmp_path, path)
+        total += len(part)
+    return total
+
+
+def _parse_task(task):
+    """워커에서 원본 파일 하나를 읽음. (경로, DataFrame 또는 None, 오류) 반환"""
+    path, network = task
+    try:
+        return path, parse_observations(path, network), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def ingest_files(paths, network, store_dir=STORE_DIRECTORY, flush_rows=2_000_000, max_workers=None):
+    """
+    원본 파일(텍스트 또는 CSV) 목록을 프로세스 풀에서 읽어 Parquet 저장소에 넣는 함수.
+
+    읽은 결과는 flush_rows 행이 모일 때마다 월 파티션에 병합 저장하므로
+    파일 수와 관계없이 메모리 사용량이 제한된다. 로컬 샘플 파일도 같은 경로로 넣을 수 있다.
+
+    Returns:
+        dict: {'rows': 읽은 행 수, 'failed': {경로: 오류}}.
+    """
+    buffer, buffered, rows, failed = [], 0, 0, {}
+    tasks = [(path, network) for path in sorted(paths)]
+    for path, df, error in bounded_map(_parse_task, tasks, max_workers=max_workers, batch_size=4,
+                                       desc=f"{network} 적재"):
+        if error is not None:
+            failed[path] = error
+            continue
+        buffer.append(df)
+        buffered += len(df)
+        rows += len(df)
+        if buffered >= flush_rows:
+            write_partitions(pd.concat(buffer, ignore_index=True), network, store_dir)
+            buffer, buffered = [], 0
+    if buffer:
+        write_partitions(pd.concat(buffer, ignore_index=True), network, store_dir)
+    return {'rows': rows, 'failed': failed}
+
+
+def update_stations(stations, store_dir=STORE_DIRECTORY, csv_path=STATION_CSV):
+    """지점 정보를 저장소 지점 테이블(stations.parquet)과 station_meta.csv 에 병합"""
+    path = os.path.join(store_dir, STATION_PARQUET_NAME)
+    if os.path.exists(path):
+        stations = pd.concat([pd.read_parquet(path), stations], ignore_index=True)
+    stations = (stations.drop_duplicates(["network", "stn_id"], keep="last")
+                .sort_values(["network", "stn_id"], ignore_index=True)[STATION_COLUMNS])
+    os.makedirs(store_dir, exist_ok=True)
+    stations.to_parquet(path + ".part", index=False)
+    os.replace(path + ".part", path)
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    stations.to_csv(csv_path, index=False, encoding="utf-8-sig")
+    return stations
+
+
+def download_stations(network, key, raw_dir=RAW_DIRECTORY):
+    """지점 정보 텍스트를 내려받아 지점 테이블 갱신"""
+    save_path = os.path.join(raw_dir, network, f"stations_{network}.txt")
+    url = f"{STATION_URL}?inf={STATION_INF[network]}&stn=&help=0&authKey={key}"
+    failed, _ = run_downloads([(url, save_path)], MIN_RAW_SIZE, validate=False, show_progress=False)
+    if failed:
+        raise RuntimeError(f"지점 정보 다운로드 실패: {failed[0][2]}")
+    return update_stations(parse_stations(save_path, network))
+
+
+def load_stations(network=None, store_dir=STORE_DIRECTORY):
+    """지점 테이블 조회 (network 를 주면 해당 네트워크만)"""
+    stations = pd.read_parquet(os.path.join(store_dir, STATION_PARQUET_NAME))
+    if network is not None:
+        stations = stations[stations['network'] == network].reset_index(drop=True)
+    return stations
+
+
+def load_observations(network, start, end, columns=None, stations=None, store_dir=STORE_DIRECTORY):
+    """
+    저장소에서 기간/관측소/컬럼 조건에 맞는 자료만 읽는 함수.
+
+    year/month 파티션 조건으로 해당 월 파일만 열고, time/stn_id 조건은 Parquet 행 그룹 통계로
+    걸러지므로 몇 달 치 수천 개 관측소 자료도 텍스트를 다시 읽지 않고 바로 불러온다.
+
+    Args:
+        network (str): 'asos' 또는 'aws'.
+        start, end (str | datetime): 조회 구간 (양 끝 포함).
+        columns (list): VALUE_COLUMNS 중 읽을 컬럼 (None 이면 전체).
+        stations (list): 지점 번호 목록 (None 이면 전체).
+
+    Returns:
+        pd.DataFrame: stn_id, time + columns (관측소·시간 순).
+    """
+    import pyarrow.dataset as pads
+
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    dataset = pads.dataset(os.path.join(store_dir, network), format="parquet", partitioning="hive")
+    year, month, time = pads.field("year"), pads.field("month"), pads.field("time")
+    after_start = (year > start.year) | ((year == start.year) & (month >= start.month))
+    before_end = (year < end.year) | ((year == end.year) & (month <= end.month))
+    condition = after_start & before_end & (time >= start) & (time <= end)
+    if stations is not None:
+        condition &= pads.field("stn_id").isin([int(s) for s in stations])
+    table = dataset.to_table(columns=["stn_id", "time"] + list(columns or VALUE_COLUMNS), filter=condition)
+    return table.to_pandas().sort_values(["stn_id", "time"], ignore_index=True)
+
+
+def to_matched_format(observations, var, product="OBS"):
+    """관측 자료를 RMSE_vaildation_6 입력 형식(time, station, product, value)으로 변환"""
+    return pd.DataFrame({
+        'time': observations['time'],
+        'station': observations['stn_id'],
+        'product': product,
+        'value': observations[var],
+    })
@@ -0,0 +1,486 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import statistics
+import subprocess
+import contextlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from sgd_synthetic import SYNTHETIC_ROOT, generate_archive, load_archive
+
+# 벤치마크 결과 경로 (실행마다 bench_{시각}.json, 직전 결과와 비교해 느려진 항목을 표시)
+BENCH_DIRECTORY = "/home/papalio/test_research/RMSE_TEST/BENCH"
+RESULT_DIRECTORY = os.path.join(BENCH_DIRECTORY, "results")
+
+# MK-PRISM 변환 스크립트 위치 (RMSE_TEST_2)
+MKPRISM_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../RMSE_TEST_2/PROG/create_data")
+
+# 이전 결과보다 이 비율 이상 느려지면 회귀로 표시
+REGRESSION_TOLERANCE = 0.2
+
+BENCHMARKS = ("qc", "kernels", "outlier", "gaps", "check_data_file", "mkprism", "station_extract", "download")
+
+
+def _cpu_seconds():
+    """자기 자신과 종료된 자식 프로세스(프로세스 풀 워커)의 CPU 시간 합"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class Checks(dict):
+    """timed 결과의 checks 로 남길 검증값 (일반 dict 반환값과 구분)"""
+
+
+def timed(name, func, repeat=1, files=0, nbytes=0, setup=None, **extra):
+    """
+    func 을 repeat 번 실행해 경과 시간과 처리량을 기록하는 함수.
+
+    setup 이 있으면 매번 실행 전에 호출한다 (캐시 비우기 등, 시간에 포함하지 않음).
+    func 의 출력은 버리고, 반환값이 Checks 이면 결과의 checks 로 남긴다.
+
+    Returns:
+        dict: name, seconds (최소), median_s, runs, cpu_s, files, bytes, files_per_s, mb_per_s, checks.
+    """
+    runs, cpu, checks = [], [], None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        cpu0 = _cpu_seconds()
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            value = func()
+        runs.append(time.perf_counter() - t0)
+        cpu.append(_cpu_seconds() - cpu0)
+        if isinstance(value, Checks):
+            checks = dict(value)
+    best = min(runs)
+    result = {
+        'name': name,
+        'seconds': round(best, 4),
+        'median_s': round(statistics.median(runs), 4),
+        'runs': [round(r, 4) for r in runs],
+        'cpu_s': round(min(cpu), 4),
+        'files': int(files),
+        'bytes': int(nbytes),
+        'files_per_s': round(files / best, 2) if best > 0 else None,
+        'mb_per_s': round(nbytes / best / 1024 / 1024, 2) if best > 0 else None,
+        'checks': checks,
+    }
+    result.update(extra)
+    print(f"⏱ {name}: {best:.3f}s"
+          + (f" ({result['files_per_s']:,.1f} files/s, {result['mb_per_s']:,.1f} MB/s)" if files else ""))
+    return result
+
+
+@contextlib.contextmanager
+def patched(module, **attrs):
+    """스크립트의 경로 상수를 합성 아카이브 쪽으로 잠시 바꿈"""
+    saved = {name: getattr(module, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(module, name, value)
+    try:
+        yield module
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+def _reset_cache(root_directory):
+    """QC 캐시 DB 삭제 (처음 실행과 같은 조건으로 측정)"""
+    from sgd_qc_cache import CACHE_RELPATH
+    path = os.path.join(root_directory, CACHE_RELPATH)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def bench_qc(root_directory, info, truth, repeat=1, max_workers=None):
+    """check_0_filled_files_3 / sgd_qc 검사: 캐시 없이, 캐시 처음 채우기, 캐시 적중"""
+    from sgd_manifest import refresh_manifest
+    from sgd_qc import run_qc, ZERO_RATIO_LIMIT
+
+    variables = info['variables']
+    present = truth[truth['kind'] != "gap"]
+    files, nbytes = len(present), int(present['size'].sum())
+    refresh_manifest(root_directory)
+
+    def check():
+        df = run_qc(root_directory, variables, max_workers=max_workers, use_cache=False)
+        zero = set(df.loc[df['zero_ratio'] > ZERO_RATIO_LIMIT, 'path'])
+        errors = set(df.loc[df['error'].notna(), 'path'])
+        expected_zero = set(truth.loc[truth['kind'] == "zero", 'path'])
+        expected_bad = set(truth.loc[truth['kind'] == "truncated", 'path'])
+        return Checks(rows=len(df), zero_detected=len(zero & expected_zero), zero_injected=len(expected_zero),
+                      truncated_detected=len(errors & expected_bad), truncated_injected=len(expected_bad))
+
+    results = [timed("qc_nocache", check, repeat, files, nbytes)]
+    results.append(timed("qc_cache_cold", lambda: run_qc(root_directory, variables, max_workers=max_workers),
+                         repeat, files, nbytes, setup=lambda: _reset_cache(root_directory)))
+    results.append(timed("qc_cache_warm", lambda: run_qc(root_directory, variables, max_workers=max_workers),
+                         repeat, files, nbytes))
+    return results
+
+
+def _legacy_metrics(raw, lo, hi):
+    """sgd_kernels 이전 compute_metrics 의 계산 방식 (마스크 → 유효값 복사 → 항목별 비교)"""
+    values = raw.ravel()
+    missing_mask = values == -9990
+    valid = values[~missing_mask]
+    if valid.size == 0:
+        return int(np.count_nonzero(missing_mask)), 0, None, None, 0, 0, 0
+    return (int(np.count_nonzero(missing_mask)), valid.size, int(valid.min()), int(valid.max()),
+            int(np.count_nonzero(valid == 0)), int(np.count_nonzero(valid < 0)),
+            int(np.count_nonzero((valid < lo) | (valid > hi))))
+
+
+def bench_kernels(root_directory, info, truth, repeat=1, n_files=48):
+    """파일 단위 QC 통계 계산만 (파일은 미리 메모리에 올림): 기존 방식 vs masked_stats (NumPy / numba)"""
+    from sgd_mmap import open_sgd_data
+    from sgd_packed import raw_threshold
+    from sgd_kernels import masked_stats, numba
+
+    ok = truth[truth['kind'].isin(["ok", "zero"])]
+    paths = ok['path'].tolist()[:n_files]
+    if not paths:
+        return []
+    grids, mapped = [], []
+    for path in paths:
+        grid = open_sgd_data(path)
+        raw = np.array(grid['data'])
+        # 이상치 범위는 변수와 상관없이 ta 기준 (-50 ~ 50) 으로 통일 (계산량 비교용)
+        bounds = (raw_threshold(-50.0, grid['data_scale'], "<", raw.dtype),
+                  raw_threshold(50.0, grid['data_scale'], ">", raw.dtype))
+        grids.append((raw,) + bounds)
+        mapped.append((grid['data'],) + bounds)   # 실제 파일 그대로의 >i2 memmap
+    nbytes = sum(raw.nbytes for raw, _, _ in grids)
+
+    def fused(use_numba, source=grids):
+        out = []
+        for raw, lo, hi in source:
+            s = masked_stats(raw, -9990, lo, hi, use_numba=use_numba)
+            out.append((s['missing'], s['count'], s['min'], s['max'], s['zero'], s['negative'], s['outlier']))
+        return out
+
+    expected = [_legacy_metrics(raw, lo, hi) for raw, lo, hi in grids]
+    results = [timed("kernels_legacy", lambda: [_legacy_metrics(raw, lo, hi) for raw, lo, hi in grids],
+                     repeat, len(grids), nbytes)]
+    variants = [("kernels_numpy", False)] + ([("kernels_numba", True)] if numba is not None else [])
+    for name, use_numba in variants:
+        if use_numba:
+            fused(True)   # 첫 호출의 컴파일 시간 제외
+        results.append(timed(name, lambda: Checks(matches_legacy=fused(use_numba) == expected), repeat,
+                             len(grids), nbytes))
+        results[-1]['checks']['memmap_matches_legacy'] = fused(use_numba, mapped) == expected
+    return results
+
+
+def bench_outlier(root_directory, info, truth, output_directory, repeat=1, max_workers=None):
+    """sgd_outlier 시공간 이상치 검사 (변수별 전체 기간, 0 채움 파일 검출 수 확인)"""
+    from sgd_outlier import OUTLIER_PARAMS, run_detection
+
+    results = []
+    for var in [v for v in info['variables'] if v in OUTLIER_PARAMS]:
+        present = truth[(truth['var'] == var) & (truth['kind'] != "gap")]
+        expected_zero = set(truth.loc[(truth['var'] == var) & (truth['kind'] == "zero"), 'tm'])
+
+        def detect():
+            df = run_detection(root_directory, var, freq=info['freq'], output_directory=output_directory,
+                               max_workers=max_workers)
+            zero = set(df.loc[df['zero_grid'].fillna(False).astype(bool), 'tm'])
+            return Checks(zero_detected=len(zero & expected_zero), zero_injected=len(expected_zero),
+                          zero_false=len(zero - expected_zero), spatial_cells=int(df['spatial_count'].sum()),
+                          temporal_cells=int(df['temporal_count'].sum()))
+
+        results.append(timed(f"outlier_{var}", detect, repeat, len(present), int(present['size'].sum()),
+                             setup=lambda: shutil.rmtree(output_directory, ignore_errors=True)))
+    return results
+
+
+def bench_gaps(root_directory, info, truth, repeat=1):
+    """get_excluded_date_4 결측 구간 검사 (인덱스 조회 + 구간 계산)"""
+    import get_excluded_date_4 as script
+
+    freq = info['freq']
+    injected = truth[truth['kind'] == "gap"]
+
+    def scan():
+        found = 0
+        for var in info['variables']:
+            gaps = script.scan_missing_dates(var, freq, root_directory)
+            found += int(gaps['length'].sum()) if not gaps.empty else 0
+        return Checks(missing_detected=found, missing_injected=len(injected))
+
+    return [timed("gaps_scan", scan, repeat, files=len(truth))]
+
+
+def bench_check_data_file(root_directory, info, truth, output_directory, repeat=1):
+    """check_data_file_test 의 결측/크기/값 분포 분석 (일 자료 00시 파일)"""
+    import check_data_file_test as script
+
+    start = datetime.strptime(info['start'], "%Y%m%d%H%M")
+    end = datetime.strptime(info['end'], "%Y%m%d%H%M").replace(hour=0, minute=0)
+    daily = truth[truth['tm'].str.endswith("0000") & (truth['kind'] != "gap")]
+    os.makedirs(output_directory, exist_ok=True)
+
+    overrides = dict(
+        ROOT_DIRECTORY=root_directory, variables=list(info['variables']), start_date=start, end_date=end,
+        OUTPUT_CSV=os.path.join(output_directory, "missing_files.csv"),
+        OUTPUT_IMG_DIR=os.path.join(output_directory, "IMG"),
+        OUTPUT_SIZE_STATS=os.path.join(output_directory, "file_size_statistics.csv"),
+        OUTPUT_VALUE_STATS=os.path.join(output_directory, "value_distribution_statistics.csv"),
+        file_structure=os.path.join(root_directory, "org/sgd/{year}/{month:02d}/{day:02d}/sfc_grid_{var}_{date}0000.nc"),
+    )
+    results = []
+    with patched(script, **overrides):
+        os.makedirs(script.OUTPUT_IMG_DIR, exist_ok=True)
+        index = script.load_file_index()
+        results.append(timed("check_data_file_index", lambda: Checks(indexed=len(script.load_file_index())), repeat,
+                             files=len(truth)))
+        results.append(timed("check_data_file_missing", lambda: script.find_missing_files(index), repeat))
+        results.append(timed("check_data_file_sizes", lambda: script.analyze_file_sizes(index), repeat))
+        results.append(timed("check_data_file_values", lambda: script.analyze_value_distribution(index), repeat,
+                             files=len(daily), nbytes=int(daily['size'].sum())))
+    return results
+
+
+def bench_mkprism(root_directory, info, truth, output_directory, repeat=1):
+    """
+    convert_SGD_to_MKPRISE 월 단위 변환 (한 프로세스, 월 하나씩).
+
+    지형고도 SSP_*.bin 은 합성 아카이브에 없으므로 보정량은 남북 방향 기울기 배열로 대신한다.
+    잘린 파일은 그대로 두고 변환기가 NaN 으로 채워 넘기는지 실패 수로 확인한다.
+    """
+    if MKPRISM_DIRECTORY not in sys.path:
+        sys.path.append(MKPRISM_DIRECTORY)
+    import convert_SGD_to_MKPRISE as script
+
+    if "ta" not in info['variables']:
+        return []
+    start = datetime.strptime(info['start'], "%Y%m%d%H%M")
+    end = datetime.strptime(info['end'], "%Y%m%d%H%M")
+    bad = set(truth.loc[truth['kind'] == "truncated", 'path'])
+    os.makedirs(output_directory, exist_ok=True)
+
+    with patched(script, ROOT_DIRECTORY=root_directory, MKPRISM_SAVE_DIR=output_directory):
+        tasks = script.build_tasks(start, end)
+        if not tasks:
+            return []
+        size = info['size']
+        script._init_worker(np.repeat(np.linspace(-3.0, 3.0, size, dtype=np.float32)[:, None], size, axis=1))
+        paths = [p for task in tasks for p in task[2]]
+        nbytes = sum(os.path.getsize(p) for p in paths)
+
+        def convert():
+            failed = sum(len(script.convert_month(task)[1]) for task in tasks)
+            return Checks(failed_files=failed, truncated_injected=len(bad.intersection(paths)))
+
+        return [timed("mkprism_convert", convert, repeat, files=len(paths), nbytes=nbytes)]
+
+
+def bench_station_extract(root_directory, info, truth, n_stations=700, repeat=1):
+    """station_extract: 가중치 계산(최초 1회)과 파일 묶음 추출"""
+    from sgd_grid import read_geometry, ij_to_lonlat
+    from station_extract import build_weights, extract_files
+
+    ok = truth[truth['kind'].isin(["ok", "zero"])]
+    paths = ok['path'].tolist()
+    if not paths:
+        return []
+    geom = read_geometry(paths[0])
+    rng = np.random.default_rng(0)
+    lons, lats = ij_to_lonlat(rng.uniform(0, geom['nx'] - 1, n_stations),
+                              rng.uniform(0, geom['ny'] - 1, n_stations), geom)
+
+    results = []
+    for method in ("nearest", "bilinear"):
+        weights = build_weights(geom, lons, lats, method)
+        results.append(timed(f"station_weights_{method}", lambda: build_weights(geom, lons, lats, method),
+                             repeat, stations=n_stations))
+        results.append(timed(f"station_extract_{method}", lambda: extract_files(paths, weights), repeat,
+                             files=len(paths), nbytes=int(ok['size'].sum()), stations=n_stations))
+    return results
+
+
+def bench_download(root_directory, info, truth, output_directory, n_files=200, concurrency=16, latency=0.02,
+                   fail_rate=0.0, rate_per_host=0, repeat=1):
+    """
+    mock apihub 서버에서 합성 파일 하나를 응답으로 받아 sgd_downloader 로 n_files 개 다운로드.
+
+    rate_per_host 기본값 0 은 요청 속도 제한 없이 다운로더 자체를 잰다 (값은 결과에 기록).
+    """
+    from mock_apihub import start_mock_server
+    from sgd_downloader import build_url, run_downloads
+
+    ok = truth[truth['kind'] == "ok"]
+    payload_path = ok['path'].iloc[0]
+    payload_size = os.path.getsize(payload_path)
+    tms = pd.date_range(datetime.strptime(info['start'], "%Y%m%d%H%M"), periods=n_files, freq="h")
+    save_dir = os.path.join(output_directory, "download")
+
+    server, base_url = start_mock_server(payload_path, latency=latency, fail_rate=fail_rate)
+    try:
+        tasks = [(build_url("ta", tm.strftime("%Y%m%d%H%M"), "bench", base_url),
+                  os.path.join(save_dir, f"sfc_grid_ta_{tm:%Y%m%d%H%M}.nc")) for tm in tms]
+
+        def download():
+            failed, stats = run_downloads(tasks, min_file_size=payload_size // 2, concurrency=concurrency,
+                                          rate_per_host=rate_per_host, show_progress=False)
+            return Checks(failed=len(failed), files=stats['files'])
+
+        return [timed("download_mock", download, repeat, files=n_files, nbytes=n_files * payload_size,
+                      setup=lambda: shutil.rmtree(save_dir, ignore_errors=True),
+                      concurrency=concurrency, latency_s=latency, fail_rate=fail_rate,
+                      rate_per_host=rate_per_host)]
+    finally:
+        server.shutdown()
+        shutil.rmtree(save_dir, ignore_errors=True)
+
+
+def environment():
+    """결과 비교용 실행 환경 (git 커밋, 파이썬, CPU 수)"""
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        rev = None
+    return {'git_rev': rev, 'host': platform.node(), 'python': platform.python_version(),
+            'numpy': np.__version__, 'pandas': pd.__version__, 'cpu_count': os.cpu_count()}
+
+
+def run_suite(root_directory=SYNTHETIC_ROOT, benchmarks=BENCHMARKS, repeat=1, output_directory=BENCH_DIRECTORY,
+              result_path=None, max_workers=None):
+    """
+    합성 아카이브에 대해 벤치마크를 실행하고 결과를 JSON 으로 저장하는 함수.
+
+    Args:
+        root_directory (str): 합성 아카이브 경로 (sgd_synthetic.generate_archive 로 생성).
+        benchmarks (tuple): 실행할 항목 (BENCHMARKS 중 일부).
+        repeat (int): 항목별 반복 횟수 (최소 시간을 기록).
+        output_directory (str): 변환/다운로드 결과를 쓸 임시 경로.
+        result_path (str): 결과 JSON 경로 (기본값: results/bench_{시각}.json).
+
+    Returns:
+        (str, dict): (결과 JSON 경로, 결과).
+    """
+    info, truth = load_archive(root_directory)
+    if info is None:
+        raise FileNotFoundError(f"합성 아카이브가 없습니다: {root_directory} (sgd_synthetic.py 로 먼저 생성)")
+
+    work_dir = os.path.join(output_directory, "work")
+    runners = {
+        'qc': lambda: bench_qc(root_directory, info, truth, repeat, max_workers),
+        'kernels': lambda: bench_kernels(root_directory, info, truth, repeat),
+        'outlier': lambda: bench_outlier(root_directory, info, truth, os.path.join(work_dir, "outlier"), repeat,
+                                         max_workers),
+        'gaps': lambda: bench_gaps(root_directory, info, truth, repeat),
+        'check_data_file': lambda: bench_check_data_file(root_directory, info, truth,
+                                                         os.path.join(work_dir, "check_data_file"), repeat),
+        'mkprism': lambda: bench_mkprism(root_directory, info, truth, os.path.join(work_dir, "mkprism"), repeat),
+        'station_extract': lambda: bench_station_extract(root_directory, info, truth, repeat=repeat),
+        'download': lambda: bench_download(root_directory, info, truth, work_dir, repeat=repeat),
+    }
+
+    results = []
+    for name in benchmarks:
+        print(f"\n▶ {name}")
+        try:
+            results.extend(runners[name]())
+        except Exception as e:   # 한 항목이 실패해도 나머지는 측정
+            print(f"⚠ {name} 실패: {e}")
+            results.append({'name': name, 'error': f"{type(e).__name__}: {e}"})
+
+    report = {'created': datetime.now().isoformat(timespec="seconds"), 'environment': environment(),
+              'archive': info, 'repeat': repeat, 'results': results}
+    if result_path is None:
+        result_path = os.path.join(RESULT_DIRECTORY, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(result_path), exist_ok=True)
+    with open(result_path + ".part", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(result_path + ".part", result_path)
+    return result_path, report
+
+
+def latest_result(result_directory=RESULT_DIRECTORY, exclude=None):
+    """가장 최근 결과 JSON 경로 (exclude 제외, 없으면 None)"""
+    if not os.path.isdir(result_directory):
+        return None
+    names = sorted(name for name in os.listdir(result_directory)
+                   if name.startswith("bench_") and name.endswith(".json"))
+    paths = [os.path.join(result_directory, name) for name in names]
+    paths = [p for p in paths if exclude is None or os.path.abspath(p) != os.path.abspath(exclude)]
+    return paths[-1] if paths else None
+
+
+def compare(baseline, current, tolerance=REGRESSION_TOLERANCE):
+    """
+    두 결과(JSON 경로 또는 dict)의 항목별 시간을 비교하는 함수.
+
+    합성 아카이브 조건(격자 크기, 파일 수)이 다르면 시간이 아닌 처리량(files/s)을 비교한다.
+
+    Returns:
+        pd.DataFrame: name, baseline, current, ratio, regression (ratio > 1 + tolerance 이면 True).
+    """
+    reports = []
+    for report in (baseline, current):
+        if isinstance(report, str):
+            with open(report, encoding="utf-8") as f:
+                report = json.load(f)
+        reports.append(report)
+    same_archive = all(reports[0]['archive'].get(k) == reports[1]['archive'].get(k)
+                       for k in ("size", "files", "variables", "freq"))
+
+    rows = []
+    before = {r['name']: r for r in reports[0]['results'] if 'error' not in r}
+    for r in reports[1]['results']:
+        if 'error' in r or r['name'] not in before:
+            continue
+        b = before[r['name']]
+        if same_archive or not (r.get('files_per_s') and b.get('files_per_s')):
+            old, new = b['seconds'], r['seconds']
+        else:
+            old, new = 1.0 / b['files_per_s'], 1.0 / r['files_per_s']
+        ratio = new / old if old else float("nan")
+        rows.append({'name': r['name'], 'baseline': old, 'current': new, 'ratio': round(ratio, 3),
+                     'regression': bool(ratio > 1 + tolerance)})
+    return pd.DataFrame(rows, columns=["name", "baseline", "current", "ratio", "regression"])
+
+
+def main():
+    print("\n=== 표준격자 처리 벤치마크 ===")
+    root_directory = input(f"합성 아카이브 경로를 입력하세요 [기본값: {SYNTHETIC_ROOT}]: ").strip() or SYNTHETIC_ROOT
+
+    info, _ = load_archive(root_directory)
+    if info is None or input("합성 아카이브를 새로 만들까요? (y/N): ").strip().lower() == "y":
+        size = int(input("격자 크기를 입력하세요 (실제 2049) [기본값: 513]: ").strip() or 513)
+        days = int(input("생성할 일 수를 입력하세요 [기본값: 7]: ").strip() or 7)
+        generate_archive(root_directory, size=size, days=days)
+
+    names = input(f"실행할 항목을 입력하세요 (쉼표 구분, {', '.join(BENCHMARKS)}) [기본값: 전체]: ").strip()
+    benchmarks = tuple(n.strip() for n in names.split(",") if n.strip()) if names else BENCHMARKS
+    unknown = [n for n in benchmarks if n not in BENCHMARKS]
+    if unknown:
+        print(f"알 수 없는 항목: {', '.join(unknown)}")
+        return
+    repeat = int(input("반복 횟수를 입력하세요 [기본값: 3]: ").strip() or 3)
+
+    result_path, _ = run_suite(root_directory, benchmarks, repeat)
+    print(f"\n📄 결과 저장: {result_path}")
+
+    baseline = latest_result(exclude=result_path)
+    if baseline:
+        diff = compare(baseline, result_path)
+        print(f"\n기준 결과: {baseline}")
+        print(diff.to_string(index=False))
+        if diff['regression'].any():
+            print(f"⚠ {REGRESSION_TOLERANCE:.0%} 이상 느려진 항목: {', '.join(diff.loc[diff['regression'], 'name'])}")
+
+
+if __name__ == "__main__":
+    main()
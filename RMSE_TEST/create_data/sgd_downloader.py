@@ -0,0 +1,235 @@
+import os
+import time
+import random
+import asyncio
+import tempfile
+from urllib.parse import urlsplit
+
+import aiohttp
+from tqdm import tqdm
+
+from sgd_netcdf import NetCDFHeaderError, validate_sgd_header
+from sgd_trace import traced, count
+
+# KMA API 허브 표준격자 다운로드 주소 (테스트 시 로컬 mock 서버 주소로 교체)
+API_URL = "https://apihub.kma.go.kr/api/typ01/url/sfc_grid_nc_down.php"
+
+# 기본 다운로드 설정
+DEFAULT_CONCURRENCY = 16      # 동시에 진행할 최대 다운로드 수
+DEFAULT_RATE_PER_HOST = 8.0   # 호스트당 초당 요청 수
+DEFAULT_MAX_RETRIES = 3       # 최초 시도 이후 재시도 횟수
+DEFAULT_TIMEOUT = 30          # 요청당 타임아웃 (초)
+BACKOFF_BASE = 1.0            # 재시도 대기 기본값 (초)
+BACKOFF_CAP = 60.0            # 재시도 대기 상한 (초)
+CHUNK_SIZE = 256 * 1024       # 스트리밍 기록 단위 (bytes)
+
+# 재시도해도 의미 없는 HTTP 상태 코드
+NON_RETRYABLE_STATUS = {400, 401, 403, 404}
+
+
+def build_url(var, tm, key, base_url=API_URL):
+    """변수명과 시각(YYYYMMDDHHMM)으로 다운로드 URL 생성"""
+    return f"{base_url}?obs={var}&tm={tm}&authKey={key}"
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """지수 백오프 + full jitter 대기 시간 계산 (attempt는 0부터 시작)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class HostRateLimiter:
+    """호스트별 토큰 버킷 방식의 요청 속도 제한기"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._buckets = {}
+        self._locks = {}
+
+    async def acquire(self, host):
+        """해당 호스트의 토큰이 생길 때까지 대기"""
+        if self.rate <= 0:
+            return
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            tokens, last = self._buckets.get(host, (self.burst, time.monotonic()))
+            while True:
+                now = time.monotonic()
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                last = now
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, last)
+                    return
+                await asyncio.sleep((1 - tokens) / self.rate)
+
+
+class DownloadError(Exception):
+    """다운로드 실패 (retryable=False 이면 재시도하지 않음)"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _fsync_dir(dirpath):
+    """rename 결과가 디스크에 남도록 디렉토리 엔트리 동기화 (지원하지 않는 OS는 무시)"""
+    try:
+        fd = os.open(dirpath, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@traced("write")
+def commit_file(tmp_path, save_path, min_file_size, validate=True):
+    """
+    임시 파일을 검사한 뒤 최종 경로로 원자적으로 교체하는 함수.
+
+    크기 기준 미달이거나 NetCDF 헤더가 잘못되면 DownloadError 를 발생시키고
+    최종 경로는 건드리지 않는다. 임시 파일 정리는 호출한 쪽에서 한다.
+    """
+    file_size = os.path.getsize(tmp_path)
+    if file_size < min_file_size:
+        raise DownloadError(f"File size too small ({file_size} bytes)")
+    if validate:
+        try:
+            validate_sgd_header(tmp_path)
+        except NetCDFHeaderError as e:
+            raise DownloadError(f"Invalid NetCDF: {e}")
+    os.replace(tmp_path, save_path)
+    _fsync_dir(os.path.dirname(save_path))
+    count("bytes_downloaded", file_size)
+    return file_size
+
+
+async def _fetch_once(session, url, save_path, min_file_size, validate=True):
+    """
+    단일 요청으로 파일을 받아 저장하고 저장된 바이트 수를 반환.
+
+    응답은 CHUNK_SIZE 단위로 같은 디렉토리의 임시 파일(.{name}.*.part)에 기록하고,
+    fsync + 헤더 검사 후 os.replace 로 교체하므로 최종 경로에는 완전한 파일만 남는다.
+    """
+    save_dir = os.path.dirname(save_path)
+    os.makedirs(save_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=save_dir, prefix=f".{os.path.basename(save_path)}.", suffix=".part")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            async with session.get(url) as response:
+                if response.status >= 400:
+                    raise DownloadError(f"HTTP {response.status}",
+                                        retryable=response.status not in NON_RETRYABLE_STATUS)
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    f.write(chunk)
+                # gzip 등으로 인코딩된 응답은 aiohttp 가 풀어서 주므로 Content-Length 와 비교할 수 없음
+                encoding = response.headers.get("Content-Encoding", "identity").strip().lower()
+                expected = response.content_length if encoding == "identity" else None
+            f.flush()
+            os.fsync(f.fileno())
+        if expected is not None and os.path.getsize(tmp_path) != expected:
+            raise DownloadError("Truncated response")
+        return commit_file(tmp_path, save_path, min_file_size, validate)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+async def _download_with_retry(session, limiter, url, save_path, min_file_size, max_retries, validate=True):
+    """재시도(지터 포함 지수 백오프)를 포함한 단일 파일 다운로드"""
+    host = urlsplit(url).netloc
+    last_error = None
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(host)
+        try:
+            return await _fetch_once(session, url, save_path, min_file_size, validate), None
+        except (DownloadError, aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            last_error = str(e) or type(e).__name__
+            if isinstance(e, DownloadError) and not e.retryable:
+                break
+            if attempt < max_retries:
+                await asyncio.sleep(backoff_delay(attempt))
+    return 0, last_error
+
+
+async def download_all(tasks, min_file_size, concurrency=DEFAULT_CONCURRENCY,
+                       rate_per_host=DEFAULT_RATE_PER_HOST, max_retries=DEFAULT_MAX_RETRIES,
+                       timeout=DEFAULT_TIMEOUT, validate=True, show_progress=True):
+    """
+    (url, save_path) 목록을 비동기로 다운로드하는 함수.
+
+    하나의 aiohttp 세션(keep-alive 연결 풀)을 공유하고, 작업 큐와 고정 개수의
+    워커로 동시 실행 수를 제한한다.
+
+    Args:
+        tasks (list): (url, save_path) 튜플 목록.
+        min_file_size (int): 정상 파일로 간주할 최소 크기(bytes).
+        concurrency (int): 동시 다운로드 수 (연결 풀 크기).
+        rate_per_host (float): 호스트당 초당 요청 수 (0 이하이면 제한 없음).
+        max_retries (int): 최초 시도 이후 재시도 횟수.
+        timeout (float): 요청당 타임아웃(초).
+        validate (bool): 저장 전 NetCDF 헤더 검사 여부.
+        show_progress (bool): tqdm 진행바 표시 여부.
+
+    Returns:
+        tuple: (실패 목록 [(url, save_path, error)], 처리량 통계 dict).
+    """
+    queue = asyncio.Queue()
+    for task in tasks:
+        queue.put_nowait(task)
+
+    limiter = HostRateLimiter(rate_per_host)
+    failed = []
+    stats = {'files': 0, 'bytes': 0}
+    progress = tqdm(total=len(tasks), desc="파일 다운로드 중", disable=not show_progress)
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency,
+                                     keepalive_timeout=60, ttl_dns_cache=300)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def worker(session):
+        while True:
+            try:
+                url, save_path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            nbytes, error = await _download_with_retry(
+                session, limiter, url, save_path, min_file_size, max_retries, validate)
+            if error is None:
+                stats['files'] += 1
+                stats['bytes'] += nbytes
+            else:
+                failed.append((url, save_path, error))
+                tqdm.write(f"다운로드 실패: {os.path.basename(save_path)} - {error}")
+            progress.update(1)
+
+    start = time.perf_counter()
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+            n_workers = max(1, min(concurrency, len(tasks)))
+            await asyncio.gather(*(worker(session) for _ in range(n_workers)))
+    finally:
+        progress.close()
+
+    elapsed = time.perf_counter() - start
+    stats['failed'] = len(failed)
+    stats['elapsed_s'] = elapsed
+    stats['files_per_s'] = stats['files'] / elapsed if elapsed > 0 else 0.0
+    stats['mb_per_s'] = stats['bytes'] / 1024 / 1024 / elapsed if elapsed > 0 else 0.0
+    return failed, stats
+
+
+def run_downloads(tasks, min_file_size, **kwargs):
+    """동기 코드에서 download_all 실행 후 처리량을 출력"""
+    if not tasks:
+        return [], {'files': 0, 'bytes': 0, 'failed': 0, 'elapsed_s': 0.0,
+                    'files_per_s': 0.0, 'mb_per_s': 0.0}
+
+    failed, stats = asyncio.run(download_all(tasks, min_file_size, **kwargs))
+    print(f"다운로드 완료: {stats['files']:,}개 성공, {stats['failed']:,}개 실패 "
+          f"({stats['elapsed_s']:.1f}초)")
+    print(f"처리량: {stats['files_per_s']:.2f} files/s, {stats['mb_per_s']:.2f} MB/s")
+    return failed, stats
@@ -0,0 +1,168 @@
+import os
+import csv
+import math
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from tqdm import tqdm
+
+from sgd_trace import span, gauge, flush, traced
+
+# 작업 하나에 묶을 항목(파일) 수. 피클/IPC 비용을 여러 파일에 나눠 냄
+BATCH_SIZE = 16
+
+# I/O 대기가 길 때 코어당 최대 동시 작업 수
+MAX_IO_OVERSUBSCRIBE = 4
+
+# 동시 실행 수를 조정하기 전에 측정할 배치 수
+PROBE_BATCHES = 2
+
+
+def _run_batch(func, batch):
+    """워커에서 배치 하나를 처리하고 (결과 목록, CPU 시간, 경과 시간) 반환"""
+    wall0 = time.perf_counter()
+    cpu0 = time.process_time()
+    with span("batch", "worker", items=len(batch)):
+        results = [func(item) for item in batch]
+    cpu_s, wall_s = time.process_time() - cpu0, time.perf_counter() - wall0
+    flush()   # 워커는 종료 처리가 보장되지 않으므로 배치마다 추적 기록을 내보냄
+    return results, cpu_s, wall_s
+
+
+def adaptive_workers(cpu_seconds, wall_seconds, n_cpu, limit):
+    """
+    측정된 CPU 사용률(CPU 시간 / 경과 시간)로 동시 실행 수를 정하는 함수.
+
+    CPU 위주 작업(사용률 ≈ 1)이면 코어 수, 파일 읽기 대기가 길면 코어 수 / 사용률 (최대 limit).
+    """
+    if wall_seconds <= 0:
+        return min(n_cpu, limit)
+    utilization = min(1.0, max(cpu_seconds / wall_seconds, 1.0 / MAX_IO_OVERSUBSCRIBE))
+    return max(1, min(limit, math.ceil(n_cpu / utilization)))
+
+
+def _batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bounded_map(func, items, max_workers=None, batch_size=BATCH_SIZE, window=None, adaptive=True,
+                desc=None, show_progress=True):
+    """
+    항목을 배치로 묶어 프로세스 풀에서 처리하고 끝난 순서대로 결과를 하나씩 내보내는 제너레이터.
+
+    동시에 제출된 배치는 window 개(기본값: 현재 동시 실행 수)를 넘지 않으므로
+    항목이 아무리 많아도 future 와 결과가 한꺼번에 메모리에 쌓이지 않는다.
+    adaptive 이면 처음 몇 배치의 CPU 사용률을 재서 동시 실행 수를 코어 수 ~ limit 사이로 조정한다.
+
+    Args:
+        func (callable): 항목 하나를 처리하는 모듈 최상위 함수 (피클 가능해야 함).
+        items (iterable): 처리할 항목. 제너레이터도 가능 (필요한 만큼만 읽음).
+        max_workers (int): 최대 프로세스 수 (기본값: adaptive 이면 코어 수 × MAX_IO_OVERSUBSCRIBE, 아니면 코어 수).
+        batch_size (int): 작업 하나에 묶을 항목 수.
+        window (int): 동시에 제출해 둘 배치 수 (None 이면 동시 실행 수를 따름).
+        adaptive (bool): CPU/I/O 측정으로 동시 실행 수를 조정할지 여부.
+
+    Yields:
+        func 의 결과 (완료 순서, 입력 순서와 다를 수 있음).
+    """
+    n_cpu = multiprocessing.cpu_count()
+    limit = max_workers or n_cpu * (MAX_IO_OVERSUBSCRIBE if adaptive else 1)
+    active = min(n_cpu, limit) if adaptive else limit
+    total = len(items) if hasattr(items, '__len__') else None
+    batches = _batches(items, batch_size)
+
+    cpu_seconds = wall_seconds = 0.0
+    done_batches = 0
+    pending = set()
+    exhausted = False
+
+    # ProcessPoolExecutor 는 필요할 때만 프로세스를 늘리므로 limit 만큼 미리 뜨지 않는다
+    with ProcessPoolExecutor(max_workers=limit) as executor, \
+            tqdm(total=total, desc=desc, disable=not show_progress) as bar:
+        while True:
+            while not exhausted and len(pending) < (window or active):
+                batch = next(batches, None)
+                if batch is None:
+                    exhausted = True
+                    break
+                pending.add(executor.submit(_run_batch, func, batch))
+            if not pending:
+                break
+            gauge("queue_depth", len(pending))
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results, cpu_s, wall_s = future.result()
+                cpu_seconds += cpu_s
+                wall_seconds += wall_s
+                done_batches += 1
+                bar.update(len(results))
+                yield from results
+
+            if adaptive and done_batches >= PROBE_BATCHES:
+                active = adaptive_workers(cpu_seconds, wall_seconds, n_cpu, limit)
+                bar.set_postfix(workers=active)
+                gauge("active_workers", active)
+
+
+class RowWriter:
+    """
+    결과 행(dict)을 CSV 로 바로 흘려 쓰는 기록기.
+
+    flush_rows 개씩 디스크에 쓰고, 끝나면 임시 파일(.part)을 최종 경로로 바꾼다 (중단 시 이전 파일 유지).
+    """
+
+    def __init__(self, path, columns, flush_rows=1000):
+        self.path = path
+        self.columns = list(columns)
+        self.flush_rows = flush_rows
+        self.count = 0
+        self._buffer = []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._tmp_path = path + ".part"
+        self._file = open(self._tmp_path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.flush_rows:
+            self.flush()
+
+    @traced("write", "RowWriter.flush")
+    def flush(self):
+        self._writer.writerows(self._buffer)
+        self.count += len(self._buffer)
+        self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """기록을 버리고 임시 파일 삭제"""
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,166 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from sgd_manifest import refresh_manifest, query_files, FILE_PREFIX, FILE_SUFFIX
+from sgd_trace import traced
+
+# 기본 데이터 경로
+ROOT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
+
+# 자료 주기별 간격 (분)
+FREQ_MINUTES = {'hour': 60, 'day': 1440}
+
+
+@traced("scan")
+def walk_timestamps(root_directory, var):
+    """
+    org/sgd 트리를 os.scandir 로 한 번 순회해 변수의 'YYYYMMDDHHMM' 문자열 목록을 모으는 함수.
+
+    인덱스 DB 없이 쓸 때의 경로. 파일명은 접두어/접미어만 잘라 내고 해석은 parse_timestamps 에서 한 번에 한다.
+    """
+    prefix = f"{FILE_PREFIX}{var}_"
+    width = len(prefix) + 12 + len(FILE_SUFFIX)
+    names = []
+    stack = [os.path.join(root_directory, "org", "sgd")]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif len(entry.name) == width and entry.name.startswith(prefix) and entry.name.endswith(FILE_SUFFIX):
+                    names.append(entry.name[len(prefix):len(prefix) + 12])
+    return names
+
+
+def parse_timestamps(tms):
+    """
+    'YYYYMMDDHHMM' 문자열 배열을 datetime64[m] 로 한 번에 변환 (정렬, 중복 제거).
+
+    숫자가 아닌 문자열이나 존재하지 않는 날짜는 제외한다.
+    """
+    tms = np.asarray(tms, dtype="U12")
+    if tms.size == 0:
+        return np.array([], dtype="datetime64[m]")
+    tms = tms[np.char.isdigit(tms) & (np.char.str_len(tms) == 12)]
+    v = tms.astype(np.int64)
+
+    year, rest = np.divmod(v, 10 ** 8)
+    month, rest = np.divmod(rest, 10 ** 6)
+    day, rest = np.divmod(rest, 10 ** 4)
+    hour, minute = np.divmod(rest, 100)
+
+    ok = (month >= 1) & (month <= 12) & (day >= 1) & (hour < 24) & (minute < 60)
+    year, month, day, hour, minute = year[ok], month[ok], day[ok], hour[ok], minute[ok]
+
+    months = (year - 1970) * 12 + (month - 1)
+    first = months.astype("datetime64[M]").astype("datetime64[D]")
+    days = first + (day - 1).astype("timedelta64[D]")
+    # 31일이 없는 달의 31일 등 (다음 달로 넘어간 값) 제외
+    valid_day = days.astype("datetime64[M]") == months.astype("datetime64[M]")
+    times = (days.astype("datetime64[m]") + (hour * 60 + minute).astype("timedelta64[m]"))[valid_day]
+    return np.unique(times)
+
+
+@traced("scan")
+def scan_timestamps(root_directory, var, start=None, end=None, use_manifest=True):
+    """
+    변수의 존재하는 시각 배열 (datetime64[m], 정렬).
+
+    use_manifest 이면 인덱스 DB 를 갱신해 조회하고 (파일시스템 순회 없음),
+    아니면 walk_timestamps 로 트리를 한 번 순회한다.
+    """
+    if use_manifest:
+        refresh_manifest(root_directory)
+        tms = query_files(root_directory, var=var, start=start, end=end)['tm'].to_numpy()
+        return parse_timestamps(tms)
+
+    times = parse_timestamps(walk_timestamps(root_directory, var))
+    if start is not None:
+        times = times[times >= np.datetime64(pd.Timestamp(start), 'm')]
+    if end is not None:
+        times = times[times <= np.datetime64(pd.Timestamp(end), 'm')]
+    return times
+
+
+def find_gaps(times, freq="hour", start=None, end=None):
+    """
+    시각 배열에서 빠진 구간을 찾는 함수.
+
+    [start, end] 를 freq 간격으로 나눈 기대 시각 중 times 에 없는 것을 연속 구간으로 묶는다.
+    'day' 는 매일 start 의 시:분 시각(기본값 00:00)에 파일이 있는지를 본다.
+
+    Args:
+        times (np.ndarray): datetime64 배열 (정렬, 중복 없음. parse_timestamps 결과).
+        freq (str): 'hour' 또는 'day'.
+        start, end (datetime | str): 검사 구간 (기본값: 자료의 처음/끝을 freq 단위로 내림).
+
+    Returns:
+        pd.DataFrame: start, end, length (빠진 구간 하나당 한 행, length 는 빠진 시각 수).
+    """
+    step = np.timedelta64(FREQ_MINUTES[freq], 'm')
+    times = np.asarray(times, dtype="datetime64[m]")
+    if start is None or end is None:
+        if times.size == 0:
+            return pd.DataFrame({'start': pd.Series(dtype="datetime64[ns]"),
+                                 'end': pd.Series(dtype="datetime64[ns]"),
+                                 'length': pd.Series(dtype=np.int64)})
+        unit = 'h' if freq == "hour" else 'D'
+        start = times[0].astype(f"datetime64[{unit}]") if start is None else start
+        end = times[-1] if end is None else end
+
+    start = np.datetime64(pd.Timestamp(start), 'm')
+    end = np.datetime64(pd.Timestamp(end), 'm')
+    expected = np.arange(start, end + np.timedelta64(1, 'm'), step)
+
+    pos = np.searchsorted(times, expected)
+    present = pos < times.size
+    present[present] = times[pos[present]] == expected[present]
+
+    missing = np.concatenate(([False], ~present, [False])).astype(np.int8)
+    edges = np.diff(missing)
+    run_start = np.flatnonzero(edges == 1)
+    run_end = np.flatnonzero(edges == -1) - 1
+    return pd.DataFrame({
+        'start': expected[run_start].astype("datetime64[ns]"),
+        'end': expected[run_end].astype("datetime64[ns]"),
+        'length': (run_end - run_start + 1).astype(np.int64),
+    })
+
+
+def expand_gaps(gaps, freq="hour"):
+    """빠진 구간을 개별 시각으로 펼침 (기존 missing_dates CSV 형식이 필요할 때)"""
+    lengths = gaps['length'].to_numpy()
+    if lengths.sum() == 0:
+        return pd.DatetimeIndex([])
+    starts = gaps['start'].to_numpy().astype("datetime64[m]")
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    step = np.timedelta64(FREQ_MINUTES[freq], 'm')
+    return pd.DatetimeIndex(np.repeat(starts, lengths) + offsets * step)
+
+
+def monthly_gap_counts(gaps, freq="hour"):
+    """빠진 시각 수의 (연도 × 월) 표 (missing_dates_*_monthly_stats.csv 형식)"""
+    missing = expand_gaps(gaps, freq)
+    counts = pd.Series(1, index=missing).groupby([missing.year, missing.month]).sum()
+    counts.index.names = ["year", "month"]
+    return counts.unstack(fill_value=0)
+
+
+def main():
+    print("\n=== 표준격자 결측 구간 검사 ===")
+    var = input("검사할 변수를 입력하세요 (rn_day, hm, ta, ws_10m) [기본값: ta]: ").strip() or "ta"
+    freq = input("시간 빈도를 입력하세요 ('hour' 또는 'day') [기본값: hour]: ").strip() or "hour"
+
+    gaps = find_gaps(scan_timestamps(ROOT_DIRECTORY, var), freq)
+    print(gaps.to_string(index=False))
+    print(f"결측 구간 {len(gaps):,}개, 결측 시각 {int(gaps['length'].sum()):,}개")
+
+
+if __name__ == "__main__":
+    main()
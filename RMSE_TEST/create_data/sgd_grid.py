@@ -0,0 +1,152 @@
+import os
+import json
+import hashlib
+
+import numpy as np
+
+# 2차원 경위도 캐시 경로
+GEOLOC_CACHE_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA/etc/geoloc"
+
+# 2차원 경위도를 만들 때 한 번에 계산할 행 수
+GEOLOC_BLOCK_ROWS = 256
+
+# 기상청 표준격자 Lambert Conformal Conic 투영 상수 (기상청 lamcproj 기준)
+EARTH_RADIUS_KM = 6371.00877
+STANDARD_LAT1 = 30.0
+STANDARD_LAT2 = 60.0
+
+# 행(ny) 0 번이 남쪽 끝인지 여부 (표준격자 파일은 남→북 순서로 저장됨)
+ROW0_IS_SOUTH = True
+
+
+def grid_geometry(attrs):
+    """
+    표준격자 파일 전역 속성에서 격자 정의를 추출하는 함수.
+
+    map_sx, map_sy 는 기준점(map_slon, map_slat)의 격자 좌표, grid_size 는 km 단위 격자 간격이다.
+
+    Args:
+        attrs (dict): ds.attrs 또는 netCDF4 Dataset.__dict__.
+
+    Returns:
+        dict: nx, ny, grid_size, olon, olat, xo, yo, slat1, slat2, re.
+    """
+    return {
+        'nx': int(attrs['grid_nx']),
+        'ny': int(attrs['grid_ny']),
+        'grid_size': float(attrs['grid_size']),
+        'olon': float(attrs['map_slon']),
+        'olat': float(attrs['map_slat']),
+        'xo': float(attrs['map_sx']),
+        'yo': float(attrs['map_sy']),
+        'slat1': STANDARD_LAT1,
+        'slat2': STANDARD_LAT2,
+        're': EARTH_RADIUS_KM,
+    }
+
+
+def read_geometry(path):
+    """표준격자 파일 전역 속성에서 격자 정의 읽기"""
+    import netCDF4 as nc
+    with nc.Dataset(path) as dataset:
+        return grid_geometry(dataset.__dict__)
+
+
+def geometry_hash(geom):
+    """격자 정의 해시 (캐시 파일 이름에 사용)"""
+    payload = json.dumps({k: geom[k] for k in sorted(geom)}, sort_keys=True).encode()
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+def _lcc_constants(geom):
+    """투영 상수 (re, sf, sn, ro, olon) 계산"""
+    re = geom['re'] / geom['grid_size']
+    slat1 = np.radians(geom['slat1'])
+    slat2 = np.radians(geom['slat2'])
+    olat = np.radians(geom['olat'])
+    sn = np.log(np.cos(slat1) / np.cos(slat2)) / np.log(
+        np.tan(np.pi * 0.25 + slat2 * 0.5) / np.tan(np.pi * 0.25 + slat1 * 0.5))
+    sf = np.tan(np.pi * 0.25 + slat1 * 0.5) ** sn * np.cos(slat1) / sn
+    ro = re * sf / np.tan(np.pi * 0.25 + olat * 0.5) ** sn
+    return re, sf, sn, ro, np.radians(geom['olon'])
+
+
+def lonlat_to_ij(lon, lat, geom):
+    """
+    경위도 → 격자 좌표 (열 i, 행 j, 실수) 변환.
+
+    정수 부분이 격자 인덱스이고, 소수 부분은 양선형 보간 가중치로 쓸 수 있다.
+    """
+    re, sf, sn, ro, olon = _lcc_constants(geom)
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+
+    ra = re * sf / np.tan(np.pi * 0.25 + np.radians(lat) * 0.5) ** sn
+    theta = np.radians(lon) - olon
+    theta = (theta + np.pi) % (2 * np.pi) - np.pi
+    theta *= sn
+
+    i = ra * np.sin(theta) + geom['xo']
+    y = ro - ra * np.cos(theta) + geom['yo']
+    j = y if ROW0_IS_SOUTH else (geom['ny'] - 1) - y
+    return i, j
+
+
+def ij_to_lonlat(i, j, geom):
+    """격자 좌표 (열 i, 행 j) → 경위도 변환"""
+    re, sf, sn, ro, olon = _lcc_constants(geom)
+    i = np.asarray(i, dtype=np.float64)
+    j = np.asarray(j, dtype=np.float64)
+    y = j if ROW0_IS_SOUTH else (geom['ny'] - 1) - j
+
+    xn = i - geom['xo']
+    yn = ro - y + geom['yo']
+    ra = np.hypot(xn, yn)
+    if sn < 0:
+        ra = -ra
+    lat = 2.0 * np.arctan((re * sf / ra) ** (1.0 / sn)) - np.pi * 0.5
+    theta = np.arctan2(xn, yn)
+    lon = theta / sn + olon
+    return np.degrees(lon), np.degrees(lat)
+
+
+def lonlat_grid(geom, cache_dir=GEOLOC_CACHE_DIRECTORY):
+    """
+    격자점 (ny, nx) 의 경도, 위도 2차원 배열 (읽기 전용 memmap).
+
+    격자 정의 해시별로 lonlat_{해시}.npy ((2, ny, nx) float64) 에 한 번만 계산해 두고,
+    이후에는 파일을 매핑만 하므로 여러 프로세스가 같은 배열을 메모리 복사 없이 공유한다.
+
+    Returns:
+        (np.memmap, np.memmap): (lon, lat), 행 순서는 파일의 data 와 같음.
+    """
+    cache_path = os.path.join(cache_dir, f"lonlat_{geometry_hash(geom)}.npy")
+    if not os.path.exists(cache_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        ny, nx = geom['ny'], geom['nx']
+        tmp_path = cache_path + ".tmp.npy"
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float64, shape=(2, ny, nx))
+        ii = np.arange(nx, dtype=np.float64)
+        for start in range(0, ny, GEOLOC_BLOCK_ROWS):
+            stop = min(start + GEOLOC_BLOCK_ROWS, ny)
+            jj = np.arange(start, stop, dtype=np.float64)[:, None]
+            out[0, start:stop], out[1, start:stop] = ij_to_lonlat(ii[None, :], jj, geom)
+        out.flush()
+        del out
+        os.replace(tmp_path, cache_path)
+    grid = np.load(cache_path, mmap_mode="r")
+    return grid[0], grid[1]
+
+
+def nearest_index(lon, lat, geom):
+    """
+    경위도 → 가장 가까운 격자점 인덱스 (격자 전체를 탐색하지 않는 해석적 역변환).
+
+    Returns:
+        (np.ndarray, np.ndarray, np.ndarray): (열 i, 행 j, 격자 안 여부). 격자 밖 점의 i, j 는 -1.
+    """
+    i, j = lonlat_to_ij(lon, lat, geom)
+    ii = np.rint(i).astype(np.int64)
+    jj = np.rint(j).astype(np.int64)
+    inside = (ii >= 0) & (ii < geom['nx']) & (jj >= 0) & (jj < geom['ny'])
+    return np.where(inside, ii, -1), np.where(inside, jj, -1), inside
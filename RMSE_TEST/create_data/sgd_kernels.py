@@ -0,0 +1,144 @@
+import numpy as np
+
+try:
+    import numba  # 있으면 한 번의 루프로 컴파일 (없으면 블록 단위 NumPy)
+except ImportError:
+    numba = None
+
+# 결측값 (저장된 정수값 기준)
+MISSING_VALUE = -9990
+
+# NumPy 경로에서 한 번에 볼 격자 수 (임시 배열이 CPU 캐시 안에 머무는 크기)
+BLOCK_CELLS = 1 << 16
+
+# masked_stats 결과 키 (값은 저장된 단위 그대로, 물리 단위는 scaled_stats 로 변환)
+STAT_KEYS = ("n_cells", "missing", "count", "min", "max", "sum", "sumsq", "zero", "negative", "outlier")
+
+
+def _stats_numpy(flat, missing, lo, hi, block=BLOCK_CELLS):
+    """블록 단위 NumPy 경로. 임시 배열은 블록 크기(기본 64K 격자)로 제한된다"""
+    floating = np.issubdtype(flat.dtype, np.floating)
+    n_missing = count = zero = negative = outlier = 0
+    total = sumsq = 0.0
+    vmin = vmax = None
+    for start in range(0, flat.size, block):
+        b = flat[start:start + block]
+        keep = b != missing
+        if floating:
+            keep &= b == b   # NaN 도 결측
+        v = b[keep]
+        n_missing += b.size - v.size
+        if v.size == 0:
+            continue
+        count += v.size
+        bmin, bmax = v.min(), v.max()
+        vmin = bmin if vmin is None or bmin < vmin else vmin
+        vmax = bmax if vmax is None or bmax > vmax else vmax
+        vf = v.astype(np.float64)
+        total += vf.sum()
+        sumsq += np.dot(vf, vf)
+        zero += np.count_nonzero(v == 0)
+        negative += np.count_nonzero(v < 0)
+        if lo is not None:
+            outlier += np.count_nonzero((v < lo) | (v > hi))
+    return n_missing, count, vmin, vmax, total, sumsq, zero, negative, outlier
+
+
+if numba is not None:
+    @numba.njit(cache=True, nogil=True)
+    def _stats_numba(flat, missing, lo, hi, check_range):
+        n_missing = count = zero = negative = outlier = 0
+        total = sumsq = 0.0
+        vmin = flat[0]
+        vmax = flat[0]
+        for k in range(flat.size):
+            x = flat[k]
+            if x == missing or x != x:
+                n_missing += 1
+                continue
+            if count == 0 or x < vmin:
+                vmin = x
+            if count == 0 or x > vmax:
+                vmax = x
+            count += 1
+            xf = float(x)
+            total += xf
+            sumsq += xf * xf
+            if x == 0:
+                zero += 1
+            elif x < 0:
+                negative += 1
+            if check_range and (x < lo or x > hi):
+                outlier += 1
+        return n_missing, count, vmin, vmax, total, sumsq, zero, negative, outlier
+else:
+    _stats_numba = None
+
+
+def _merge(a, b):
+    """블록별 (n_missing, count, min, max, sum, sumsq, zero, negative, outlier) 결과 합치기"""
+    sums = tuple(x + y for x, y in zip(a[4:], b[4:]))
+    if b[1] == 0:   # 유효 격자가 없는 블록의 min/max 는 의미 없음
+        return (a[0] + b[0],) + tuple(a[1:4]) + sums
+    if a[1] == 0:
+        return (a[0] + b[0],) + tuple(b[1:4]) + sums
+    return (a[0] + b[0], a[1] + b[1], min(a[2], b[2]), max(a[3], b[3])) + sums
+
+
+def masked_stats(raw, missing=MISSING_VALUE, lo=None, hi=None, use_numba=None):
+    """
+    결측을 뺀 격자의 개수/최소/최대/합/제곱합/0값/음수/범위 밖 개수를 한 번의 순회로 계산하는 함수.
+
+    저장된 값 그대로 계산하므로 lo, hi 도 같은 단위(정수 기준값, sgd_packed.raw_threshold) 로 준다.
+    numba 가 있으면 컴파일된 루프 하나로 임시 배열 없이, 없으면 BLOCK_CELLS 단위 NumPy 로 계산한다.
+
+    Args:
+        raw (np.ndarray): data 배열 (memmap 가능, 정수 또는 float).
+        missing: 결측값 (float 배열은 NaN 도 결측).
+        lo, hi: 유효 범위 (None 이면 outlier 는 0).
+        use_numba (bool): None 이면 설치되어 있을 때 사용.
+
+    Returns:
+        dict: STAT_KEYS. 유효 격자가 없으면 min, max 는 None.
+    """
+    flat = np.asarray(raw).reshape(-1)   # memmap 도 복사 없이 일반 배열 보기로
+    if use_numba is None:
+        use_numba = _stats_numba is not None
+    if use_numba and flat.size:
+        if _stats_numba is None:
+            raise ImportError("numba 가 설치되어 있지 않습니다.")
+        check_range = lo is not None
+        bounds = (lo, hi) if check_range else (0, 0)
+        # numba 는 big-endian(>i2, 표준격자 memmap) 을 받지 못하므로 블록 단위로 native 로 바꿔 넘긴다
+        native = flat.dtype.newbyteorder("=")
+        step = flat.size if flat.dtype.isnative else BLOCK_CELLS
+        values = None
+        for start in range(0, flat.size, step):
+            block = flat[start:start + step]
+            if not block.dtype.isnative:
+                block = block.astype(native)
+            part = _stats_numba(block, native.type(missing), native.type(bounds[0]),
+                                native.type(bounds[1]), check_range)
+            values = part if values is None else _merge(values, part)
+    else:
+        values = _stats_numpy(flat, missing, lo, hi)
+
+    n_missing, count, vmin, vmax, total, sumsq, zero, negative, outlier = values
+    cast = int if np.issubdtype(flat.dtype, np.integer) else float
+    return {
+        'n_cells': int(flat.size), 'missing': int(n_missing), 'count': int(count),
+        'min': cast(vmin) if count else None, 'max': cast(vmax) if count else None,
+        'sum': float(total), 'sumsq': float(sumsq),
+        'zero': int(zero), 'negative': int(negative), 'outlier': int(outlier),
+    }
+
+
+def scaled_stats(stats, data_scale):
+    """masked_stats 결과를 물리 단위 min, max, mean, std 로 변환 (유효 격자가 없으면 None)"""
+    n = stats['count']
+    if n == 0:
+        return {'min': None, 'max': None, 'mean': None, 'std': None}
+    mean = stats['sum'] / n
+    var = max(stats['sumsq'] / n - mean * mean, 0.0)
+    return {'min': stats['min'] / data_scale, 'max': stats['max'] / data_scale,
+            'mean': mean / data_scale, 'std': var ** 0.5 / data_scale}
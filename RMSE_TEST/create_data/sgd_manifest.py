@@ -0,0 +1,213 @@
+import os
+import sqlite3
+import hashlib
+
+import pandas as pd
+
+from sgd_trace import traced
+
+# 기본 데이터 경로 (org/sgd/YYYY/MM/DD/sfc_grid_{var}_{YYYYMMDDHHMM}.nc)
+ROOT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
+
+# 인덱스 DB 위치 (ROOT_DIRECTORY 기준 상대 경로)
+MANIFEST_RELPATH = "etc/manifest/sgd_manifest.sqlite"
+
+FILE_PREFIX = "sfc_grid_"
+FILE_SUFFIX = ".nc"
+HASH_CHUNK = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    var      TEXT    NOT NULL,
+    tm       TEXT    NOT NULL,   -- YYYYMMDDHHMM
+    path     TEXT    NOT NULL,
+    dir      TEXT    NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash     TEXT,
+    PRIMARY KEY (var, tm)
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+CREATE TABLE IF NOT EXISTS dirs (
+    path     TEXT    PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+
+def parse_sgd_filename(filename):
+    """sfc_grid_{var}_{YYYYMMDDHHMM}.nc 파일명에서 (var, tm) 추출 (형식이 다르면 None)"""
+    if not (filename.startswith(FILE_PREFIX) and filename.endswith(FILE_SUFFIX)):
+        return None
+    stem = filename[len(FILE_PREFIX):-len(FILE_SUFFIX)]
+    var, sep, tm = stem.rpartition("_")
+    if not sep or not var or len(tm) != 12 or not tm.isdigit():
+        return None
+    return var, tm
+
+
+def file_hash(path):
+    """파일 내용 해시 (blake2b-128)"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def open_manifest(root_directory=ROOT_DIRECTORY, db_path=None):
+    """인덱스 DB 연결 (없으면 생성)"""
+    db_path = db_path or os.path.join(root_directory, MANIFEST_RELPATH)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _iter_day_dirs(sgd_root):
+    """org/sgd/YYYY/MM/DD 디렉토리와 mtime 을 순회"""
+    if not os.path.isdir(sgd_root):
+        return
+    for year in sorted(os.scandir(sgd_root), key=lambda e: e.name):
+        if not (year.is_dir() and len(year.name) == 4 and year.name.isdigit()):
+            continue
+        for month in sorted(os.scandir(year.path), key=lambda e: e.name):
+            if not (month.is_dir() and len(month.name) == 2 and month.name.isdigit()):
+                continue
+            for day in sorted(os.scandir(month.path), key=lambda e: e.name):
+                if day.is_dir() and len(day.name) == 2 and day.name.isdigit():
+                    yield day.path, day.stat().st_mtime_ns
+
+
+def _sync_day_dir(conn, dirpath, with_hash):
+    """하나의 일 디렉토리 내용을 DB와 맞추고 (추가, 갱신, 삭제) 개수를 반환"""
+    known = {row[0]: (row[1], row[2])
+             for row in conn.execute("SELECT path, size, mtime_ns FROM files WHERE dir = ?", (dirpath,))}
+    added = updated = 0
+    seen = set()
+
+    with os.scandir(dirpath) as entries:
+        for entry in entries:
+            parsed = parse_sgd_filename(entry.name)
+            if parsed is None or not entry.is_file():
+                continue
+            st = entry.stat()
+            seen.add(entry.path)
+            if known.get(entry.path) == (st.st_size, st.st_mtime_ns):
+                continue
+            digest = file_hash(entry.path) if with_hash else None
+            conn.execute(
+                "INSERT OR REPLACE INTO files (var, tm, path, dir, size, mtime_ns, hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*parsed, entry.path, dirpath, st.st_size, st.st_mtime_ns, digest))
+            if entry.path in known:
+                updated += 1
+            else:
+                added += 1
+
+    gone = [p for p in known if p not in seen]
+    conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in gone])
+    return added, updated, len(gone)
+
+
+@traced("scan")
+def refresh_manifest(root_directory=ROOT_DIRECTORY, db_path=None, full=False, with_hash=True):
+    """
+    org/sgd 트리를 인덱스 DB에 반영하는 함수.
+
+    일(DD) 디렉토리의 mtime 이 저장값과 다를 때만 그 디렉토리를 다시 읽는다.
+    다운로더는 rename 으로 파일을 넣으므로 디렉토리 mtime 이 항상 갱신된다.
+    다른 경로로 파일 내용을 덮어쓴 경우에는 full=True 로 전체를 다시 확인한다.
+
+    Args:
+        root_directory (str): 데이터 경로 (org/sgd 상위).
+        db_path (str): 인덱스 DB 경로 (기본값: {root}/etc/manifest/sgd_manifest.sqlite).
+        full (bool): 모든 일 디렉토리를 다시 읽을지 여부.
+        with_hash (bool): 새로 추가/변경된 파일의 내용 해시 계산 여부.
+
+    Returns:
+        dict: {'dirs_total', 'dirs_scanned', 'added', 'updated', 'removed'}.
+    """
+    conn = open_manifest(root_directory, db_path)
+    stats = {'dirs_total': 0, 'dirs_scanned': 0, 'added': 0, 'updated': 0, 'removed': 0}
+    try:
+        with conn:
+            known_dirs = dict(conn.execute("SELECT path, mtime_ns FROM dirs"))
+            sgd_root = os.path.join(root_directory, "org", "sgd")
+
+            for dirpath, mtime_ns in _iter_day_dirs(sgd_root):
+                stats['dirs_total'] += 1
+                if not full and known_dirs.pop(dirpath, None) == mtime_ns:
+                    continue
+                known_dirs.pop(dirpath, None)
+                added, updated, removed = _sync_day_dir(conn, dirpath, with_hash)
+                conn.execute("INSERT OR REPLACE INTO dirs (path, mtime_ns) VALUES (?, ?)", (dirpath, mtime_ns))
+                stats['dirs_scanned'] += 1
+                stats['added'] += added
+                stats['updated'] += updated
+                stats['removed'] += removed
+
+            # 사라진 디렉토리 정리
+            for dirpath in known_dirs:
+                cur = conn.execute("DELETE FROM files WHERE dir = ?", (dirpath,))
+                stats['removed'] += cur.rowcount
+                conn.execute("DELETE FROM dirs WHERE path = ?", (dirpath,))
+    finally:
+        conn.close()
+    return stats
+
+
+@traced("scan")
+def query_files(root_directory=ROOT_DIRECTORY, var=None, start=None, end=None,
+                min_size=None, max_size=None, db_path=None):
+    """
+    인덱스 DB에서 파일 목록을 조회하는 함수 (파일시스템 접근 없음).
+
+    Args:
+        root_directory (str): 데이터 경로.
+        var (str): 변수명 (None 이면 전체).
+        start, end (str | datetime): 조회 구간 (양 끝 포함, 'YYYYMMDDHHMM' 또는 datetime).
+        min_size, max_size (int): 파일 크기 조건 (min_size 이상, max_size 미만).
+        db_path (str): 인덱스 DB 경로.
+
+    Returns:
+        pd.DataFrame: var, tm, path, size, mtime_ns, hash 컬럼 (tm 순 정렬).
+    """
+    where, params = [], []
+    if var is not None:
+        where.append("var = ?")
+        params.append(var)
+    if start is not None:
+        where.append("tm >= ?")
+        params.append(start if isinstance(start, str) else start.strftime("%Y%m%d%H%M"))
+    if end is not None:
+        where.append("tm <= ?")
+        params.append(end if isinstance(end, str) else end.strftime("%Y%m%d%H%M"))
+    if min_size is not None:
+        where.append("size >= ?")
+        params.append(min_size)
+    if max_size is not None:
+        where.append("size < ?")
+        params.append(max_size)
+
+    sql = "SELECT var, tm, path, size, mtime_ns, hash FROM files"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY var, tm"
+
+    conn = open_manifest(root_directory, db_path)
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+
+def main():
+    print("\n=== 표준격자 파일 인덱스 갱신 ===")
+    full = input("전체 재검사를 하시겠습니까? (y/N): ").strip().lower() == "y"
+    stats = refresh_manifest(ROOT_DIRECTORY, full=full)
+    print(f"일 디렉토리: {stats['dirs_total']:,}개 중 {stats['dirs_scanned']:,}개 재검사")
+    print(f"추가: {stats['added']:,}, 갱신: {stats['updated']:,}, 삭제: {stats['removed']:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import os
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")   # 화면 없이 파일로만 저장 (프로세스 풀 워커에서도 동일)
+import matplotlib.image as mpimg
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from sgd_grid import read_geometry, geometry_hash, lonlat_to_ij, ij_to_lonlat, ROW0_IS_SOUTH
+from sgd_mmap import open_sgd_data
+from sgd_packed import PackedGrid
+from sgd_manifest import parse_sgd_filename
+from sgd_executor import bounded_map
+from sgd_trace import trace_run, traced, span
+
+# 기본 경로
+ROOT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
+OUTPUT_DIRECTORY = "/home/papalio/test_research/RMSE_TEST/IMG"
+
+# 배경(해안선, 국경, 경위선) 캐시 경로
+CACHE_DIRECTORY = os.path.join(ROOT_DIRECTORY, "etc", "map_cache")
+
+MISSING_VALUE = -9990
+
+# 변수별 표시 방법
+VAR_STYLES = {
+    'ta': {'cmap': "RdBu_r", 'vmin': -30, 'vmax': 30, 'label': "Temperature (°C)", 'title': "Surface Air Temperature"},
+    'hm': {'cmap': "YlGnBu", 'vmin': 0, 'vmax': 100, 'label': "Relative Humidity (%)", 'title': "Relative Humidity"},
+    'rn_day': {'cmap': "Blues", 'vmin': 0, 'vmax': 100, 'label': "Precipitation (mm)", 'title': "Daily Precipitation"},
+    'ws_10m': {'cmap': "viridis", 'vmin': 0, 'vmax': 20, 'label': "Wind Speed (m/s)", 'title': "10m Wind Speed"},
+}
+
+# 경위선 간격 (도)
+GRATICULE_STEP = 1.0
+
+# 워커별로 한 번만 만드는 렌더러 (격자 정의 해시, 변수, 해상도, 그림 크기, dpi) → MapRenderer
+_RENDERERS = {}
+
+
+def _to_plot_y(j, geom):
+    """격자 행 → 그림 y 좌표 (항상 남쪽이 아래)"""
+    return j if ROW0_IS_SOUTH else (geom['ny'] - 1) - j
+
+
+def _nan_joined(lines):
+    """선 목록을 NaN 으로 구분한 (N, 2) 배열 하나로 합침 (선 하나의 Line2D 로 그릴 수 있음)"""
+    parts = []
+    for line in lines:
+        parts.append(line)
+        parts.append(np.full((1, 2), np.nan))
+    return np.concatenate(parts) if parts else np.empty((0, 2))
+
+
+def build_background(geom, resolution="i", step=GRATICULE_STEP):
+    """
+    Basemap 해안선/국경을 표준격자 좌표 (열 i, 아래가 남쪽인 행 y) 로 변환하는 함수.
+
+    Basemap 은 여기서 한 번만 만들고, 그림은 격자 좌표에 그리므로 자료를 투영할 필요가 없다.
+
+    Returns:
+        dict: coast, country, graticule ((N, 2) NaN 구분 배열),
+              lat_ticks / lon_ticks ((값, 축 위치) 배열, 왼쪽/아래 테두리와 만나는 위치).
+    """
+    from mpl_toolkits.basemap import Basemap
+
+    nx, ny = geom['nx'], geom['ny']
+    corner_lon, corner_lat = ij_to_lonlat([0, nx - 1], [0, ny - 1] if ROW0_IS_SOUTH else [ny - 1, 0], geom)
+    m = Basemap(projection="lcc", resolution=resolution,
+                llcrnrlon=corner_lon[0], llcrnrlat=corner_lat[0],
+                urcrnrlon=corner_lon[1], urcrnrlat=corner_lat[1],
+                lat_0=geom['olat'], lon_0=geom['olon'], lat_1=geom['slat1'], lat_2=geom['slat2'],
+                rsphere=geom['re'] * 1000.0)
+
+    def to_grid(segments):
+        out = []
+        for seg in segments:
+            x, y = np.asarray(seg, dtype=np.float64).T
+            lon, lat = m(x, y, inverse=True)
+            i, j = lonlat_to_ij(lon, lat, geom)
+            out.append(np.column_stack([i, _to_plot_y(j, geom)]))
+        return _nan_joined(out)
+
+    # 격자 전체를 덮는 경위도 범위에서 경위선과 테두리 교차점 계산
+    edge_i = np.concatenate([np.arange(nx), np.full(ny, nx - 1), np.arange(nx), np.zeros(ny)])
+    edge_j = np.concatenate([np.zeros(nx), np.arange(ny), np.full(nx, ny - 1), np.arange(ny)])
+    edge_lon, edge_lat = ij_to_lonlat(edge_i, edge_j, geom)
+    lons = np.arange(np.floor(edge_lon.min()), np.ceil(edge_lon.max()) + step, step)
+    lats = np.arange(np.floor(edge_lat.min()), np.ceil(edge_lat.max()) + step, step)
+    fine_lon = np.linspace(lons[0], lons[-1], 400)
+    fine_lat = np.linspace(lats[0], lats[-1], 400)
+
+    graticule, lat_ticks, lon_ticks = [], [], []
+    for lat in lats:
+        i, j = lonlat_to_ij(fine_lon, np.full_like(fine_lon, lat), geom)
+        y = _to_plot_y(j, geom)
+        graticule.append(np.column_stack([i, y]))
+        if i[0] < 0 < i[-1]:
+            lat_ticks.append((lat, np.interp(0.0, i, y)))
+    for lon in lons:
+        i, j = lonlat_to_ij(np.full_like(fine_lat, lon), fine_lat, geom)
+        y = _to_plot_y(j, geom)
+        graticule.append(np.column_stack([i, y]))
+        if y[0] < 0 < y[-1]:
+            lon_ticks.append((lon, np.interp(0.0, y, i)))
+
+    return {
+        'coast': to_grid(m.coastsegs),
+        'country': to_grid(m.cntrysegs),
+        'graticule': _nan_joined(graticule),
+        'lat_ticks': np.array(lat_ticks).reshape(-1, 2),
+        'lon_ticks': np.array(lon_ticks).reshape(-1, 2),
+    }
+
+
+def load_background(geom, resolution="i", cache_dir=CACHE_DIRECTORY):
+    """디스크 캐시(background_{격자 해시}_{해상도}.npz)에서 배경을 읽고, 없으면 만들어 저장"""
+    cache_path = os.path.join(cache_dir, f"background_{geometry_hash(geom)}_{resolution}.npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as f:
+            return {key: f[key] for key in f.files}
+
+    background = build_background(geom, resolution)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = cache_path + ".tmp.npz"
+    np.savez(tmp_path, **background)
+    os.replace(tmp_path, cache_path)
+    return background
+
+
+def base_axes(geom, background, figsize=(10, 8), dpi=150, animated=False):
+    """
+    해안선, 국경, 경위선을 그린 격자 좌표 축 (pyplot 전역 상태를 쓰지 않는 Figure).
+
+    Returns:
+        (Figure, Axes, list): 그림, 축, 배경 선 Line2D 목록.
+    """
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0.08, 0.06, 0.78, 0.86])
+    nx, ny = geom['nx'], geom['ny']
+    ax.set_xlim(-0.5, nx - 0.5)
+    ax.set_ylim(-0.5, ny - 0.5)
+    ax.set_aspect("equal")
+
+    lines = [
+        ax.plot(*background['graticule'].T, color="gray", lw=0.4, ls="--", animated=animated)[0],
+        ax.plot(*background['country'].T, color="black", lw=0.6, animated=animated)[0],
+        ax.plot(*background['coast'].T, color="black", lw=0.6, animated=animated)[0],
+    ]
+    ax.set_yticks(background['lat_ticks'][:, 1])
+    ax.set_yticklabels([f"{v:g}°N" for v in background['lat_ticks'][:, 0]])
+    ax.set_xticks(background['lon_ticks'][:, 1])
+    ax.set_xticklabels([f"{v:g}°E" for v in background['lon_ticks'][:, 0]])
+    ax.tick_params(labelsize=8, length=0)
+    return fig, ax, lines
+
+
+class MapRenderer:
+    """
+    같은 격자/변수의 지도를 여러 장 그리는 렌더러.
+
+    그림, 축, 컬러바, 눈금은 처음 한 번만 그려 배경 이미지로 저장해 두고, 장마다 배경을 복원한 뒤
+    자료 이미지와 해안선/경위선, 제목만 다시 그린다 (blit). 자료는 그림 픽셀 수에 맞춰 솎아서 그린다.
+    """
+
+    def __init__(self, geom, background, var, figsize=(10, 8), dpi=150):
+        style = VAR_STYLES.get(var, {'cmap': "viridis", 'vmin': None, 'vmax': None, 'label': var, 'title': var})
+        self.geom = geom
+        self.style = style
+        self.fig, self.ax, self.lines = base_axes(geom, background, figsize, dpi, animated=True)
+
+        nx, ny = geom['nx'], geom['ny']
+        axes_pixels = self.ax.get_position().width * figsize[0] * dpi
+        self.stride = max(1, int(nx // axes_pixels))
+        shape = (-(-ny // self.stride), -(-nx // self.stride))
+        extent = (-0.5, -0.5 + shape[1] * self.stride, -0.5, -0.5 + shape[0] * self.stride)
+
+        cmap = matplotlib.colormaps[style['cmap']].copy()
+        cmap.set_bad(alpha=0.0)
+        self.image = self.ax.imshow(np.full(shape, np.nan, dtype=np.float32), origin="lower", extent=extent,
+                                    cmap=cmap, vmin=style['vmin'], vmax=style['vmax'],
+                                    interpolation="nearest", zorder=0, animated=True)
+        self.ax.set_xlim(-0.5, nx - 0.5)
+        self.ax.set_ylim(-0.5, ny - 0.5)
+        cax = self.fig.add_axes([0.88, 0.15, 0.025, 0.68])
+        self.fig.colorbar(self.image, cax=cax).set_label(style['label'])
+        self.title = self.ax.set_title("", animated=True)
+
+        self.fig.canvas.draw()
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+    @traced("decode", "MapRenderer.prepare")
+    def prepare(self, data, data_scale):
+        """저장된 정수값 → 솎아낸 물리 단위 float32 (결측은 NaN, 남쪽이 아래)"""
+        step = slice(None, None, self.stride)
+        values = PackedGrid(data, data_scale, MISSING_VALUE).window(step, step).physical()
+        return values if ROW0_IS_SOUTH else values[::-1]
+
+    def render(self, values, title, output_path):
+        """배경을 복원하고 바뀌는 요소만 그려 PNG 로 저장 (임시 파일 후 교체)"""
+        canvas = self.fig.canvas
+        self.image.set_data(values)
+        self.title.set_text(title)
+        canvas.restore_region(self.background)
+        self.ax.draw_artist(self.image)
+        for line in self.lines:
+            self.ax.draw_artist(line)
+        self.ax.draw_artist(self.title)
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        tmp_path = output_path + ".part"
+        with span("imsave", "write"):
+            mpimg.imsave(tmp_path, np.asarray(canvas.buffer_rgba()), format="png")
+            os.replace(tmp_path, output_path)
+
+
+def format_title(var, tm):
+    """'Surface Air Temperature (2020-01-01 00:00)' 형식의 제목"""
+    name = VAR_STYLES.get(var, {}).get('title', var)
+    return f"{name} ({tm[:4]}-{tm[4:6]}-{tm[6:8]} {tm[8:10]}:{tm[10:12]})"
+
+
+def _get_renderer(geom, var, resolution, figsize, dpi, cache_dir):
+    key = (geometry_hash(geom), var, resolution, tuple(figsize), dpi)
+    if key not in _RENDERERS:
+        _RENDERERS[key] = MapRenderer(geom, load_background(geom, resolution, cache_dir), var, figsize, dpi)
+    return _RENDERERS[key]
+
+
+def _render_task(task):
+    """워커에서 파일 하나를 그림 (렌더러는 워커마다 한 번만 생성). (입력 경로, 출력 경로, 오류) 반환"""
+    path, output_path, geom, options = task
+    try:
+        var, tm = parse_sgd_filename(os.path.basename(path))
+        renderer = _get_renderer(geom, var, **options)
+        grid = open_sgd_data(path)
+        renderer.render(renderer.prepare(grid['data'], grid['data_scale']), format_title(var, tm), output_path)
+        return path, output_path, None
+    except Exception as e:
+        return path, output_path, str(e)
+
+
+def render_files(paths, output_dir=OUTPUT_DIRECTORY, resolution="i", figsize=(10, 8), dpi=150,
+                 overwrite=False, max_workers=None, cache_dir=CACHE_DIRECTORY):
+    """
+    표준격자 파일 목록을 프로세스 풀에서 지도 PNG 로 저장하는 함수.
+
+    출력 파일명은 입력 파일명의 .nc 를 .png 로 바꾼 것 (예: IMG/sfc_grid_ta_202001010000.png).
+    격자 정의는 첫 파일에서 한 번 읽고 모든 파일이 같은 격자라고 본다.
+    배경 캐시는 워커를 띄우기 전에 만들어 두므로 Basemap 은 처음 한 번만 생성된다.
+
+    Returns:
+        dict: {입력 경로: 오류 메시지} (실패한 파일만).
+    """
+    tasks = []
+    for path in paths:
+        output_path = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + ".png")
+        if overwrite or not os.path.exists(output_path):
+            tasks.append((path, output_path))
+    if not tasks:
+        return {}
+
+    geom = read_geometry(tasks[0][0])
+    load_background(geom, resolution, cache_dir)
+    options = {'resolution': resolution, 'figsize': tuple(figsize), 'dpi': dpi, 'cache_dir': cache_dir}
+
+    failed = {}
+    items = [(path, output_path, geom, options) for path, output_path in tasks]
+    for path, output_path, error in bounded_map(_render_task, items, max_workers=max_workers,
+                                                 batch_size=8, adaptive=False, desc="지도 저장"):
+        if error is not None:
+            failed[path] = error
+    return failed
+
+
+@trace_run("sgd_map_render")
+def main():
+    from sgd_manifest import refresh_manifest, query_files
+
+    print("\n=== 표준격자 지도 일괄 저장 ===")
+    var = input("변수를 입력하세요 (rn_day, hm, ta, ws_10m) [기본값: ta]: ").strip() or "ta"
+    year = input("연도를 입력하세요 [기본값: 2020]: ").strip() or "2020"
+    hour = input("시각(HH)을 입력하세요 (전체: all) [기본값: 00]: ").strip() or "00"
+    resolution = input("해안선 해상도를 입력하세요 (c, l, i, h) [기본값: i]: ").strip() or "i"
+
+    refresh_manifest(ROOT_DIRECTORY)
+    files = query_files(ROOT_DIRECTORY, var=var, start=f"{year}01010000", end=f"{year}12312359")
+    if hour != "all":
+        files = files[files['tm'].str[8:10] == hour.zfill(2)]
+    print(f"대상 파일: {len(files):,}개")
+
+    failed = render_files(files['path'].tolist(), OUTPUT_DIRECTORY, resolution=resolution)
+    print(f"📊 지도 저장 완료: {OUTPUT_DIRECTORY} (실패 {len(failed)}개)")
+    for path, error in list(failed.items())[:10]:
+        print(f"  ❌ {path}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+
+from sgd_netcdf import detect_format, read_classic_header
+from sgd_trace import span, count
+
+try:
+    import h5py  # NetCDF-4 파일에서 연속 저장(비압축) 변수의 오프셋을 얻을 때만 사용
+except ImportError:
+    h5py = None
+
+# SSP 정적 자료 (test_5.ipynb 의 SSP_LAT.bin, SSP_LON.bin, SSP_Orography.bin)
+SSP_SHAPE = (601, 751)
+SSP_DTYPE = np.float64
+SSP_FILES = {
+    'lat': "SSP_LAT.bin",
+    'lon': "SSP_LON.bin",
+    'orog': "SSP_Orography.bin",
+}
+
+
+def open_static_field(path, shape=SSP_SHAPE, dtype=SSP_DTYPE):
+    """
+    np.fromfile 대신 읽기 전용 np.memmap 으로 정적 자료를 여는 함수.
+
+    복사본을 만들지 않으므로 같은 파일을 여는 모든 프로세스가 페이지 캐시를 공유한다.
+    """
+    expected = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    actual = os.path.getsize(path)
+    if actual != expected:
+        raise ValueError(f"{path}: 크기 {actual} bytes, 기대값 {expected} bytes ({shape}, {np.dtype(dtype)})")
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+def open_ssp_fields(directory, shape=SSP_SHAPE):
+    """SSP 위도/경도/지형고도 memmap 묶음 {'lat', 'lon', 'orog'}"""
+    return {name: open_static_field(os.path.join(directory, filename), shape)
+            for name, filename in SSP_FILES.items()}
+
+
+def _hdf5_contiguous_offset(path, name):
+    """NetCDF-4 변수가 연속 저장(청크/압축 없음)이면 (offset, dtype, shape), 아니면 None"""
+    if h5py is None:
+        return None
+    with h5py.File(path, "r") as f:
+        if name not in f:
+            return None
+        dataset = f[name]
+        if dataset.chunks is not None or dataset.compression is not None:
+            return None
+        offset = dataset.id.get_offset()
+        if offset is None:
+            return None
+        scale = dataset.attrs.get('data_scale')
+        attrs = {'data_scale': float(np.asarray(scale).ravel()[0])} if scale is not None else {}
+        return offset, dataset.dtype, dataset.shape, attrs
+
+
+def open_sgd_data(path, name="data"):
+    """
+    표준격자 파일의 data 변수를 가능한 경우 memmap 으로 여는 함수.
+
+    classic 형식은 헤더의 begin 오프셋으로, NetCDF-4 는 변수가 연속 저장일 때만 memmap 을 만든다.
+    압축/청크 저장된 NetCDF-4 는 netCDF4 로 정수값을 그대로 읽는다 (마스크 배열 변환 없음).
+
+    Returns:
+        dict: {'data': 배열 (저장된 정수값), 'data_scale': float, 'mapped': memmap 여부}
+    """
+    with span("open_sgd_data", "open"):
+        grid = _open_sgd_data(path, name)
+    count("bytes_read", grid['data'].nbytes)
+    count("files_mapped" if grid['mapped'] else "files_decoded")
+    return grid
+
+
+def _open_sgd_data(path, name):
+    with open(path, 'rb') as f:
+        fmt = detect_format(f.read(8))
+        if fmt == "classic":
+            f.seek(0)
+            header = read_classic_header(f)
+            var = header['variables'][name]
+            data = np.memmap(path, dtype=var['dtype'], mode="r", offset=var['begin'], shape=var['shape'])
+            return {'data': data, 'data_scale': float(var['attrs'].get('data_scale', 1.0)), 'mapped': True}
+
+    if fmt == "hdf5":
+        located = _hdf5_contiguous_offset(path, name)
+        if located is not None:
+            offset, dtype, shape, attrs = located
+            data = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+            return {'data': data, 'data_scale': attrs.get('data_scale', 1.0), 'mapped': True}
+
+    import netCDF4 as nc
+    with span("netcdf_decode", "decode"), nc.Dataset(path) as dataset:
+        variable = dataset.variables[name]
+        variable.set_auto_maskandscale(False)
+        return {'data': variable[:], 'data_scale': float(getattr(variable, 'data_scale', 1.0)), 'mapped': False}
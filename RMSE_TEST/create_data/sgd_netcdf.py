@@ -0,0 +1,263 @@
+import struct
+
+# NetCDF 파일 시그니처
+CLASSIC_MAGIC = b"CDF"                       # CDF-1/2/5 (classic, 64bit offset, 64bit data)
+HDF5_MAGIC = b"\x89HDF\r\n\x1a\n"            # NetCDF-4 (HDF5 기반)
+
+# 표준격자 파일이 반드시 가져야 하는 구조
+REQUIRED_DIMS = ("ny", "nx")
+REQUIRED_VAR = "data"
+
+# classic 헤더 태그
+_NC_DIMENSION = 0x0A
+_NC_VARIABLE = 0x0B
+_NC_ATTRIBUTE = 0x0C
+
+# nc_type -> (struct 형식, 바이트 크기, numpy dtype 문자열)
+NC_TYPES = {
+    1: ("b", 1, "i1"),
+    2: ("c", 1, "S1"),
+    3: ("h", 2, ">i2"),
+    4: ("i", 4, ">i4"),
+    5: ("f", 4, ">f4"),
+    6: ("d", 8, ">f8"),
+    7: ("B", 1, "u1"),
+    8: ("H", 2, ">u2"),
+    9: ("I", 4, ">u4"),
+    10: ("q", 8, ">i8"),
+    11: ("Q", 8, ">u8"),
+}
+
+
+class NetCDFHeaderError(Exception):
+    """NetCDF 헤더가 손상되었거나 표준격자 구조가 아님"""
+
+
+def detect_format(head):
+    """파일 앞부분 바이트로 형식 판별 ('classic', 'hdf5', None)"""
+    if head[:3] == CLASSIC_MAGIC and len(head) >= 4 and head[3] in (1, 2, 5):
+        return "classic"
+    if head[:8] == HDF5_MAGIC:
+        return "hdf5"
+    return None
+
+
+class _HeaderReader:
+    """classic 형식 헤더를 순차적으로 읽는 헬퍼"""
+
+    def __init__(self, f, version):
+        self.f = f
+        self.version = version
+        self.size_fmt = ">q" if version == 5 else ">i"   # NON_NEG (nelems, dim_length, vsize)
+        self.offset_fmt = ">i" if version == 1 else ">q"  # OFFSET (begin)
+
+    def _read(self, n):
+        buf = self.f.read(n)
+        if len(buf) != n:
+            raise NetCDFHeaderError("헤더가 중간에 끝남 (파일 잘림)")
+        return buf
+
+    def _unpack(self, fmt):
+        return struct.unpack(fmt, self._read(struct.calcsize(fmt)))[0]
+
+    def tag(self):
+        return self._unpack(">i")
+
+    def non_neg(self):
+        value = self._unpack(self.size_fmt)
+        if value < 0:
+            raise NetCDFHeaderError("음수 길이 값")
+        return value
+
+    def offset(self):
+        return self._unpack(self.offset_fmt)
+
+    def name(self):
+        n = self.non_neg()
+        raw = self._read(n + (-n % 4))
+        return raw[:n].decode("utf-8")
+
+    def values(self, nc_type, n):
+        if nc_type not in NC_TYPES:
+            raise NetCDFHeaderError(f"알 수 없는 nc_type: {nc_type}")
+        fmt, size, _ = NC_TYPES[nc_type]
+        nbytes = size * n
+        raw = self._read(nbytes + (-nbytes % 4))[:nbytes]
+        if nc_type == 2:
+            return raw.rstrip(b"\x00").decode("utf-8", errors="replace")
+        vals = struct.unpack(f">{n}{fmt}", raw)
+        return vals[0] if n == 1 else list(vals)
+
+    def list_header(self, expected_tag):
+        tag = self.tag()
+        n = self.non_neg()
+        if tag == 0 and n == 0:
+            return 0
+        if tag != expected_tag:
+            raise NetCDFHeaderError(f"잘못된 헤더 태그: {tag:#x}")
+        return n
+
+    def attrs(self):
+        result = {}
+        for _ in range(self.list_header(_NC_ATTRIBUTE)):
+            name = self.name()
+            nc_type = self.tag()
+            result[name] = self.values(nc_type, self.non_neg())
+        return result
+
+
+def read_classic_header(f):
+    """
+    classic(CDF-1/2/5) NetCDF 헤더만 파싱하는 함수. 데이터 영역은 읽지 않는다.
+
+    Args:
+        f: 바이너리 모드로 열린 파일 객체 (파일 시작 위치).
+
+    Returns:
+        dict: {'version', 'numrecs', 'dims': {name: len}, 'attrs': {...},
+               'variables': {name: {'dims', 'shape', 'attrs', 'nc_type', 'dtype', 'vsize', 'begin'}}}
+    """
+    magic = f.read(4)
+    if detect_format(magic) != "classic":
+        raise NetCDFHeaderError("classic NetCDF 시그니처가 아님")
+    reader = _HeaderReader(f, magic[3])
+
+    numrecs = reader._unpack(">q" if reader.version == 5 else ">i")
+
+    dims = []
+    for _ in range(reader.list_header(_NC_DIMENSION)):
+        dims.append((reader.name(), reader.non_neg()))
+
+    global_attrs = reader.attrs()
+
+    variables = {}
+    for _ in range(reader.list_header(_NC_VARIABLE)):
+        name = reader.name()
+        dimids = [reader.non_neg() for _ in range(reader.non_neg())]
+        var_attrs = reader.attrs()
+        nc_type = reader.tag()
+        vsize = reader.non_neg()
+        begin = reader.offset()
+        if nc_type not in NC_TYPES or any(d >= len(dims) for d in dimids):
+            raise NetCDFHeaderError(f"변수 '{name}' 정의가 잘못됨")
+        variables[name] = {
+            'dims': tuple(dims[d][0] for d in dimids),
+            'shape': tuple(dims[d][1] for d in dimids),
+            'attrs': var_attrs,
+            'nc_type': nc_type,
+            'dtype': NC_TYPES[nc_type][2],
+            'vsize': vsize,
+            'begin': begin,
+        }
+
+    return {
+        'version': reader.version,
+        'numrecs': numrecs,
+        'dims': dict(dims),
+        'attrs': global_attrs,
+        'variables': variables,
+    }
+
+
+def _check_structure(dims, var_names, var_dims):
+    """필수 차원(ny, nx)과 data 변수 존재 여부 확인"""
+    missing = [d for d in REQUIRED_DIMS if d not in dims]
+    if missing:
+        raise NetCDFHeaderError(f"필수 차원 없음: {missing}")
+    if REQUIRED_VAR not in var_names:
+        raise NetCDFHeaderError(f"'{REQUIRED_VAR}' 변수 없음")
+    if tuple(var_dims) != REQUIRED_DIMS:
+        raise NetCDFHeaderError(f"'{REQUIRED_VAR}' 변수 차원이 {var_dims} 임")
+
+
+def validate_sgd_header(path):
+    """
+    표준격자 파일의 헤더만 빠르게 검사하는 함수 (데이터 디코딩 없음).
+
+    시그니처(magic bytes), 차원 ny/nx, data 변수 존재를 확인하고, classic 형식은
+    data 변수 영역이 파일 크기 안에 들어오는지도 확인한다.
+
+    Args:
+        path (str): 검사할 파일 경로.
+
+    Returns:
+        dict: {'format', 'ny', 'nx'}.
+
+    Raises:
+        NetCDFHeaderError: 구조가 잘못되었거나 파일이 잘린 경우.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(8)
+        fmt = detect_format(head)
+        if fmt is None:
+            raise NetCDFHeaderError("NetCDF 시그니처가 아님 (HTML 오류 응답 등)")
+
+        if fmt == "classic":
+            f.seek(0)
+            header = read_classic_header(f)
+            data_var = header['variables'].get(REQUIRED_VAR)
+            _check_structure(header['dims'], header['variables'],
+                             data_var['dims'] if data_var else ())
+            f.seek(0, 2)
+            if data_var['begin'] + data_var['vsize'] > f.tell():
+                raise NetCDFHeaderError("data 변수 영역이 파일 끝을 넘어감 (파일 잘림)")
+            return {'format': fmt, 'ny': header['dims']['ny'], 'nx': header['dims']['nx']}
+
+    # NetCDF-4(HDF5)는 netCDF4 로 메타데이터만 읽음 (data 청크는 읽지 않음)
+    import netCDF4 as nc
+    try:
+        with nc.Dataset(path) as dataset:
+            data_var = dataset.variables.get(REQUIRED_VAR)
+            _check_structure(dataset.dimensions, dataset.variables,
+                             data_var.dimensions if data_var is not None else ())
+            return {'format': fmt,
+                    'ny': len(dataset.dimensions['ny']),
+                    'nx': len(dataset.dimensions['nx'])}
+    except (OSError, RuntimeError) as e:
+        raise NetCDFHeaderError(f"HDF5 헤더 읽기 실패: {e}")
+
+
+def _pack_name(name):
+    raw = name.encode("utf-8")
+    return struct.pack(">i", len(raw)) + raw + b"\x00" * (-len(raw) % 4)
+
+
+def _pack_attrs(attrs):
+    if not attrs:
+        return struct.pack(">ii", 0, 0)
+    out = [struct.pack(">ii", _NC_ATTRIBUTE, len(attrs))]
+    for name, value in attrs.items():
+        if isinstance(value, str):
+            raw = value.encode("utf-8")
+            body = struct.pack(">ii", 2, len(raw)) + raw
+        else:
+            values = value if isinstance(value, (list, tuple)) else [value]
+            body = struct.pack(f">ii{len(values)}d", 6, len(values), *[float(v) for v in values])
+        out.append(_pack_name(name) + body + b"\x00" * (-len(body) % 4))
+    return b"".join(out)
+
+
+def classic_sgd_bytes(ny, nx, data=None, attrs=None, data_attrs=None):
+    """
+    표준격자와 같은 구조(ny, nx 차원 + int16 data 변수)의 classic(CDF-1) 파일 바이트 생성.
+
+    data 는 big-endian int16 원시 바이트(ny*nx*2)이며, 없으면 0으로 채운다.
+    mock 서버 응답이나 합성 아카이브 생성에 사용한다.
+    """
+    nbytes = ny * nx * 2
+    if data is None:
+        data = b"\x00" * nbytes
+    if len(data) != nbytes:
+        raise ValueError("data 크기가 ny*nx*2 와 다름")
+
+    header = (b"CDF\x01" + struct.pack(">i", 0)
+              + struct.pack(">ii", _NC_DIMENSION, 2)
+              + _pack_name("ny") + struct.pack(">i", ny)
+              + _pack_name("nx") + struct.pack(">i", nx)
+              + _pack_attrs(attrs))
+    var_def = (struct.pack(">ii", _NC_VARIABLE, 1) + _pack_name(REQUIRED_VAR)
+               + struct.pack(">iii", 2, 0, 1)
+               + _pack_attrs(data_attrs if data_attrs is not None else {"data_scale": 10.0})
+               + struct.pack(">ii", 3, nbytes + (-nbytes % 4)))
+    begin = len(header) + len(var_def) + 4
+    return header + var_def + struct.pack(">i", begin) + data + b"\x00" * (-nbytes % 4)
@@ -0,0 +1,320 @@
+import os
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from sgd_executor import bounded_map
+from sgd_gaps import FREQ_MINUTES
+from sgd_manifest import refresh_manifest, query_files
+from sgd_mmap import open_sgd_data
+from sgd_packed import raw_threshold
+from sgd_qc import VALID_RANGE, ZERO_RATIO_LIMIT
+from sgd_trace import traced, trace_run
+
+# 사용자 정의 경로 설정
+ROOT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
+OUTPUT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/RESULTS/outlier"
+
+# 결측값 (저장된 정수값 기준)
+MISSING_VALUE = -9990
+
+# 격자별 플래그 비트 (flags_*.npz 의 flags 배열, uint8)
+FLAG_SPATIAL = 1     # 주변 window × window 격자의 중앙값에서 MAD 기준으로 벗어남
+FLAG_TEMPORAL = 2    # 앞뒤 시각보다 같은 방향으로 크게 튐 (한 시각만 튀는 값)
+FLAG_RANGE = 4       # 물리적으로 가능한 범위 (sgd_qc.VALID_RANGE) 밖
+FLAG_ZERO_GRID = 8   # 0으로 채워진 격자로 판정된 시각의 0값 격자
+
+# 변수별 검사 기준 (물리 단위). 초기값이며 결과를 보고 조정한다
+#   window: 공간 창 크기 (홀수), spatial_z: |값 - 중앙값| > spatial_z × 1.4826 × MAD,
+#   spatial_abs: 공간 이상치 최소 차이 (MAD 가 0 인 무강수 지역 등에서 과검출 방지),
+#   temporal_abs: 앞뒤 시각과의 최소 차이, zero_disagree: 0값 격자 중 앞뒤 시각이 모두 0이 아닌 비율 기준
+OUTLIER_PARAMS = {
+    "ta": {"window": 5, "spatial_z": 6.0, "spatial_abs": 8.0, "temporal_abs": 15.0, "zero_disagree": 0.5},
+    "rn_day": {"window": 5, "spatial_z": 8.0, "spatial_abs": 50.0, "temporal_abs": 400.0, "zero_disagree": 0.9},
+}
+
+# 공간 창 중앙값 계산 시 한 번에 정렬할 행 수 (행 수 × nx × window² 임시 배열)
+SPATIAL_BLOCK_ROWS = 64
+
+# 작업 하나가 맡을 시각 수 (앞뒤 1개씩 더 읽음)
+BLOCK_STEPS = 16
+
+# 공간 중앙값에 필요한 최소 유효 격자 수 (창 크기 대비 비율)
+MIN_VALID_FRACTION = 0.4
+
+# 결측 표시 (int32 작업 배열에서 정렬하면 맨 뒤로 가는 값)
+_BIG = np.iinfo(np.int32).max
+
+
+def _take(sorted_values, index):
+    return np.take_along_axis(sorted_values, index[..., None], axis=-1)[..., 0]
+
+
+def spatial_flags(raw, threshold_z, threshold_abs, window=5, missing=MISSING_VALUE, min_valid=None):
+    """
+    격자 한 장에서 주변 창의 중앙값/MAD 로 공간 이상치를 찾는 함수.
+
+    sliding_window_view 로 (ny, nx, window, window) 보기를 만들고 SPATIAL_BLOCK_ROWS 행씩 정렬해
+    격자별 유효값 개수에 맞는 중앙값을 고른다 (결측은 정렬하면 맨 뒤로 가도록 큰 값으로 바꿈).
+
+    Args:
+        raw (np.ndarray): (ny, nx) 저장된 정수값.
+        threshold_z (float): MAD 배수 기준.
+        threshold_abs (float): 중앙값과의 최소 차이 (저장된 값 단위).
+        window (int): 창 크기 (홀수).
+        min_valid (int): 중앙값을 믿을 최소 유효 격자 수 (기본값: 창 격자 수 × MIN_VALID_FRACTION).
+
+    Returns:
+        np.ndarray: (ny, nx) bool.
+    """
+    if min_valid is None:
+        min_valid = max(3, int(window * window * MIN_VALID_FRACTION))
+    r = window // 2
+    work = raw.astype(np.int32)
+    work[raw == missing] = _BIG
+    views = sliding_window_view(np.pad(work, r, constant_values=_BIG), (window, window))
+
+    ny, nx = raw.shape
+    out = np.zeros((ny, nx), dtype=bool)
+    for start in range(0, ny, SPATIAL_BLOCK_ROWS):
+        stop = min(start + SPATIAL_BLOCK_ROWS, ny)
+        s = views[start:stop].reshape(stop - start, nx, window * window)   # 블록만 복사
+        s.sort(axis=-1)
+        n = np.count_nonzero(s != _BIG, axis=-1)
+        lo = np.maximum(n - 1, 0) // 2
+        hi = n // 2
+        median = (_take(s, lo).astype(np.float64) + _take(s, hi)) / 2
+
+        dev = np.abs(s - median[..., None]).astype(np.float32)
+        dev[s == _BIG] = np.inf
+        dev.sort(axis=-1)
+        mad = (_take(dev, lo) + _take(dev, hi)) / 2
+
+        x = work[start:stop]
+        resid = np.abs(x - median)
+        out[start:stop] = ((x != _BIG) & (n >= min_valid) & (resid > threshold_abs)
+                           & (resid > threshold_z * 1.4826 * mad))
+    return out
+
+
+def temporal_flags(prev, cur, nxt, threshold_abs, missing=MISSING_VALUE):
+    """
+    앞뒤 시각보다 같은 방향으로 threshold_abs 넘게 튄 격자 (세 시각 모두 유효한 격자만).
+
+    Args:
+        prev, cur, nxt (np.ndarray): (..., ny, nx) 저장된 정수값 (앞 시각, 현재, 뒤 시각).
+    """
+    ok = (prev != missing) & (cur != missing) & (nxt != missing)
+    d1 = cur.astype(np.int32) - prev
+    d2 = cur.astype(np.int32) - nxt
+    return ok & (d1 * np.sign(d2) > 0) & (np.minimum(np.abs(d1), np.abs(d2)) > threshold_abs)
+
+
+def zero_grid_check(stack, limit=ZERO_RATIO_LIMIT, disagree=0.5, missing=MISSING_VALUE):
+    """
+    시각 묶음에서 0으로 채워진 격자를 찾는 함수.
+
+    0값 비율이 limit 를 넘는 시각 중, 그 0값 격자가 앞뒤 시각 (있는 쪽만) 에서는 모두 0이 아닌 비율이
+    disagree 를 넘으면 주변 시각과 공간 분포가 맞지 않는 0 채움으로 본다.
+
+    Args:
+        stack (np.ndarray): (time, ny, nx) 저장된 정수값 (없는 시각은 전부 결측).
+
+    Returns:
+        (np.ndarray, np.ndarray, np.ndarray): 시각별 (0 채움 여부, 0값 비율, 불일치 비율).
+    """
+    n_time = stack.shape[0]
+    flagged = np.zeros(n_time, dtype=bool)
+    ratio = np.zeros(n_time)
+    mismatch = np.full(n_time, np.nan)
+    valid = stack != missing
+    zero = stack == 0
+    n_valid = valid.reshape(n_time, -1).sum(axis=1)
+    n_zero = zero.reshape(n_time, -1).sum(axis=1)
+    np.divide(n_zero, n_valid, out=ratio, where=n_valid > 0)
+
+    for t in np.flatnonzero(ratio > limit):
+        cells = zero[t].copy()
+        nonzero_all = np.ones_like(cells)
+        has_neighbour = False
+        for u in (t - 1, t + 1):
+            if 0 <= u < n_time and n_valid[u] > 0:
+                cells &= valid[u]
+                nonzero_all &= ~zero[u]
+                has_neighbour = True
+        n_cells = np.count_nonzero(cells)
+        if not has_neighbour or n_cells == 0:
+            continue
+        mismatch[t] = np.count_nonzero(cells & nonzero_all) / n_cells
+        flagged[t] = mismatch[t] > disagree
+    return flagged, ratio, mismatch
+
+
+def _read_stack(paths):
+    """경로 목록 (없는 시각은 None) → (time, ny, nx) 정수 배열, data_scale, 오류 (읽기 실패는 결측)"""
+    data, scales, errors = None, [], []
+    for k, path in enumerate(paths):
+        grid, error = None, None
+        if path is not None:
+            try:
+                grid = open_sgd_data(path)
+            except Exception as e:
+                error = str(e)
+        if grid is not None and data is None:
+            data = np.full((len(paths),) + grid['data'].shape, MISSING_VALUE, dtype=np.int16)
+        if grid is not None:
+            data[k] = grid['data']
+        scales.append(grid['data_scale'] if grid is not None else np.nan)
+        errors.append(error)
+    return data, np.array(scales), errors
+
+
+@traced("compute")
+def detect_block(task):
+    """
+    (var, tm 목록, 경로 목록 (앞뒤 1개씩 포함), flag 파일 경로) 작업 하나를 처리하는 함수.
+
+    격자별 플래그 비트를 flags (time, ny, nx) uint8 로 압축 저장하고 (대부분 0이라 매우 작음),
+    시각별 요약 행 목록을 반환한다.
+    """
+    var, tms, paths, flag_path = task
+    params = OUTLIER_PARAMS[var]
+    stack, scales, errors = _read_stack(paths)
+    rows = [{'var': var, 'tm': tm, 'path': path, 'flag_path': None, 'error': error}
+            for tm, path, error in zip(tms, paths[1:-1], errors[1:-1])]
+    if stack is None:
+        return rows
+
+    zero_grid, zero_ratio, mismatch = zero_grid_check(stack, ZERO_RATIO_LIMIT, params['zero_disagree'])
+    # 0 채움 시각은 앞뒤 시각 비교에서 결측으로 취급 (정상 시각이 튄 값으로 잡히지 않게)
+    compare = stack.copy()
+    compare[zero_grid] = MISSING_VALUE
+
+    flags = np.zeros((len(tms),) + stack.shape[1:], dtype=np.uint8)
+    for k in range(len(tms)):
+        t = k + 1
+        scale = scales[t]
+        raw = stack[t]
+        if np.isnan(scale):
+            continue
+        if zero_grid[t]:
+            flags[k][raw == 0] |= FLAG_ZERO_GRID
+        else:
+            flags[k][spatial_flags(raw, params['spatial_z'], params['spatial_abs'] * scale,
+                                   params['window'])] |= FLAG_SPATIAL
+            flags[k][temporal_flags(compare[t - 1], compare[t], compare[t + 1],
+                                    params['temporal_abs'] * scale)] |= FLAG_TEMPORAL
+        if var in VALID_RANGE:
+            lo = raw_threshold(VALID_RANGE[var][0], scale, "<", raw.dtype)
+            hi = raw_threshold(VALID_RANGE[var][1], scale, ">", raw.dtype)
+            flags[k][(raw != MISSING_VALUE) & ((raw < lo) | (raw > hi))] |= FLAG_RANGE
+
+        rows[k].update({
+            'valid_count': int(np.count_nonzero(raw != MISSING_VALUE)),
+            'spatial_count': int(np.count_nonzero(flags[k] & FLAG_SPATIAL)),
+            'temporal_count': int(np.count_nonzero(flags[k] & FLAG_TEMPORAL)),
+            'range_count': int(np.count_nonzero(flags[k] & FLAG_RANGE)),
+            'zero_ratio': float(zero_ratio[t]),
+            'zero_mismatch': None if np.isnan(mismatch[t]) else float(mismatch[t]),
+            'zero_grid': bool(zero_grid[t]),
+            'flag_path': flag_path,
+        })
+
+    os.makedirs(os.path.dirname(flag_path), exist_ok=True)
+    tmp_path = flag_path + ".tmp.npz"
+    np.savez_compressed(tmp_path, flags=flags, tm=np.array(tms), zero_grid=zero_grid[1:-1])
+    os.replace(tmp_path, flag_path)
+    return rows
+
+
+def time_slots(files, freq="hour"):
+    """
+    query_files 결과를 freq 간격 시각 목록과 경로 (없는 시각은 None) 로 정리하는 함수.
+
+    'day' 는 00시 파일만 사용한다.
+    """
+    if freq == "day":
+        files = files[files['tm'].str[8:12] == "0000"]
+    if files.empty:
+        return [], []
+    times = pd.to_datetime(files['tm'], format="%Y%m%d%H%M")
+    slots = pd.date_range(times.min(), times.max(), freq=f"{FREQ_MINUTES[freq]}min")
+    lookup = dict(zip(times, files['path']))
+    return [tm.strftime("%Y%m%d%H%M") for tm in slots], [lookup.get(tm) for tm in slots]
+
+
+def build_tasks(var, tms, paths, output_directory=OUTPUT_DIRECTORY, block_steps=BLOCK_STEPS):
+    """BLOCK_STEPS 시각씩 나누고 앞뒤 1개 시각을 붙인 작업 목록"""
+    padded = [None] + list(paths) + [None]
+    tasks = []
+    for start in range(0, len(tms), block_steps):
+        block = tms[start:start + block_steps]
+        flag_path = os.path.join(output_directory, var, block[0][:4], f"flags_{var}_{block[0]}_{block[-1]}.npz")
+        tasks.append((var, block, padded[start:start + len(block) + 2], flag_path))
+    return tasks
+
+
+def run_detection(root_directory=ROOT_DIRECTORY, var="rn_day", start=None, end=None, freq="day",
+                  output_directory=OUTPUT_DIRECTORY, max_workers=None, block_steps=BLOCK_STEPS):
+    """
+    변수 하나의 시각 묶음을 프로세스 풀에서 검사하고 시각별 요약을 반환하는 함수.
+
+    격자별 결과는 output_directory/{var}/{YYYY}/flags_{var}_{시작}_{끝}.npz 에 비트 플래그로 저장되고,
+    요약에는 시각별 플래그 수와 해당 npz 경로만 남는다 (격자별 CSV 행을 만들지 않음).
+
+    Returns:
+        pd.DataFrame: var, tm, path, flag_path, valid_count, spatial_count, temporal_count, range_count,
+                      zero_ratio, zero_mismatch, zero_grid, error (tm 순).
+    """
+    refresh_manifest(root_directory)
+    files = query_files(root_directory, var=var, start=start, end=end)
+    tms, paths = time_slots(files, freq)
+    tasks = build_tasks(var, tms, paths, output_directory, block_steps)
+
+    rows = []
+    for block_rows in bounded_map(detect_block, tasks, max_workers=max_workers, batch_size=1, adaptive=False,
+                                  desc=f"{var} 이상치 검사"):
+        rows.extend(block_rows)
+    columns = ["var", "tm", "path", "flag_path", "valid_count", "spatial_count", "temporal_count",
+               "range_count", "zero_ratio", "zero_mismatch", "zero_grid", "error"]
+    return pd.DataFrame(rows, columns=columns).sort_values("tm", ignore_index=True)
+
+
+def load_flags(flag_path, tm=None):
+    """flag npz 읽기: tm 을 주면 그 시각의 (ny, nx) 플래그, 없으면 (tm 목록, (time, ny, nx) 플래그)"""
+    with np.load(flag_path) as saved:
+        tms = saved['tm'].tolist()
+        if tm is None:
+            return tms, saved['flags']
+        return saved['flags'][tms.index(tm)]
+
+
+@trace_run("sgd_outlier")
+def main():
+    print("\n=== 표준격자 시공간 이상치 검사 ===")
+    var = input(f"변수를 입력하세요 ({', '.join(OUTLIER_PARAMS)}) [기본값: rn_day]: ").strip() or "rn_day"
+    freq = input("시간 간격을 입력하세요 (hour, day) [기본값: day]: ").strip() or "day"
+    start = input("시작일을 입력하세요 (YYYYMMDD) [기본값: 20200101]: ").strip() or "20200101"
+    end = input("종료일을 입력하세요 (YYYYMMDD) [기본값: 20211231]: ").strip() or "20211231"
+
+    df = run_detection(ROOT_DIRECTORY, var, f"{start}0000", f"{end}2359", freq)
+    if df.empty:
+        print(f"'{ROOT_DIRECTORY}'에서 '{var}' 변수 파일을 찾을 수 없습니다.")
+        return
+
+    os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
+    summary_path = os.path.join(OUTPUT_DIRECTORY, f"outlier_{var}_{start}_{end}_summary.csv")
+    df.to_csv(summary_path, index=False)
+
+    checked = df[df['flag_path'].notna()]
+    print(f"검사 시각 {len(checked):,}개 (파일 없음/읽기 실패 {len(df) - len(checked):,}개)")
+    print(f"공간 이상치 격자 {int(checked['spatial_count'].sum()):,}개, "
+          f"시간 이상치 격자 {int(checked['temporal_count'].sum()):,}개, "
+          f"범위 밖 격자 {int(checked['range_count'].sum()):,}개")
+    print(f"0으로 채워진 격자로 판정된 시각: {int(checked['zero_grid'].sum())}개")
+    print(f"📊 요약 저장 완료: {summary_path} (격자별 플래그: {os.path.join(OUTPUT_DIRECTORY, var)})")
+
+
+if __name__ == "__main__":
+    main()
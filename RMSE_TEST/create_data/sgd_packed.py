@@ -0,0 +1,195 @@
+import math
+
+import numpy as np
+from tqdm import tqdm
+
+from sgd_mmap import open_sgd_data
+
+# 결측값 (저장된 정수값 기준)
+MISSING_VALUE = -9990
+
+# 시간 묶음을 줄 단위로 나눠 계산할 때 한 번에 볼 행 수 (임시 배열 크기 제한)
+STACK_BLOCK_ROWS = 128
+
+
+def raw_threshold(value, data_scale, op, dtype=np.int16):
+    """
+    물리 단위 기준값을 저장된 정수값 기준값으로 바꾸는 함수.
+
+    정수 raw 에 대해 raw / data_scale (op) value 와 같은 결과가 되도록 올림/내림하므로
+    배열을 float 로 바꾸지 않고 정수끼리 비교할 수 있다. 정수 dtype 이면 결과를 그 범위로 자른다.
+
+    Args:
+        value (float): 물리 단위 기준값.
+        data_scale (float): value = raw / data_scale.
+        op (str): '<', '<=', '>', '>='.
+
+    Returns:
+        int: raw (op) 반환값 이 원래 비교와 같아지는 정수 기준값.
+    """
+    scaled = round(value * data_scale, 9)   # 2.3 * 10 = 22.999... 같은 부동소수 오차 제거
+    bound = math.ceil(scaled) if op in ("<", ">=") else math.floor(scaled)
+    if not np.issubdtype(dtype, np.integer):
+        return bound
+    info = np.iinfo(dtype)
+    return int(min(max(bound, info.min), info.max))
+
+
+def _compare(raw, op, bound):
+    if op == "<":
+        return raw < bound
+    if op == "<=":
+        return raw <= bound
+    if op == ">":
+        return raw > bound
+    if op == ">=":
+        return raw >= bound
+    raise ValueError(f"지원하지 않는 비교: {op}")
+
+
+class PackedGrid:
+    """
+    저장된 정수값(int16)과 -9990 결측을 그대로 가진 표준격자 한 장.
+
+    결측/0값/기준값 검사는 정수끼리 하고, 물리 단위 변환은 physical() 을 부를 때만 한다.
+    파일에서 연 경우 data 는 memmap 이므로 필요한 부분만 읽힌다.
+    """
+
+    __slots__ = ("data", "data_scale", "missing")
+
+    def __init__(self, data, data_scale, missing=MISSING_VALUE):
+        self.data = data
+        self.data_scale = float(data_scale)
+        self.missing = missing
+
+    @classmethod
+    def open(cls, path, name="data"):
+        grid = open_sgd_data(path, name)
+        return cls(grid['data'], grid['data_scale'])
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def window(self, rows=slice(None), cols=slice(None)):
+        """부분 격자 / 솎아내기 (복사 없는 보기, 예: window(slice(None, None, 4), slice(None, None, 4)))"""
+        return PackedGrid(self.data[rows, cols], self.data_scale, self.missing)
+
+    def valid_mask(self):
+        return self.data != self.missing
+
+    def count_missing(self):
+        return int(np.count_nonzero(self.data == self.missing))
+
+    def count_zero(self):
+        return int(np.count_nonzero(self.data == 0))
+
+    def count(self, op, value):
+        """결측이 아닌 격자 중 (물리 단위) op value 인 격자 수"""
+        bound = raw_threshold(value, self.data_scale, op, self.data.dtype)
+        mask = _compare(self.data, op, bound)
+        if _compare(self.missing, op, bound):   # -9990 자체가 조건에 걸리는 경우만 결측 제외
+            mask &= self.data != self.missing
+        return int(np.count_nonzero(mask))
+
+    def physical(self, dtype=np.float32, out=None):
+        """물리 단위 배열 (결측은 NaN). out 을 주면 그 배열에 채움"""
+        raw = self.data
+        if out is None:
+            out = np.empty(raw.shape, dtype=dtype)
+        np.divide(raw, self.data_scale, out=out, casting="unsafe")
+        out[raw == self.missing] = np.nan
+        return out
+
+    def valid_values(self, dtype=np.float32):
+        """결측을 뺀 값만 물리 단위 1차원 배열로 (히스토그램/요약 통계용)"""
+        raw = self.data.ravel()
+        valid = raw[raw != self.missing]
+        return np.divide(valid, self.data_scale, dtype=dtype)
+
+
+class PackedStack:
+    """
+    여러 시각의 표준격자를 (time, ny, nx) 정수 배열 하나로 묶은 것.
+
+    2049 × 2049 한 장이 int16 로 약 8MB (float64 의 1/4) 이므로 여러 해 일 자료도 메모리에 올릴 수 있다.
+    시각마다 data_scale 이 다를 수 있어 scales 를 따로 가진다.
+    """
+
+    def __init__(self, data, scales, missing=MISSING_VALUE):
+        self.data = data
+        self.scales = np.asarray(scales, dtype=np.float64)
+        self.missing = missing
+
+    @classmethod
+    def from_files(cls, paths, show_progress=True):
+        """파일 목록을 읽어 저장된 정수값 그대로 쌓음 (첫 파일의 dtype/shape 기준)"""
+        data, scales = None, np.empty(len(paths), dtype=np.float64)
+        for k, path in enumerate(tqdm(paths, desc="격자 읽기", disable=not show_progress)):
+            grid = open_sgd_data(path)
+            if data is None:
+                data = np.empty((len(paths),) + grid['data'].shape, dtype=grid['data'].dtype)
+            data[k] = grid['data']
+            scales[k] = grid['data_scale']
+        return cls(data, scales)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, k):
+        return PackedGrid(self.data[k], self.scales[k], self.missing)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def count_missing(self):
+        """시각별 결측 격자 수"""
+        return np.array([np.count_nonzero(raw == self.missing) for raw in self.data], dtype=np.int64)
+
+    def count_zero(self):
+        """시각별 0값 격자 수"""
+        return np.array([np.count_nonzero(raw == 0) for raw in self.data], dtype=np.int64)
+
+    def count(self, op, value):
+        """시각별 (물리 단위) op value 인 유효 격자 수"""
+        return np.array([self[k].count(op, value) for k in range(len(self))], dtype=np.int64)
+
+    def valid_counts(self):
+        """격자별 유효 시각 수 (ny, nx)"""
+        out = np.empty(self.data.shape[1:], dtype=np.int32)
+        for start in range(0, out.shape[0], STACK_BLOCK_ROWS):
+            block = self.data[:, start:start + STACK_BLOCK_ROWS]
+            np.sum(block != self.missing, axis=0, out=out[start:start + STACK_BLOCK_ROWS])
+        return out
+
+    def mean(self, dtype=np.float32):
+        """
+        격자별 시간 평균 (물리 단위, 유효 시각이 없으면 NaN).
+
+        data_scale 이 모두 같으면 정수 합(int64)을 구한 뒤 마지막에 한 번만 나눈다.
+        """
+        ny, nx = self.data.shape[1:]
+        out = np.empty((ny, nx), dtype=dtype)
+        uniform = np.all(self.scales == self.scales[0]) if len(self) else True
+        for start in range(0, ny, STACK_BLOCK_ROWS):
+            block = self.data[:, start:start + STACK_BLOCK_ROWS]
+            valid = block != self.missing
+            if uniform:
+                total = np.where(valid, block, 0).sum(axis=0, dtype=np.int64) / self.scales[0]
+            else:
+                total = np.zeros(block.shape[1:], dtype=np.float64)
+                for k in range(len(self)):
+                    total += np.where(valid[k], block[k], 0) / self.scales[k]
+            n = valid.sum(axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[start:start + STACK_BLOCK_ROWS] = np.where(n > 0, total / n, np.nan)
+        return out
+
+    def physical(self, k, dtype=np.float32, out=None):
+        """k 번째 시각의 물리 단위 배열"""
+        return self[k].physical(dtype, out)
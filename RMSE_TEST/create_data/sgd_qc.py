@@ -0,0 +1,331 @@
+import os
+
+import pandas as pd
+
+from sgd_executor import bounded_map
+from sgd_manifest import refresh_manifest, query_files
+from sgd_mmap import open_sgd_data
+from sgd_kernels import masked_stats
+from sgd_packed import raw_threshold
+from sgd_qc_cache import CACHED_METRICS, open_cache, lookup, store, evict, monthly_counts
+from sgd_trace import traced, trace_run
+
+# 사용자 정의 경로 설정
+ROOT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
+OUTPUT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/RESULTS"
+
+# 검사 대상 변수
+VARIABLES = ["ta", "rn_day", "hm", "ws_10m"]
+
+# 결측값 (저장된 정수값 기준)
+MISSING_VALUE = -9990
+
+# 변수별 물리적으로 가능한 값 범위 (단위 변환 후 기준, 벗어나면 이상치)
+VALID_RANGE = {
+    "ta": (-50.0, 50.0),
+    "rn_day": (0.0, 1000.0),
+    "hm": (0.0, 100.0),
+    "ws_10m": (0.0, 75.0),
+}
+
+# 비정상 파일 기준
+MIN_FILE_SIZE = 48000       # check_sgd_file_size_1 기본값 (bytes)
+ZERO_RATIO_LIMIT = 0.3      # check_0_filled_files_3 기준 (30%)
+
+# 프로세스 작업 하나에 묶을 파일 수
+CHUNKSIZE = 16
+
+# 캐시에 한 번에 기록할 결과 수
+CACHE_FLUSH_ROWS = 512
+
+METRIC_COLUMNS = [
+    "var", "date", "filename", "path", "size_bytes", "n_cells", "missing_count", "valid_count",
+    "zero_count", "negative_count", "outlier_count", "min", "max", "zero_ratio", "negative_ratio",
+    "no_valid_data", "data_scale", "error",
+]
+
+
+def format_size(size_bytes):
+    """바이트 크기를 사람이 읽기 쉬운 형식으로 변환"""
+    for unit in ['', 'K', 'M', 'G']:
+        if size_bytes < 1024:
+            return f"{size_bytes:.1f}{unit}B"
+        size_bytes /= 1024
+    return f"{size_bytes:.1f}TB"
+
+
+@traced("compute")
+def compute_metrics(raw, data_scale, valid_range=None):
+    """
+    data 변수(저장된 정수값) 하나에서 파일 단위 지표를 계산하는 함수.
+
+    Args:
+        raw (np.ndarray): 스케일 적용 전 data 배열.
+        data_scale (float): value = data / data_scale.
+        valid_range (tuple): 물리 단위 기준 (최소, 최대). None 이면 이상치 계산 생략.
+
+    Returns:
+        dict: n_cells, missing_count, valid_count, zero_count, negative_count,
+              outlier_count, min, max, zero_ratio, negative_ratio, no_valid_data.
+    """
+    lo = hi = None
+    if valid_range is not None:
+        # 범위를 정수 기준값으로 바꿔 정수끼리 비교 (float 변환 없음)
+        lo = raw_threshold(valid_range[0], data_scale, "<", raw.dtype)
+        hi = raw_threshold(valid_range[1], data_scale, ">", raw.dtype)
+
+    # 결측/0값/음수/이상치/최소/최대를 한 번의 순회로 (sgd_kernels)
+    stats = masked_stats(raw, MISSING_VALUE, lo, hi)
+    valid_count = stats['count']
+
+    if valid_count == 0:
+        return {
+            'n_cells': stats['n_cells'], 'missing_count': stats['missing'], 'valid_count': 0,
+            'zero_count': 0, 'negative_count': 0, 'outlier_count': 0,
+            'min': None, 'max': None, 'zero_ratio': 0, 'negative_ratio': 0,
+            'no_valid_data': True,
+        }
+
+    return {
+        'n_cells': stats['n_cells'], 'missing_count': stats['missing'], 'valid_count': valid_count,
+        'zero_count': stats['zero'], 'negative_count': stats['negative'], 'outlier_count': stats['outlier'],
+        'min': float(stats['min']) / data_scale, 'max': float(stats['max']) / data_scale,
+        'zero_ratio': stats['zero'] / valid_count, 'negative_ratio': stats['negative'] / valid_count,
+        'no_valid_data': False,
+    }
+
+
+def process_file(task):
+    """(var, tm, path, size) 작업 하나를 처리 (파일은 한 번만 연다)"""
+    var, tm, path, size = task
+    row = {'var': var, 'date': tm, 'filename': os.path.basename(path), 'path': path, 'size_bytes': size}
+    try:
+        grid = open_sgd_data(path)  # 가능하면 memmap (페이지 캐시 공유)
+        data_scale = grid['data_scale']
+        row.update(compute_metrics(grid['data'], data_scale, VALID_RANGE.get(var)))
+        row['data_scale'] = data_scale
+        row['error'] = None
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+def cache_lookup(conn, files):
+    """
+    인덱스 파일 목록 중 캐시에 있는 결과와 다시 검사할 작업을 나누는 함수.
+
+    Returns:
+        (pd.DataFrame, list): (적중 행 METRIC_COLUMNS, process_file 작업 목록).
+    """
+    hits, misses = lookup(conn, files)
+    cached = hits.rename(columns={'tm': 'date', 'size': 'size_bytes'})
+    cached = cached.assign(filename=cached['path'].map(os.path.basename))
+    tasks = list(zip(misses['var'], misses['tm'], misses['path'], misses['size']))
+    return cached.reindex(columns=METRIC_COLUMNS), tasks
+
+
+class CacheWriter:
+    """
+    process_file 결과를 flush_rows 개씩 바로 캐시에 기록하는 기록기.
+
+    읽기 실패 행도 같은 (경로, 크기, mtime) 키로 캐시해 바뀌지 않은 불량 파일은 다시 열지 않는다
+    (이번 실행에서 실패한 행은 errors 에도 모음).
+
+    닫을 때 인덱스에서 사라진 파일의 결과를 정리한다. 중간에 멈춰도 이미 기록한 결과는 남아
+    다음 실행에서 이어서 검사한다.
+    """
+
+    def __init__(self, conn, files, flush_rows=CACHE_FLUSH_ROWS):
+        self.conn = conn
+        self.files = files
+        self.flush_rows = flush_rows
+        self.errors = []
+        self.count = 0
+        self._keys = dict(zip(zip(files['var'], files['tm']), zip(files['mtime_ns'], files['hash'])))
+        self._buffer = []
+
+    def write(self, row):
+        if row.get('error') is not None:
+            self.errors.append(row)
+        mtime_ns, digest = self._keys[(row['var'], row['date'])]
+        entry = {k: row.get(k) for k in CACHED_METRICS}
+        entry.update(var=row['var'], tm=row['date'], path=row['path'], size=row['size_bytes'],
+                     mtime_ns=mtime_ns, hash=digest, error=row.get('error'))
+        self._buffer.append(entry)
+        if len(self._buffer) >= self.flush_rows:
+            self.flush()
+
+    @traced("write", "CacheWriter.flush")
+    def flush(self):
+        store(self.conn, self._buffer)
+        self.count += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+        evict(self.conn, self.files)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.flush()
+
+
+def run_qc(root_directory=ROOT_DIRECTORY, variables=VARIABLES, max_workers=None, chunksize=CHUNKSIZE,
+           use_cache=True):
+    """
+    여러 변수의 모든 파일을 한 번의 프로세스 풀 순회로 검사하는 함수.
+
+    use_cache 이면 (경로, 크기, mtime) 또는 내용 해시가 같은 파일은 캐시된 결과를 쓰고
+    새로 받았거나 바뀐 파일만 연다. 하루치 다운로드 뒤에는 그날 파일만 검사한다.
+    검사 결과는 bounded_map 에서 나오는 대로 캐시에 기록되므로 메모리에 쌓이지 않는다.
+
+    Args:
+        root_directory (str): 데이터 경로.
+        variables (list): 검사할 변수 목록.
+        max_workers (int): 최대 프로세스 수 (기본값: CPU/I/O 측정으로 자동 조정).
+        chunksize (int): 작업 하나에 묶을 파일 수.
+        use_cache (bool): QC 결과 캐시 사용 여부.
+
+    Returns:
+        pd.DataFrame: 파일당 한 행의 지표 테이블 (METRIC_COLUMNS).
+    """
+    refresh_manifest(root_directory)
+    files = query_files(root_directory)
+    files = files[files['var'].isin(variables)].reset_index(drop=True)
+
+    if not use_cache:
+        tasks = list(zip(files['var'], files['tm'], files['path'], files['size']))
+        rows = list(bounded_map(process_file, tasks, max_workers, chunksize, desc="파일 검사 중"))
+        df = pd.DataFrame(rows, columns=METRIC_COLUMNS)
+        return df.sort_values(['var', 'date'], ignore_index=True)
+
+    conn = open_cache(root_directory, zero_ratio_limit=ZERO_RATIO_LIMIT)
+    try:
+        cached, tasks = cache_lookup(conn, files)
+        print(f"캐시 적중 {len(cached):,}개, 새로 검사 {len(tasks):,}개")
+        with CacheWriter(conn, files) as writer:
+            for row in bounded_map(process_file, tasks, max_workers, chunksize, desc="파일 검사 중"):
+                writer.write(row)
+        if writer.count:
+            # 방금 기록한 결과까지 캐시에서 한 번에 읽음
+            cached, _ = cache_lookup(conn, files)
+    finally:
+        conn.close()
+
+    return cached.sort_values(['var', 'date'], ignore_index=True)
+
+
+def cached_monthly(root_directory=ROOT_DIRECTORY, variables=VARIABLES):
+    """캐시에 증분 유지되는 변수별 0값 비율 초과 월별 카운트 {var: pd.Series}"""
+    conn = open_cache(root_directory, zero_ratio_limit=ZERO_RATIO_LIMIT)
+    try:
+        return {var: monthly_counts(conn, var) for var in variables}
+    finally:
+        conn.close()
+
+
+def size_report(df, var, min_size=MIN_FILE_SIZE):
+    """check_sgd_file_size_1 과 같은 (전체 목록, 비정상 목록)"""
+    sub = df[df['var'] == var]
+    all_files = pd.DataFrame({
+        'filename': sub['filename'],
+        'size_bytes': sub['size_bytes'],
+        'size_human': sub['size_bytes'].map(format_size),
+        'path': sub['path'],
+    })
+    return all_files, all_files[all_files['size_bytes'] < min_size]
+
+
+def zero_ratio_report(df, var, limit=ZERO_RATIO_LIMIT, monthly=None):
+    """
+    check_0_filled_files_3 과 같은 (파일 목록, 0값 비율 초과 목록, 월별 카운트).
+
+    monthly 가 주어지면 (캐시의 증분 월별 집계) 다시 계산하지 않고 그대로 쓴다.
+    """
+    sub = df[(df['var'] == var) & df['error'].isna()]
+    # 기존 CSV 는 min/max 를 저장된 정수값 그대로 기록함
+    sub = sub.assign(min=sub['min'] * sub['data_scale'], max=sub['max'] * sub['data_scale'])
+    files = sub[['date', 'size_bytes', 'filename', 'min', 'max', 'no_valid_data', 'zero_ratio', 'negative_ratio']]
+    high = files[files['zero_ratio'] >= limit]
+    if monthly is None:
+        monthly = pd.to_datetime(high['date'], format='%Y%m%d%H%M').dt.to_period('M').value_counts().sort_index()
+        monthly.index = monthly.index.astype(str)
+    return files, high, monthly
+
+
+def value_distribution_report(df):
+    """check_data_file_test 의 값 분포 통계 (-9990, 0, 유효값 개수)"""
+    grouped = df[df['error'].isna()].groupby('var')
+    out = pd.DataFrame({
+        '-9990': grouped['missing_count'].sum(),
+        '0': grouped['zero_count'].sum(),
+        'Valid': grouped['valid_count'].sum() - grouped['zero_count'].sum(),
+    })
+    return out.rename_axis('Variable').reset_index()
+
+
+def size_statistics_report(df):
+    """check_data_file_test 의 파일 크기 통계"""
+    grouped = df.groupby('var')['size_bytes']
+    out = pd.DataFrame({
+        'Min Size': grouped.min(),
+        'Max Size': grouped.max(),
+        'Mean Size': grouped.mean(),
+        'Median Size': grouped.median(),
+        'Std Dev': grouped.std(ddof=0),
+    })
+    return out.rename_axis('Variable').reset_index()
+
+
+@traced("write")
+def save_reports(df, output_directory=OUTPUT_DIRECTORY, min_size=MIN_FILE_SIZE, monthly=None):
+    """지표 테이블(parquet)과 기존 스크립트 형식의 CSV 를 저장 (monthly: cached_monthly 결과)"""
+    os.makedirs(output_directory, exist_ok=True)
+
+    table_path = os.path.join(output_directory, "qc_sgd_metrics.parquet")
+    df.to_parquet(table_path, index=False)
+    print(f"지표 테이블 저장: {table_path}")
+
+    for var in df['var'].unique():
+        all_files, abnormal = size_report(df, var, min_size)
+        all_files.to_csv(os.path.join(output_directory, f"sgd_{var}_all_files.csv"), index=False)
+        abnormal.to_csv(os.path.join(output_directory, f"sgd_{var}_abnormal_files.csv"), index=False)
+
+        files, high, month_counts = zero_ratio_report(df, var, monthly=(monthly or {}).get(var))
+        files.to_csv(os.path.join(output_directory, f"zero_ratio_{var}_file_list.csv"), index=False)
+        high.to_csv(os.path.join(output_directory, f"zero_ratio_over_30pct_{var}_file_list.csv"), index=False)
+        month_counts.to_csv(os.path.join(output_directory, f"zero_ratio_over_30pct_{var}_month.csv"), header=True)
+
+        print(f"[{var}] 파일 {len(all_files):,}개, 크기 비정상 {len(abnormal):,}개, "
+              f"0값 비율 30% 이상 {len(high):,}개, 유효값 없음 {int(files['no_valid_data'].sum()):,}개")
+
+    value_distribution_report(df).to_csv(
+        os.path.join(output_directory, "value_distribution_statistics.csv"), index=False, encoding="utf-8-sig")
+    size_statistics_report(df).to_csv(
+        os.path.join(output_directory, "file_size_statistics.csv"), index=False, encoding="utf-8-sig")
+
+    errors = df[df['error'].notna()]
+    if not errors.empty:
+        print(f"읽기 실패 파일: {len(errors):,}개")
+
+
+@trace_run("sgd_qc")
+def main():
+    print("\n=== 표준격자 통합 품질 검사 ===")
+    var_input = input(f"검사할 변수를 입력하세요 (쉼표 구분) [기본값: {','.join(VARIABLES)}]: ").strip()
+    variables = [v.strip() for v in var_input.split(",") if v.strip()] or VARIABLES
+
+    df = run_qc(ROOT_DIRECTORY, variables)
+    if df.empty:
+        print("검사할 파일이 없습니다.")
+        return
+    save_reports(df, OUTPUT_DIRECTORY, monthly=cached_monthly(ROOT_DIRECTORY, variables))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import os
+import time
+import sqlite3
+
+import pandas as pd
+
+# 기본 데이터 경로
+ROOT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
+
+# 캐시 DB 위치 (인덱스 DB 와 같은 폴더)
+CACHE_RELPATH = "etc/manifest/sgd_qc_cache.sqlite"
+
+# 지표 계산 방식이 바뀌면 올려서 기존 캐시를 모두 무효화
+METRICS_VERSION = 1
+
+# 캐시 행 수 상한 (넘으면 이번 실행에 쓰지 않은 변수부터 오래된 순으로 통째로 제거)
+MAX_CACHE_ROWS = 2_000_000
+
+# 파일 단위로 캐시하는 지표 (sgd_qc.compute_metrics 결과와 data_scale)
+CACHED_METRICS = [
+    "n_cells", "missing_count", "valid_count", "zero_count", "negative_count", "outlier_count",
+    "min", "max", "zero_ratio", "negative_ratio", "no_valid_data", "data_scale",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (
+    var            TEXT    NOT NULL,
+    tm             TEXT    NOT NULL,   -- YYYYMMDDHHMM
+    path           TEXT    NOT NULL,
+    size           INTEGER NOT NULL,
+    mtime_ns       INTEGER NOT NULL,
+    hash           TEXT,
+    n_cells        INTEGER,
+    missing_count  INTEGER,
+    valid_count    INTEGER,
+    zero_count     INTEGER,
+    negative_count INTEGER,
+    outlier_count  INTEGER,
+    min            REAL,               -- 물리 단위
+    max            REAL,
+    zero_ratio     REAL,
+    negative_ratio REAL,
+    no_valid_data  INTEGER,
+    data_scale     REAL,
+    error          TEXT,               -- 읽기 실패 메시지 (있으면 지표는 NULL)
+    PRIMARY KEY (var, tm)
+);
+CREATE TABLE IF NOT EXISTS monthly (
+    var            TEXT    NOT NULL,
+    month          TEXT    NOT NULL,   -- YYYY-MM
+    files          INTEGER NOT NULL DEFAULT 0,
+    high_zero      INTEGER NOT NULL DEFAULT 0,   -- zero_ratio >= zero_ratio_limit
+    no_valid       INTEGER NOT NULL DEFAULT 0,
+    missing_count  INTEGER NOT NULL DEFAULT 0,
+    zero_count     INTEGER NOT NULL DEFAULT 0,
+    valid_count    INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (var, month)
+);
+CREATE TABLE IF NOT EXISTS vars (
+    var     TEXT    PRIMARY KEY,
+    used_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_MONTHLY_COLUMNS = ["files", "high_zero", "no_valid", "missing_count", "zero_count", "valid_count"]
+
+
+def open_cache(root_directory=ROOT_DIRECTORY, db_path=None, zero_ratio_limit=0.3):
+    """
+    QC 결과 캐시 DB 연결 (없으면 생성).
+
+    지표 버전이 다르면 전체를 비우고, 0값 비율 기준만 다르면 월별 집계를 다시 만든다.
+    """
+    db_path = db_path or os.path.join(root_directory, CACHE_RELPATH)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_SCHEMA)
+
+    meta = dict(conn.execute("SELECT key, value FROM meta"))
+    with conn:
+        if meta.get('version') != str(METRICS_VERSION):
+            conn.execute("DELETE FROM metrics")
+            conn.execute("DELETE FROM monthly")
+            conn.execute("DELETE FROM vars")
+            meta.pop('zero_ratio_limit', None)
+        if meta.get('zero_ratio_limit') != repr(float(zero_ratio_limit)):
+            _rebuild_monthly(conn, zero_ratio_limit)
+        conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                         [('version', str(METRICS_VERSION)), ('zero_ratio_limit', repr(float(zero_ratio_limit)))])
+    return conn
+
+
+def _zero_ratio_limit(conn):
+    return float(conn.execute("SELECT value FROM meta WHERE key = 'zero_ratio_limit'").fetchone()[0])
+
+
+def _rebuild_monthly(conn, zero_ratio_limit):
+    """metrics 테이블 전체로 월별 집계를 다시 만듦 (기준 변경 시에만)"""
+    conn.execute("DELETE FROM monthly")
+    conn.execute("""
+        INSERT INTO monthly (var, month, files, high_zero, no_valid, missing_count, zero_count, valid_count)
+        SELECT var, substr(tm, 1, 4) || '-' || substr(tm, 5, 2), COUNT(*),
+               SUM(zero_ratio >= ?), SUM(no_valid_data), SUM(missing_count), SUM(zero_count), SUM(valid_count)
+        FROM metrics WHERE error IS NULL GROUP BY 1, 2""", (float(zero_ratio_limit),))
+
+
+def _monthly_deltas(rows, sign, zero_ratio_limit):
+    """행 목록의 월별 기여분 {(var, month): [files, high_zero, ...]} (읽기 실패 행은 제외)"""
+    deltas = {}
+    for r in rows:
+        if r.get('error') is not None:
+            continue
+        key = (r['var'], f"{r['tm'][:4]}-{r['tm'][4:6]}")
+        d = deltas.setdefault(key, [0] * len(_MONTHLY_COLUMNS))
+        d[0] += sign
+        d[1] += sign * int(r['zero_ratio'] is not None and r['zero_ratio'] >= zero_ratio_limit)
+        d[2] += sign * int(bool(r['no_valid_data']))
+        d[3] += sign * int(r['missing_count'] or 0)
+        d[4] += sign * int(r['zero_count'] or 0)
+        d[5] += sign * int(r['valid_count'] or 0)
+    return deltas
+
+
+def _apply_monthly(conn, deltas):
+    conn.executemany(f"""
+        INSERT INTO monthly (var, month, {', '.join(_MONTHLY_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (var, month) DO UPDATE SET
+        {', '.join(f'{c} = {c} + excluded.{c}' for c in _MONTHLY_COLUMNS)}""",
+        [(*key, *d) for key, d in deltas.items()])
+    conn.execute("DELETE FROM monthly WHERE files <= 0")
+
+
+def _plain(value):
+    """numpy 스칼라를 sqlite 에 넣을 수 있는 파이썬 값으로"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _fetch_rows(conn, where, params):
+    cur = conn.execute(f"SELECT * FROM metrics WHERE {where}", params)
+    names = [c[0] for c in cur.description]
+    return [dict(zip(names, row)) for row in cur]
+
+
+def lookup(conn, files):
+    """
+    인덱스 파일 목록을 캐시와 대조하는 함수.
+
+    (path, size, mtime_ns) 가 같으면 적중, 달라도 내용 해시가 같으면 적중으로 보고 키만 갱신한다.
+    읽기 실패 결과도 같은 키로 적중하므로 바뀌지 않은 불량 파일은 다시 열지 않는다.
+
+    Args:
+        files (pd.DataFrame): query_files 결과 (var, tm, path, size, mtime_ns, hash).
+
+    Returns:
+        (pd.DataFrame, pd.DataFrame): (적중 행: var, tm, path, size + CACHED_METRICS + error, 다시 검사할 파일).
+    """
+    variables = sorted(files['var'].unique())
+    if not variables:
+        return pd.DataFrame(columns=["var", "tm", "path", "size"] + CACHED_METRICS + ["error"]), files
+
+    marks = ", ".join("?" * len(variables))
+    cached = pd.read_sql_query(f"SELECT * FROM metrics WHERE var IN ({marks})", conn, params=variables)
+    merged = files.merge(cached, on=["var", "tm"], how="left", suffixes=("", "_c"))
+
+    same_key = ((merged['path'] == merged['path_c']) & (merged['size'] == merged['size_c'])
+                & (merged['mtime_ns'] == merged['mtime_ns_c']))
+    same_hash = ~same_key & merged['hash'].notna() & (merged['hash'] == merged['hash_c'])
+    hit = same_key | same_hash
+
+    moved = merged[same_hash]
+    now = time.time_ns()
+    with conn:
+        conn.executemany("UPDATE metrics SET path = ?, size = ?, mtime_ns = ? WHERE var = ? AND tm = ?",
+                         zip(moved['path'], moved['size'].astype(int).tolist(),
+                             moved['mtime_ns'].astype(int).tolist(), moved['var'], moved['tm']))
+        conn.executemany("INSERT OR REPLACE INTO vars (var, used_ns) VALUES (?, ?)",
+                         [(v, now) for v in variables])
+
+    hits = merged.loc[hit, ["var", "tm", "path", "size"] + CACHED_METRICS + ["error"]].reset_index(drop=True)
+    hits['no_valid_data'] = hits['no_valid_data'].fillna(0).astype(bool)
+    return hits, files[~hit.to_numpy()].reset_index(drop=True)
+
+
+def store(conn, rows):
+    """
+    새로 검사한 결과를 캐시에 넣고 월별 집계를 증분 갱신하는 함수.
+
+    Args:
+        rows (list[dict]): var, tm, path, size, mtime_ns, hash + CACHED_METRICS + error (실패 행의 지표는 None).
+    """
+    if not rows:
+        return
+    limit = _zero_ratio_limit(conn)
+    with conn:
+        old = []
+        for r in rows:
+            old.extend(_fetch_rows(conn, "var = ? AND tm = ?", (r['var'], r['tm'])))
+        _apply_monthly(conn, _monthly_deltas(old, -1, limit))
+
+        columns = ["var", "tm", "path", "size", "mtime_ns", "hash"] + CACHED_METRICS + ["error"]
+        conn.executemany(
+            f"INSERT OR REPLACE INTO metrics ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [tuple(_plain(r[c]) for c in columns) for r in rows])
+        _apply_monthly(conn, _monthly_deltas(rows, +1, limit))
+
+
+def evict(conn, files, max_rows=MAX_CACHE_ROWS):
+    """
+    캐시 정리 함수.
+
+    1. 검사한 변수 중 인덱스에 더 이상 없는 파일(삭제, 격리)의 결과를 제거.
+    2. 전체 행 수가 max_rows 를 넘으면 이번에 쓰지 않은 변수를 오래 안 쓴 순으로 통째로 제거.
+
+    Returns:
+        int: 제거한 행 수.
+    """
+    removed = 0
+    limit = _zero_ratio_limit(conn)
+    with conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS live (var TEXT, tm TEXT, PRIMARY KEY (var, tm))")
+        conn.execute("DELETE FROM live")
+        conn.executemany("INSERT INTO live (var, tm) VALUES (?, ?)", zip(files['var'], files['tm']))
+        variables = sorted(files['var'].unique())
+        marks = ", ".join("?" * len(variables))
+        if variables:
+            stale_where = (f"var IN ({marks}) AND NOT EXISTS "
+                           f"(SELECT 1 FROM live WHERE live.var = metrics.var AND live.tm = metrics.tm)")
+            stale = _fetch_rows(conn, stale_where, variables)
+            _apply_monthly(conn, _monthly_deltas(stale, -1, limit))
+            removed += conn.execute(f"DELETE FROM metrics WHERE {stale_where}", variables).rowcount
+
+        total = conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0]
+        candidates = [var for (var,) in conn.execute("SELECT var FROM vars ORDER BY used_ns")
+                      if var not in variables]
+        for var in candidates:
+            if total <= max_rows:
+                break
+            n = conn.execute("DELETE FROM metrics WHERE var = ?", (var,)).rowcount
+            conn.execute("DELETE FROM monthly WHERE var = ?", (var,))
+            conn.execute("DELETE FROM vars WHERE var = ?", (var,))
+            total -= n
+            removed += n
+    return removed
+
+
+def monthly_counts(conn, var, column="high_zero"):
+    """
+    월별 집계 조회 (파일을 다시 읽지 않음).
+
+    Returns:
+        pd.Series: 'YYYY-MM' 색인, 값이 0 인 달은 제외 (zero_ratio_over_30pct_{var}_month.csv 형식).
+    """
+    if column not in _MONTHLY_COLUMNS:
+        raise ValueError(f"지원하지 않는 집계 컬럼: {column}")
+    df = pd.read_sql_query(f"SELECT month, {column} FROM monthly WHERE var = ? AND {column} > 0 ORDER BY month",
+                           conn, params=(var,))
+    return pd.Series(df[column].to_numpy(), index=pd.Index(df['month'], name="date"), name="count")
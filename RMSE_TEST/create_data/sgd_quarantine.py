@@ -0,0 +1,229 @@
+import os
+import csv
+import time
+import shutil
+
+import pandas as pd
+from tqdm import tqdm
+
+from sgd_manifest import refresh_manifest, parse_sgd_filename
+from sgd_repair import enqueue
+
+# 기본 데이터 경로
+ROOT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
+
+# 격리 폴더 (원래 org/sgd 아래 상대 경로를 배치별로 그대로 유지)
+QUARANTINE_RELPATH = "quarantine/sgd"
+
+# 배치별 이동 기록 (CSV, 배치 하나당 파일 하나)
+JOURNAL_RELPATH = "quarantine/journal"
+
+# 비정상 파일 기준 (check_data_file_2 의 350KB)
+ABNORMAL_THRESHOLD = 350 * 1024
+
+JOURNAL_COLUMNS = ["batch_id", "var", "tm", "original", "quarantined", "size", "mtime_ns", "reason", "status"]
+
+
+def scan_small_files(directory, threshold=ABNORMAL_THRESHOLD, suffix=".nc"):
+    """
+    os.scandir 로 트리를 한 번 순회해 threshold 미만인 파일을 찾는 함수.
+
+    du -h 의 반올림된 K/M 값 대신 DirEntry.stat() 의 정확한 st_size 로 비교한다.
+
+    Returns:
+        (pd.DataFrame, int): (path, size, mtime_ns 컬럼의 기준 미만 파일, 검사한 전체 파일 수).
+    """
+    rows = []
+    total = 0
+    stack = [directory]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(suffix):
+                    total += 1
+                    st = entry.stat(follow_symlinks=False)
+                    if st.st_size < threshold:
+                        rows.append((entry.path, st.st_size, st.st_mtime_ns))
+    df = pd.DataFrame(rows, columns=["path", "size", "mtime_ns"]).sort_values("path", ignore_index=True)
+    return df, total
+
+
+def _journal_path(root_directory, batch_id):
+    return os.path.join(root_directory, JOURNAL_RELPATH, f"{batch_id}.csv")
+
+
+def _write_journal(path, rows):
+    """기록을 임시 파일에 쓰고 fsync 후 교체 (중간에 끊겨도 이전 기록 유지)"""
+    tmp_path = path + ".part"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=JOURNAL_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_journal(root_directory, batch_id):
+    """배치 기록 읽기 (JOURNAL_COLUMNS 의 DataFrame)"""
+    return pd.read_csv(_journal_path(root_directory, batch_id), dtype={'tm': str, 'var': str})
+
+
+def list_batches(root_directory=ROOT_DIRECTORY):
+    """배치별 상태 요약 (batch_id, status, files, bytes)"""
+    journal_dir = os.path.join(root_directory, JOURNAL_RELPATH)
+    if not os.path.isdir(journal_dir):
+        return pd.DataFrame(columns=["batch_id", "status", "files", "bytes"])
+    frames = [read_journal(root_directory, name[:-4]) for name in sorted(os.listdir(journal_dir))
+              if name.endswith(".csv")]
+    if not frames:
+        return pd.DataFrame(columns=["batch_id", "status", "files", "bytes"])
+    df = pd.concat(frames, ignore_index=True)
+    return (df.groupby(["batch_id", "status"])
+            .agg(files=("original", "size"), bytes=("size", "sum")).reset_index())
+
+
+def _move(src, dst, made_dirs):
+    parent = os.path.dirname(dst)
+    if parent not in made_dirs:
+        os.makedirs(parent, exist_ok=True)
+        made_dirs.add(parent)
+    try:
+        os.rename(src, dst)   # 같은 파일시스템이면 메타데이터만 바뀜
+    except OSError:
+        shutil.move(src, dst)
+
+
+def quarantine(root_directory, files, reason="small", dry_run=True, redownload=True, show_progress=True):
+    """
+    파일을 지우지 않고 격리 폴더로 한꺼번에 옮기는 함수.
+
+    옮기기 전에 배치 기록(원래 경로, 격리 경로, 크기, mtime)을 먼저 디스크에 쓰므로
+    중간에 끊겨도 restore 로 되돌릴 수 있다. 옮긴 뒤에는 인덱스 DB 를 갱신하고,
+    redownload 이면 표준격자 파일을 재다운로드 대기열(sgd_repair)에 넣는다.
+
+    Args:
+        root_directory (str): 데이터 경로.
+        files (pd.DataFrame): path, size, mtime_ns 컬럼 (scan_small_files 결과).
+        reason (str): 격리 사유 (대기열 사유로도 사용, sgd_repair.PRIORITY 의 키).
+        dry_run (bool): True 이면 옮기지 않고 계획만 반환.
+
+    Returns:
+        (str, pd.DataFrame): (배치 ID, 배치 기록). dry_run 이면 배치 ID 는 None.
+    """
+    batch_id = time.strftime("%Y%m%d_%H%M%S") + f"_{os.getpid()}"
+    sgd_root = os.path.join(root_directory, "org", "sgd")
+    target_root = os.path.join(root_directory, QUARANTINE_RELPATH, batch_id)
+
+    rows = []
+    for path, size, mtime_ns in zip(files['path'], files['size'], files['mtime_ns']):
+        rel = os.path.relpath(path, sgd_root)
+        if rel.startswith(".."):
+            rel = os.path.relpath(path, root_directory)   # org/sgd 밖의 파일
+        parsed = parse_sgd_filename(os.path.basename(path)) or ("", "")
+        rows.append({'batch_id': batch_id, 'var': parsed[0], 'tm': parsed[1], 'original': path,
+                     'quarantined': os.path.join(target_root, rel), 'size': int(size),
+                     'mtime_ns': int(mtime_ns), 'reason': reason, 'status': "planned"})
+    if dry_run or not rows:
+        return None, pd.DataFrame(rows, columns=JOURNAL_COLUMNS)
+
+    journal = _journal_path(root_directory, batch_id)
+    os.makedirs(os.path.dirname(journal), exist_ok=True)
+    _write_journal(journal, rows)
+
+    made_dirs = set()
+    for row in tqdm(rows, desc="격리", disable=not show_progress):
+        try:
+            _move(row['original'], row['quarantined'], made_dirs)
+            row['status'] = "quarantined"
+        except FileNotFoundError:
+            row['status'] = "gone"
+        except OSError as e:
+            row['status'] = f"failed: {e}"
+    _write_journal(journal, rows)
+
+    refresh_manifest(root_directory)
+    if redownload:
+        by_var = {}
+        for row in rows:
+            if row['status'] == "quarantined" and row['var']:
+                by_var.setdefault(row['var'], []).append(row['tm'])
+        for var, tms in by_var.items():
+            enqueue(root_directory, var, tms, reason)
+    return batch_id, pd.DataFrame(rows, columns=JOURNAL_COLUMNS)
+
+
+def restore(root_directory, batch_id, dry_run=True, overwrite=False, show_progress=True):
+    """
+    격리한 배치를 원래 위치로 되돌리는 함수.
+
+    그 사이 재다운로드로 원래 위치에 새 파일이 생긴 경우 overwrite 가 아니면 건너뛴다 (status: conflict).
+
+    Returns:
+        pd.DataFrame: 갱신된 배치 기록 (되돌린 파일은 status = restored).
+    """
+    df = read_journal(root_directory, batch_id)
+    rows = df.to_dict("records")
+    made_dirs = set()
+    for row in tqdm(rows, desc="복원", disable=not show_progress or dry_run):
+        if row['status'] not in ("planned", "quarantined", "conflict"):
+            continue
+        if not os.path.exists(row['quarantined']):
+            continue   # planned 상태로 끊긴 배치에서 아직 옮기지 않은 파일
+        if os.path.exists(row['original']) and not overwrite:
+            row['status'] = "conflict"
+            continue
+        if dry_run:
+            row['status'] = "restorable"
+            continue
+        if os.path.exists(row['original']):
+            os.remove(row['original'])
+        _move(row['quarantined'], row['original'], made_dirs)
+        row['status'] = "restored"
+
+    if not dry_run:
+        _write_journal(_journal_path(root_directory, batch_id), rows)
+        refresh_manifest(root_directory)
+    return pd.DataFrame(rows, columns=JOURNAL_COLUMNS)
+
+
+def purge(root_directory, batch_id, dry_run=True):
+    """
+    확인이 끝난 배치의 격리 파일을 실제로 삭제하는 함수 (되돌릴 수 없음).
+
+    Returns:
+        int: 삭제한 (dry_run 이면 삭제할) 파일 수.
+    """
+    rows = read_journal(root_directory, batch_id).to_dict("records")
+    targets = [row for row in rows if row['status'] == "quarantined" and os.path.exists(row['quarantined'])]
+    if dry_run:
+        return len(targets)
+    for row in targets:
+        os.remove(row['quarantined'])
+        row['status'] = "purged"
+    _write_journal(_journal_path(root_directory, batch_id), rows)
+    return len(targets)
+
+
+def main():
+    print("\n=== 표준격자 격리 배치 목록 ===")
+    print(list_batches(ROOT_DIRECTORY).to_string(index=False))
+
+    batch_id = input("복원할 배치 ID를 입력하세요 [기본값: 없음]: ").strip()
+    if not batch_id:
+        return
+    plan = restore(ROOT_DIRECTORY, batch_id, dry_run=True)
+    print(plan['status'].value_counts().to_string())
+    if input("위 배치를 복원할까요? (y/N): ").strip().lower() == "y":
+        done = restore(ROOT_DIRECTORY, batch_id, dry_run=False)
+        print(f"✅ 복원 완료: {(done['status'] == 'restored').sum():,}개")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import os
+import time
+import sqlite3
+import datetime
+
+import pandas as pd
+
+from sgd_manifest import refresh_manifest, query_files, parse_sgd_filename
+from sgd_gaps import scan_timestamps, find_gaps, expand_gaps
+from sgd_qc_cache import CACHE_RELPATH
+
+# 기본 데이터 경로
+ROOT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
+
+# 재다운로드 대기열 DB 위치 (인덱스 DB 와 같은 폴더)
+QUEUE_RELPATH = "etc/manifest/sgd_repair.sqlite"
+
+# 이전 버전 다운로더가 남긴 실패 목록 (처음 계획할 때 한 번 가져옴)
+LEGACY_FAILED_CSV = "failed_downloads.csv"
+
+# 사유별 우선순위 (작을수록 먼저). 잘린 파일 > 결측 > 0값 비율 과다
+PRIORITY = {
+    'small': 0,      # check_sgd_file_size_1 기준 미만 (잘린/빈 파일)
+    'missing': 1,    # get_excluded_date_4 방식의 결측 시각
+    'failed': 2,     # 이전 다운로드 실패 기록만 있는 경우
+    'zero': 3,       # check_0_filled_files_3 기준 0값 비율 초과 (실제 0 일 수도 있음)
+}
+
+# 시각당 최대 다운로드 시도 횟수 (넘으면 exhausted 로 두고 계획에서 제외)
+MAX_ATTEMPTS = 5
+
+ZERO_RATIO_LIMIT = 0.3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    var        TEXT    NOT NULL,
+    tm         TEXT    NOT NULL,   -- YYYYMMDDHHMM
+    path       TEXT    NOT NULL,
+    reasons    TEXT    NOT NULL,   -- 쉼표로 구분한 사유 (small, missing, failed, zero)
+    priority   INTEGER NOT NULL,
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    status     TEXT    NOT NULL DEFAULT 'pending',   -- pending, done, exhausted
+    last_error TEXT,
+    source     TEXT,               -- 마지막으로 성공한 다운로드 직후의 파일 크기:mtime_ns
+    updated_ns INTEGER NOT NULL,
+    PRIMARY KEY (var, tm)
+);
+CREATE INDEX IF NOT EXISTS queue_order ON queue (var, status, priority, attempts, tm);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def sgd_path(root_directory, var, tm):
+    """시각별 표준격자 파일 경로 (org/sgd/YYYY/MM/DD/sfc_grid_{var}_{tm}.nc)"""
+    return os.path.join(root_directory, "org", "sgd", tm[:4], tm[4:6], tm[6:8], f"sfc_grid_{var}_{tm}.nc")
+
+
+def time_bounds(start_date, end_date, freq):
+    """다운로더와 같은 기대 구간: 시간 자료는 시작일 01시 ~ 종료일 다음날 00시, 일 자료는 00시"""
+    if freq == "hour":
+        return start_date.replace(hour=1, minute=0), (end_date + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+    return start_date.replace(hour=0, minute=0), end_date.replace(hour=0, minute=0)
+
+
+def open_queue(root_directory=ROOT_DIRECTORY, db_path=None):
+    """재다운로드 대기열 DB 연결 (없으면 생성)"""
+    db_path = db_path or os.path.join(root_directory, QUEUE_RELPATH)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _file_key(size, mtime_ns):
+    return f"{int(size)}:{int(mtime_ns)}"
+
+
+def _gap_candidates(root_directory, var, freq, start, end):
+    gaps = find_gaps(scan_timestamps(root_directory, var, start, end), freq, start, end)
+    return {tm: {'missing'} for tm in expand_gaps(gaps, freq).strftime("%Y%m%d%H%M")}
+
+
+def _abnormal_candidates(root_directory, var, start, end, min_file_size, zero_ratio_limit):
+    """크기 미달 파일 (인덱스) 과 0값 비율 초과 파일 (QC 캐시)"""
+    found = {}
+    small = query_files(root_directory, var=var, start=start, end=end, max_size=min_file_size)
+    for tm in small['tm']:
+        found.setdefault(tm, set()).add('small')
+
+    cache_path = os.path.join(root_directory, CACHE_RELPATH)
+    if os.path.exists(cache_path):
+        conn = sqlite3.connect(cache_path)
+        try:
+            rows = conn.execute(
+                "SELECT tm FROM metrics WHERE var = ? AND tm >= ? AND tm <= ? AND zero_ratio >= ?",
+                (var, start.strftime("%Y%m%d%H%M"), end.strftime("%Y%m%d%H%M"), zero_ratio_limit))
+            for (tm,) in rows:
+                found.setdefault(tm, set()).add('zero')
+        except sqlite3.OperationalError:
+            pass  # QC 를 아직 한 번도 돌리지 않음
+        finally:
+            conn.close()
+    return found
+
+
+def import_legacy_failures(conn, root_directory, var):
+    """
+    failed_downloads.csv (이전 다운로더가 매번 덮어쓰던 실패 목록) 를 한 번만 대기열에 합치는 함수.
+
+    date,path 또는 url,save_path 두 형식 모두 경로의 파일명에서 (var, 시각) 을 읽는다.
+    append_failure_log 가 쓰는 새 형식(run_time,...) 파일은 이미 대기열에 있는 실패이므로 읽지 않는다.
+    """
+    csv_path = os.path.join(root_directory, LEGACY_FAILED_CSV)
+    if not os.path.exists(csv_path):
+        return 0
+    with open(csv_path, encoding="utf-8") as f:
+        if f.readline().startswith("run_time,"):
+            return 0
+    stamp = str(os.stat(csv_path).st_mtime_ns)
+    key = f"legacy_imported:{var}"
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    if row is not None and row[0] == stamp:
+        return 0
+
+    df = pd.read_csv(csv_path)
+    column = 'path' if 'path' in df.columns else 'save_path'
+    imported = 0
+    now = time.time_ns()
+    with conn:
+        for path in df[column].dropna():
+            parsed = parse_sgd_filename(os.path.basename(path))
+            if parsed is None or parsed[0] != var:
+                continue
+            conn.execute("""
+                INSERT INTO queue (var, tm, path, reasons, priority, attempts, status, updated_ns)
+                VALUES (?, ?, ?, 'failed', ?, 1, 'pending', ?)
+                ON CONFLICT (var, tm) DO NOTHING""", (var, parsed[1], path, PRIORITY['failed'], now))
+            imported += 1
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, stamp))
+    return imported
+
+
+def plan_downloads(root_directory, var, freq, start_date, end_date, min_file_size,
+                   zero_ratio_limit=ZERO_RATIO_LIMIT, max_attempts=MAX_ATTEMPTS, include_zero=True,
+                   limit=None, db_path=None):
+    """
+    결측 시각, 비정상 파일, 실패 이력을 합쳐 재다운로드 대기열을 갱신하고 이번에 받을 목록을 반환하는 함수.
+
+    - 같은 시각은 한 번만 (사유는 합치고 우선순위는 가장 높은 것)
+    - 이번 검사에서 더 이상 문제가 없는 시각은 done 으로 정리
+    - 다시 받아 done 이 된 뒤 파일이 그대로(크기/mtime 같음)인 시각은 또 받지 않음
+      (원본 자체가 0값 비율 초과인 건조한 날 rn_day 등, 다시 받아도 같은 파일)
+    - 시도 횟수가 max_attempts 에 이른 시각은 exhausted 로 두고 제외
+
+    Args:
+        root_directory (str): 데이터 경로 (다운로더의 base_dir).
+        var (str): 변수명.
+        freq (str): 'hour' 또는 'day'.
+        start_date, end_date (datetime): 대상 기간 (일 단위, 다운로더와 같은 의미).
+        min_file_size (int): 정상 파일 최소 크기(bytes).
+        include_zero (bool): 0값 비율 초과 파일도 다시 받을지 여부.
+        limit (int): 이번에 받을 최대 개수.
+
+    Returns:
+        list: (tm, path) 목록 (우선순위, 시도 횟수, 시각 순).
+    """
+    start, end = time_bounds(start_date, end_date, freq)
+    refresh_manifest(root_directory)
+
+    candidates = _gap_candidates(root_directory, var, freq, start, end)
+    for tm, reasons in _abnormal_candidates(root_directory, var, start, end, min_file_size,
+                                            zero_ratio_limit).items():
+        if 'zero' in reasons and not include_zero:
+            reasons = reasons - {'zero'}
+        if reasons:
+            candidates.setdefault(tm, set()).update(reasons)
+
+    conn = open_queue(root_directory, db_path)
+    try:
+        import_legacy_failures(conn, root_directory, var)
+        start_tm, end_tm = start.strftime("%Y%m%d%H%M"), end.strftime("%Y%m%d%H%M")
+        now = time.time_ns()
+
+        # 성공한 재다운로드 이후 바뀌지 않은 파일은 후보에서 제외 (status 는 done 그대로)
+        files = query_files(root_directory, var=var, start=start, end=end)
+        current = {tm: _file_key(size, mtime_ns)
+                   for tm, size, mtime_ns in zip(files['tm'], files['size'], files['mtime_ns'])}
+        downloaded = dict(conn.execute(
+            "SELECT tm, source FROM queue WHERE var = ? AND status = 'done' AND source IS NOT NULL "
+            "AND tm >= ? AND tm <= ?", (var, start_tm, end_tm)).fetchall())
+        for tm in [tm for tm in candidates if tm in downloaded and current.get(tm) == downloaded[tm]]:
+            del candidates[tm]
+
+        with conn:
+            # 문제가 해결된 시각 정리 (실패 이력만 있는 시각은 파일이 생겼으면 해결로 봄)
+            pending = conn.execute(
+                "SELECT tm FROM queue WHERE var = ? AND status != 'done' AND tm >= ? AND tm <= ?",
+                (var, start_tm, end_tm)).fetchall()
+            resolved = [(now, var, tm) for (tm,) in pending if tm not in candidates]
+            conn.executemany("UPDATE queue SET status = 'done', updated_ns = ? WHERE var = ? AND tm = ?", resolved)
+
+            conn.executemany("""
+                INSERT INTO queue (var, tm, path, reasons, priority, status, updated_ns)
+                VALUES (?, ?, ?, ?, ?, 'pending', ?)
+                ON CONFLICT (var, tm) DO UPDATE SET
+                    reasons = excluded.reasons,
+                    priority = excluded.priority,
+                    status = CASE WHEN queue.status = 'exhausted' THEN 'exhausted' ELSE 'pending' END,
+                    updated_ns = excluded.updated_ns""",
+                [(var, tm, sgd_path(root_directory, var, tm), ",".join(sorted(reasons)),
+                  min(PRIORITY[r] for r in reasons), now) for tm, reasons in candidates.items()])
+
+            conn.execute("UPDATE queue SET status = 'exhausted' WHERE var = ? AND status = 'pending' AND attempts >= ?",
+                         (var, max_attempts))
+
+        sql = ("SELECT tm, path FROM queue WHERE var = ? AND status = 'pending' AND tm >= ? AND tm <= ? "
+               "ORDER BY priority, attempts, tm")
+        params = [var, start_tm, end_tm]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def enqueue(root_directory, var, tms, reason, db_path=None):
+    """
+    지정한 시각을 대기열에 바로 넣는 함수 (격리 등 검사 밖에서 찾은 문제 파일).
+
+    이미 있는 시각은 사유를 합치고 더 높은 우선순위로 다시 pending 으로 둔다 (exhausted 는 유지).
+    """
+    now = time.time_ns()
+    conn = open_queue(root_directory, db_path)
+    try:
+        with conn:
+            conn.executemany("""
+                INSERT INTO queue (var, tm, path, reasons, priority, status, updated_ns)
+                VALUES (?, ?, ?, ?, ?, 'pending', ?)
+                ON CONFLICT (var, tm) DO UPDATE SET
+                    reasons = CASE WHEN instr(',' || queue.reasons || ',', ',' || excluded.reasons || ',') > 0
+                                   THEN queue.reasons ELSE queue.reasons || ',' || excluded.reasons END,
+                    priority = min(queue.priority, excluded.priority),
+                    status = CASE WHEN queue.status = 'exhausted' THEN 'exhausted' ELSE 'pending' END,
+                    updated_ns = excluded.updated_ns""",
+                [(var, tm, sgd_path(root_directory, var, tm), reason, PRIORITY[reason], now) for tm in tms])
+    finally:
+        conn.close()
+
+
+def record_results(root_directory, var, attempted, failed, db_path=None):
+    """
+    다운로드 결과를 대기열에 반영 (성공: done 과 받은 파일의 크기:mtime, 실패: 시도 횟수 +1 과 오류 기록).
+
+    Args:
+        attempted (list): 이번에 시도한 (tm, path) 목록.
+        failed (dict): {path: 오류 메시지}.
+    """
+    now = time.time_ns()
+    conn = open_queue(root_directory, db_path)
+    try:
+        with conn:
+            conn.executemany(
+                "UPDATE queue SET attempts = attempts + 1, last_error = ?, updated_ns = ? WHERE var = ? AND tm = ?",
+                [(str(failed[path]), now, var, tm) for tm, path in attempted if path in failed])
+            done = []
+            for tm, path in attempted:
+                if path in failed:
+                    continue
+                st = os.stat(path) if os.path.exists(path) else None
+                done.append((_file_key(st.st_size, st.st_mtime_ns) if st else None, now, var, tm))
+            conn.executemany(
+                "UPDATE queue SET status = 'done', last_error = NULL, source = ?, updated_ns = ? "
+                "WHERE var = ? AND tm = ?", done)
+    finally:
+        conn.close()
+
+
+def append_failure_log(root_directory, var, failed):
+    """실패 목록을 failed_downloads.csv 에 이어 씀 (덮어쓰지 않음, 실행 시각 포함)"""
+    if not failed:
+        return None
+    log_path = os.path.join(root_directory, LEGACY_FAILED_CSV)
+    df = pd.DataFrame({
+        'run_time': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'var': var,
+        'date': [parse_sgd_filename(os.path.basename(p))[1] for p in failed],
+        'path': list(failed),
+        'error': [str(e) for e in failed.values()],
+    })
+    write_header = not os.path.exists(log_path)
+    if not write_header:
+        # 이전 형식(date,path 또는 url,save_path) 파일이면 새 형식으로 다시 시작
+        with open(log_path, encoding="utf-8") as f:
+            write_header = not f.readline().startswith("run_time,")
+        if write_header:
+            os.replace(log_path, log_path + ".old")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    df.to_csv(log_path, mode="a", header=write_header, index=False)
+    return log_path
+
+
+def queue_summary(root_directory=ROOT_DIRECTORY, db_path=None):
+    """변수 × 상태별 대기열 개수"""
+    conn = open_queue(root_directory, db_path)
+    try:
+        return pd.read_sql_query(
+            "SELECT var, status, COUNT(*) AS count, SUM(attempts) AS attempts FROM queue GROUP BY var, status",
+            conn)
+    finally:
+        conn.close()
+
+
+def main():
+    print("\n=== 표준격자 재다운로드 대기열 ===")
+    print(queue_summary(ROOT_DIRECTORY).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
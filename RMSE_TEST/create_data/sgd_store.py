@@ -0,0 +1,305 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import netCDF4 as nc
+from tqdm import tqdm
+
+from sgd_manifest import refresh_manifest, query_files
+from sgd_mmap import open_sgd_data
+from sgd_trace import trace_run
+
+# 기본 데이터 경로
+ROOT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
+
+# 통합 저장소 위치: {ROOT}/store/sgd/{var}/sgd_{var}_{YYYY}.nc  (time, ny, nx)
+STORE_RELPATH = "store/sgd"
+
+# 저장 설정 (원본과 같은 int16 + data_scale 로 저장)
+DEFAULT_CHUNKS = (8, 256, 256)   # (time, ny, nx). 시계열 위주면 time 을 늘리고 ny, nx 를 줄임
+DEFAULT_COMPLEVEL = 4
+APPEND_BATCH = 24                # 한 번에 쓰는 시간 수
+MISSING_VALUE = -9990
+TIME_UNITS = "minutes since 2000-01-01 00:00:00"
+
+# 저장소 전역 속성으로 복사하지 않을 파일별 속성
+PER_FILE_ATTRS = ("time", "time_in")
+
+
+def store_path(root_directory, var, year):
+    """변수, 연도별 저장소 파일 경로"""
+    return os.path.join(root_directory, STORE_RELPATH, var, f"sgd_{var}_{year}.nc")
+
+
+def _to_tm(value):
+    """datetime 또는 'YYYYMMDDHHMM' 을 'YYYYMMDDHHMM' 문자열로"""
+    return value if isinstance(value, str) else value.strftime("%Y%m%d%H%M")
+
+
+def _create_store(path, sample_path, chunks, complevel):
+    """첫 원본 파일의 구조와 속성으로 빈 저장소 파일 생성"""
+    with nc.Dataset(sample_path) as src:
+        src_var = src.variables['data']
+        ny, nx = src_var.shape
+        global_attrs = {k: v for k, v in src.__dict__.items() if k not in PER_FILE_ATTRS}
+        data_attrs = {k: v for k, v in src_var.__dict__.items() if k != "_FillValue"}
+        dtype = src_var.dtype
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    dataset = nc.Dataset(path, "w", format="NETCDF4")
+    dataset.createDimension("time", None)
+    dataset.createDimension("ny", ny)
+    dataset.createDimension("nx", nx)
+    dataset.setncatts(global_attrs)
+
+    time_var = dataset.createVariable("time", "f8", ("time",))
+    time_var.units = TIME_UNITS
+    _source_var(dataset)
+
+    chunks = (chunks[0], min(chunks[1], ny), min(chunks[2], nx))
+    data = dataset.createVariable("data", dtype, ("time", "ny", "nx"), zlib=True, complevel=complevel,
+                                  shuffle=True, chunksizes=chunks, fill_value=MISSING_VALUE)
+    data.setncatts(data_attrs)
+    return dataset
+
+
+def _source_var(dataset):
+    """시각별 원본 파일 식별값 변수 (없던 이전 저장소에는 추가, 빈 값은 다음 실행 때 다시 씀)"""
+    if "source" not in dataset.variables:
+        dataset.createVariable("source", str, ("time",))
+    return dataset.variables['source']
+
+
+def source_key(row):
+    """manifest 행의 원본 식별값 (내용 해시가 있으면 해시, 없으면 크기:mtime)"""
+    if isinstance(row['hash'], str) and row['hash']:
+        return f"hash:{row['hash']}"
+    return f"{int(row['size'])}:{int(row['mtime_ns'])}"
+
+
+def _read_raw(path):
+    """원본 파일의 data 를 저장된 정수값 그대로 읽음"""
+    return open_sgd_data(path)['data']
+
+
+def _read_part(part, skipped):
+    """묶음의 파일을 읽어 (행, 정수 격자) 목록 반환. 읽을 수 없는 파일(잘림 등)은 skipped 에 기록하고 제외"""
+    out = []
+    for _, row in part.iterrows():
+        try:
+            out.append((row, np.array(_read_raw(row['path']))))
+        except Exception as e:
+            skipped.append((row['path'], str(e)))
+    return out
+
+
+def compact_variable(root_directory=ROOT_DIRECTORY, var="ta", chunks=DEFAULT_CHUNKS,
+                     complevel=DEFAULT_COMPLEVEL, batch=APPEND_BATCH, show_progress=True):
+    """
+    org/sgd 의 시각별 파일을 변수·연도별 (time, ny, nx) 저장소에 추가하는 함수.
+
+    저장소에 이미 있는 시각은 원본 식별값 (manifest 해시 또는 크기/mtime) 이 같으면 건너뛰고,
+    달라졌으면 (재다운로드된 잘린/0 채움 파일 등) 같은 시각 위치에 덮어쓴다.
+    읽을 수 없는 원본 파일은 건너뛰고 목록을 출력하므로 불량 파일이 있어도 나머지는 저장된다.
+    시각 순서가 뒤섞여 추가되어도(과거 자료 보충) 읽기 API 가 시각 색인으로 찾는다.
+
+    Args:
+        root_directory (str): 데이터 경로.
+        var (str): 변수명.
+        chunks (tuple): (time, ny, nx) 청크 크기.
+        complevel (int): zlib 압축 수준.
+        batch (int): 한 번에 쓰는 시간 수.
+
+    Returns:
+        int: 추가되거나 다시 쓴 시각 수.
+    """
+    refresh_manifest(root_directory)
+    files = query_files(root_directory, var=var)
+    if files.empty:
+        return 0
+
+    written, replaced, skipped = 0, 0, []
+    for year, group in files.groupby(files['tm'].str[:4], sort=True):
+        path = store_path(root_directory, var, year)
+        if os.path.exists(path):
+            dataset = nc.Dataset(path, "a")
+            keys = _time_keys(dataset)
+            index = {tm: k for k, tm in enumerate(keys)}
+            stored = dict(zip(keys, _source_var(dataset)[:])) if keys else {}
+        else:
+            sample = _first_readable(group['path'])
+            if sample is None:
+                skipped.extend((p, "읽을 수 있는 파일 없음") for p in group['path'])
+                continue
+            dataset = _create_store(path, sample, chunks, complevel)
+            index, stored = {}, {}
+
+        keys = group.apply(source_key, axis=1)
+        todo = group[[stored.get(tm) != key for tm, key in zip(group['tm'], keys)]]
+        try:
+            data = dataset.variables['data']
+            data.set_auto_maskandscale(False)
+            time_var = dataset.variables['time']
+            sources = _source_var(dataset)
+            for start in tqdm(range(0, len(todo), batch), desc=f"{var} {year} 통합 저장",
+                              disable=not show_progress or todo.empty):
+                new_rows, new_grids = [], []
+                for row, grid in _read_part(todo.iloc[start:start + batch], skipped):
+                    if row['tm'] in index:   # 원본이 바뀐 시각은 같은 위치에 덮어씀
+                        k = index[row['tm']]
+                        data[k] = grid
+                        sources[k] = source_key(row)
+                        replaced += 1
+                    else:
+                        new_rows.append(row)
+                        new_grids.append(grid)
+                if not new_rows:
+                    continue
+                n = len(time_var)
+                times = pd.to_datetime([row['tm'] for row in new_rows], format="%Y%m%d%H%M").to_pydatetime()
+                time_var[n:n + len(new_rows)] = nc.date2num(list(times), TIME_UNITS)
+                data[n:n + len(new_rows)] = np.stack(new_grids)
+                for k, row in enumerate(new_rows, start=n):
+                    sources[k] = source_key(row)
+                    index[row['tm']] = k
+                written += len(new_rows)
+        finally:
+            dataset.close()
+
+    if replaced:
+        print(f"{var}: 원본이 바뀐 {replaced:,}개 시각을 다시 저장")
+    if skipped:
+        print(f"⚠ {var}: 읽을 수 없는 파일 {len(skipped):,}개는 저장소에 넣지 않음")
+        for p, error in skipped[:10]:
+            print(f"  ❌ {p}: {error}")
+    return written + replaced
+
+
+def _first_readable(paths):
+    """저장소 구조를 가져올 첫 번째 정상 파일 (없으면 None)"""
+    for p in paths:
+        try:
+            _read_raw(p)
+            return p
+        except Exception:
+            continue
+    return None
+
+
+def _time_keys(dataset):
+    """저장소의 time 값을 'YYYYMMDDHHMM' 목록으로"""
+    time_var = dataset.variables['time']
+    if len(time_var) == 0:
+        return []
+    times = nc.num2date(time_var[:], TIME_UNITS, only_use_cftime_datetimes=False,
+                        only_use_python_datetimes=True)
+    return [t.strftime("%Y%m%d%H%M") for t in times]
+
+
+class SGDStore:
+    """
+    통합 저장소 읽기 API.
+
+    연도별 파일 핸들과 시각 색인을 열어 둔 채로 재사용하므로 시각별 파일을 다시 열지 않는다.
+    """
+
+    def __init__(self, root_directory=ROOT_DIRECTORY):
+        self.root_directory = root_directory
+        self._open = {}
+
+    def _get(self, var, year):
+        key = (var, str(year))
+        if key not in self._open:
+            path = store_path(self.root_directory, var, year)
+            if not os.path.exists(path):
+                return None
+            dataset = nc.Dataset(path, "r")
+            dataset.variables['data'].set_auto_maskandscale(False)
+            keys = np.array(_time_keys(dataset))
+            order = np.argsort(keys, kind="stable")
+            self._open[key] = (dataset, keys[order], order)
+        return self._open[key]
+
+    def _scale(self, var_handle, raw, scaled):
+        if not scaled:
+            return raw
+        out = raw.astype(np.float32) / np.float32(getattr(var_handle, 'data_scale', 1.0))
+        out[raw == MISSING_VALUE] = np.nan
+        return out
+
+    def times(self, var, year):
+        """저장된 시각 목록 (정렬됨)"""
+        entry = self._get(var, year)
+        return [] if entry is None else list(entry[1])
+
+    def read_map(self, var, when, scaled=True):
+        """
+        특정 시각의 (ny, nx) 격자를 읽음.
+
+        Args:
+            var (str): 변수명.
+            when (datetime | str): 시각.
+            scaled (bool): True 면 data_scale 적용한 float32 (-9990 → NaN), False 면 저장된 정수값.
+        """
+        tm = _to_tm(when)
+        entry = self._get(var, tm[:4])
+        if entry is None:
+            raise KeyError(f"{var} {tm} 없음")
+        dataset, keys, order = entry
+        pos = np.searchsorted(keys, tm)
+        if pos >= len(keys) or keys[pos] != tm:
+            raise KeyError(f"{var} {tm} 없음")
+        data = dataset.variables['data']
+        return self._scale(data, data[int(order[pos])], scaled)
+
+    def read_point_series(self, var, j, i, start, end, scaled=True):
+        """
+        격자점 (행 j, 열 i) 의 [start, end] 구간 시계열을 읽음.
+
+        Returns:
+            pd.Series: 시각 색인 시계열.
+        """
+        start_tm, end_tm = _to_tm(start), _to_tm(end)
+        values, index = [], []
+        for year in range(int(start_tm[:4]), int(end_tm[:4]) + 1):
+            entry = self._get(var, year)
+            if entry is None:
+                continue
+            dataset, keys, order = entry
+            lo = np.searchsorted(keys, start_tm, side="left")
+            hi = np.searchsorted(keys, end_tm, side="right")
+            if lo >= hi:
+                continue
+            data = dataset.variables['data']
+            column = data[:, j, i]  # 시간축 청크만 읽음
+            values.append(self._scale(data, column[order[lo:hi]], scaled))
+            index.extend(keys[lo:hi])
+
+        if not values:
+            return pd.Series(dtype=np.float32 if scaled else np.int16, name=var)
+        return pd.Series(np.concatenate(values), index=pd.to_datetime(index, format="%Y%m%d%H%M"), name=var)
+
+    def close(self):
+        for dataset, _, _ in self._open.values():
+            dataset.close()
+        self._open.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@trace_run("sgd_store")
+def main():
+    print("\n=== 표준격자 통합 저장소 생성/추가 ===")
+    var = input("변수를 입력하세요 (rn_day, hm, ta, ws_10m) [기본값: ta]: ").strip() or "ta"
+    start = datetime.now()
+    appended = compact_variable(ROOT_DIRECTORY, var)
+    print(f"{var}: {appended:,}개 시각 추가 ({(datetime.now() - start).total_seconds():.1f}초)")
+
+
+if __name__ == "__main__":
+    main()
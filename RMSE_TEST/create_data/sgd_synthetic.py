@@ -0,0 +1,237 @@
+import os
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from sgd_manifest import FILE_PREFIX, FILE_SUFFIX
+from sgd_netcdf import classic_sgd_bytes
+
+# 기본 합성 아카이브 경로 (실제 DATA 와 섞이지 않게 따로 둠)
+SYNTHETIC_ROOT = "/home/papalio/test_research/RMSE_TEST/BENCH/DATA"
+
+# 실제 표준격자 정의 (2049 × 2049, 0.5km). 작은 격자는 같은 영역을 더 큰 간격으로 덮음
+FULL_GRID = 2049
+FULL_GRID_SIZE = 0.5
+FULL_MAP_SX = 880.0
+FULL_MAP_SY = 1540.0
+MAP_SLON = 126.0
+MAP_SLAT = 38.0
+
+MISSING_VALUE = -9990
+DATA_SCALE = 10.0
+
+# 합성 아카이브 설명 파일 (생성 조건과 주입한 결함 목록)
+ARCHIVE_INFO_RELPATH = "etc/synthetic/archive.json"
+TRUTH_RELPATH = "etc/synthetic/truth.csv"
+
+# 변수별 값 모양 (물리 단위): 남북 경사 + 일변화 + 잡음, 강수는 대부분 0
+VAR_PROFILES = {
+    'ta': {'base': 15.0, 'gradient': -12.0, 'diurnal': 5.0, 'noise': 1.0, 'lo': -40.0, 'hi': 45.0},
+    'hm': {'base': 70.0, 'gradient': 10.0, 'diurnal': -15.0, 'noise': 5.0, 'lo': 0.0, 'hi': 100.0},
+    'ws_10m': {'base': 3.0, 'gradient': 1.0, 'diurnal': 1.5, 'noise': 1.0, 'lo': 0.0, 'hi': 40.0},
+    'rn_day': {'base': 0.0, 'gradient': 0.0, 'diurnal': 0.0, 'noise': 0.0, 'lo': 0.0, 'hi': 300.0},
+}
+
+
+def synthetic_geometry(size=FULL_GRID):
+    """size × size 격자의 전역 속성 (실제 표준격자와 같은 영역, 같은 속성 이름)"""
+    ratio = (FULL_GRID - 1) / (size - 1)
+    return {
+        'grid_nx': size,
+        'grid_ny': size,
+        'grid_size': FULL_GRID_SIZE * ratio,
+        'map_slon': MAP_SLON,
+        'map_slat': MAP_SLAT,
+        'map_sx': FULL_MAP_SX / ratio,
+        'map_sy': FULL_MAP_SY / ratio,
+    }
+
+
+def land_mask(size, seed=0):
+    """
+    육지(값이 있는) 영역 마스크. 실제 자료처럼 바다 쪽은 -9990 으로 채워진다.
+
+    격자 중앙의 타원(한반도 대신) 과 몇 개의 작은 섬으로 만든다.
+    """
+    rng = np.random.default_rng(seed)
+    y, x = (axis / np.float64(size - 1) for axis in np.ogrid[0:size, 0:size])
+    mask = ((x - 0.45) / 0.22) ** 2 + ((y - 0.5) / 0.38) ** 2 <= 1.0
+    for cx, cy, r in rng.uniform([0.1, 0.1, 0.01], [0.9, 0.9, 0.05], size=(6, 3)):
+        mask |= (x - cx) ** 2 + (y - cy) ** 2 <= r ** 2
+    return mask
+
+
+class FieldGenerator:
+    """변수별 합성 값 (int16, data_scale 적용) 생성기. 공간 모양은 한 번만 만들고 시각마다 재사용"""
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.mask = land_mask(size, seed)
+        self.lat_ramp = np.linspace(0.0, 1.0, size, dtype=np.float32)[:, None]   # 0 번 행이 남쪽
+        # 시각마다 새로 뽑지 않고 미리 만든 잡음을 순환해서 사용 (생성 속도가 디스크 쓰기보다 빠르게)
+        self.noise = self.rng.standard_normal((4, size, size)).astype(np.float32)
+
+    def field(self, var, when, k):
+        profile = VAR_PROFILES[var]
+        if var == "rn_day":
+            values = np.zeros((self.size, self.size), dtype=np.float32)
+            if self.rng.random() < 0.4:   # 비 오는 날은 일부 영역에만 강수
+                cy, cx = self.rng.uniform(0.2, 0.8, size=2)
+                y, x = (axis / np.float32(self.size - 1) for axis in np.ogrid[0:self.size, 0:self.size])
+                amount = self.rng.uniform(5.0, 80.0)
+                values = amount * np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / 0.02, dtype=np.float32)
+                values[values < 0.1] = 0.0
+        else:
+            phase = np.cos(2 * np.pi * (when.hour - 15) / 24.0)
+            values = (profile['base'] + profile['diurnal'] * phase
+                      + profile['gradient'] * self.lat_ramp + profile['noise'] * self.noise[k % 4])
+        np.clip(values, profile['lo'], profile['hi'], out=values)
+        data = np.rint(values * DATA_SCALE).astype(np.int16)
+        data[~self.mask] = MISSING_VALUE
+        return data
+
+
+def sgd_file_path(root_directory, var, when):
+    """org/sgd/YYYY/MM/DD/sfc_grid_{var}_{YYYYMMDDHHMM}.nc"""
+    return os.path.join(root_directory, "org", "sgd", when.strftime("%Y/%m/%d"),
+                        f"{FILE_PREFIX}{var}_{when:%Y%m%d%H%M}{FILE_SUFFIX}")
+
+
+def plan_defects(times, gap_runs=3, max_gap=12, truncate_rate=0.01, zero_rate=0.01, seed=0):
+    """
+    시각 목록에 주입할 결함을 정하는 함수.
+
+    결측은 실제처럼 연속 구간으로 빼고(처음/마지막 시각은 남겨 검사 구간이 바뀌지 않게 함),
+    남은 시각 중 일부를 잘린 파일(truncated), 전부 0인 파일(zero) 로 만든다.
+
+    Returns:
+        list: 시각별 상태 ('ok', 'gap', 'truncated', 'zero').
+    """
+    rng = np.random.default_rng(seed)
+    n = len(times)
+    kinds = np.array(["ok"] * n, dtype=object)
+    if n > 2:
+        for _ in range(gap_runs):
+            length = int(rng.integers(1, max_gap + 1))
+            start = int(rng.integers(1, max(2, n - length - 1)))
+            kinds[start:min(start + length, n - 1)] = "gap"
+    draw = rng.random(n)
+    ok = kinds == "ok"
+    kinds[ok & (draw < truncate_rate)] = "truncated"
+    kinds[ok & (draw >= truncate_rate) & (draw < truncate_rate + zero_rate)] = "zero"
+    kinds[0] = kinds[-1] = "ok"
+    return kinds.tolist()
+
+
+def write_file(path, data, attrs, truncate_to=None):
+    """classic 표준격자 파일 쓰기. truncate_to 이면 앞부분만 남긴 잘린 파일을 만듦"""
+    ny, nx = data.shape
+    payload = classic_sgd_bytes(ny, nx, data=data.astype(">i2").tobytes(), attrs=attrs,
+                                data_attrs={"data_scale": DATA_SCALE})
+    if truncate_to is not None:
+        payload = payload[:truncate_to]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(payload)
+    return len(payload)
+
+
+def generate_archive(root_directory=SYNTHETIC_ROOT, variables=("ta", "rn_day"), start=datetime(2020, 1, 1),
+                     days=7, freq="hour", size=513, gap_runs=3, max_gap=12, truncate_rate=0.01,
+                     zero_rate=0.01, truncate_fraction=0.2, seed=0, show_progress=True):
+    """
+    실제와 같은 경로·속성을 가진 합성 표준격자 아카이브를 만드는 함수.
+
+    파일마다 grid_nx, grid_ny, grid_size, map_slon, map_slat, map_sx, map_sy 전역 속성과 data_scale 을 쓰고,
+    바다 영역은 -9990 으로 채운다. 결측 구간, 잘린 파일, 0으로 채운 파일을 주입하고
+    주입 내역은 etc/synthetic/truth.csv 에 남겨 벤치마크가 검출 결과를 확인할 수 있게 한다.
+
+    Args:
+        root_directory (str): 아카이브 경로 (org/sgd 아래에 생성).
+        variables (tuple): 만들 변수.
+        start (datetime): 첫 시각.
+        days (int): 일 수.
+        freq (str): 'hour' 또는 'day'.
+        size (int): 격자 크기 (실제는 2049, 기본값 513 이면 파일당 약 0.5MB).
+        truncate_fraction (float): 잘린 파일에 남길 비율.
+
+    Returns:
+        pd.DataFrame: var, tm, path, kind, size (주입 내역 포함, 결측 시각은 size 0).
+    """
+    step = timedelta(hours=1) if freq == "hour" else timedelta(days=1)
+    times = [start + step * k for k in range(int(timedelta(days=days) / step))]
+    attrs = synthetic_geometry(size)
+    full_bytes = len(classic_sgd_bytes(size, size, attrs=attrs))
+
+    rows = []
+    for v, var in enumerate(variables):
+        generator = FieldGenerator(size, seed + v)
+        kinds = plan_defects(times, gap_runs, max_gap, truncate_rate, zero_rate, seed + v)
+        for k, (when, kind) in enumerate(tqdm(list(zip(times, kinds)), desc=f"{var} 합성 파일 생성",
+                                              disable=not show_progress)):
+            path = sgd_file_path(root_directory, var, when)
+            nbytes = 0
+            if kind == "gap":
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                data = generator.field(var, when, k)
+                if kind == "zero":
+                    data[generator.mask] = 0
+                truncate_to = int(full_bytes * truncate_fraction) if kind == "truncated" else None
+                file_attrs = dict(attrs, time=float(when.strftime("%Y%m%d%H%M")))
+                nbytes = write_file(path, data, file_attrs, truncate_to)
+            rows.append({'var': var, 'tm': when.strftime("%Y%m%d%H%M"), 'path': path, 'kind': kind,
+                         'size': nbytes})
+
+    truth = pd.DataFrame(rows, columns=["var", "tm", "path", "kind", "size"])
+    info = {
+        'created': datetime.now().isoformat(timespec="seconds"),
+        'variables': list(variables),
+        'start': start.strftime("%Y%m%d%H%M"),
+        'end': times[-1].strftime("%Y%m%d%H%M"),
+        'freq': freq,
+        'size': size,
+        'seed': seed,
+        'files': int((truth['kind'] != "gap").sum()),
+        'bytes': int(truth['size'].sum()),
+        'full_file_bytes': full_bytes,
+        'defects': {kind: int(n) for kind, n in truth['kind'].value_counts().items()},
+    }
+    info_path = os.path.join(root_directory, ARCHIVE_INFO_RELPATH)
+    os.makedirs(os.path.dirname(info_path), exist_ok=True)
+    truth.to_csv(os.path.join(root_directory, TRUTH_RELPATH), index=False)
+    with open(info_path, "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    return truth
+
+
+def load_archive(root_directory=SYNTHETIC_ROOT):
+    """(생성 조건 dict, 주입 내역 DataFrame). 아카이브가 없으면 (None, None)"""
+    info_path = os.path.join(root_directory, ARCHIVE_INFO_RELPATH)
+    if not os.path.exists(info_path):
+        return None, None
+    with open(info_path, encoding="utf-8") as f:
+        info = json.load(f)
+    truth = pd.read_csv(os.path.join(root_directory, TRUTH_RELPATH), dtype={'tm': str})
+    return info, truth
+
+
+def main():
+    print("\n=== 합성 표준격자 아카이브 생성 ===")
+    root_directory = input(f"생성할 경로를 입력하세요 [기본값: {SYNTHETIC_ROOT}]: ").strip() or SYNTHETIC_ROOT
+    size = int(input("격자 크기를 입력하세요 (실제 2049) [기본값: 513]: ").strip() or 513)
+    days = int(input("생성할 일 수를 입력하세요 [기본값: 7]: ").strip() or 7)
+    freq = input("시간 빈도를 입력하세요 ('hour' 또는 'day') [기본값: hour]: ").strip() or "hour"
+
+    truth = generate_archive(root_directory, size=size, days=days, freq=freq)
+    print(truth.groupby(['var', 'kind']).size().to_string())
+    print(f"📁 생성 완료: {root_directory} ({truth['size'].sum() / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import os
+import json
+import time
+import shutil
+import signal
+import pstats
+import cProfile
+import functools
+import itertools
+import threading
+import contextlib
+import subprocess
+from datetime import datetime
+
+# 추적 결과 경로 (실행마다 {스크립트}_{시각(µs)}_{pid}_{순번}.trace.json / .summary.json)
+TRACE_DIRECTORY = "/home/papalio/test_research/RMSE_TEST/TRACE"
+
+# 환경변수: SGD_TRACE=1 (기본 경로) 또는 SGD_TRACE=<경로> 로 켜고, SGD_PROFILE=cprofile|pyspy 로 프로파일링 추가
+TRACE_ENV = "SGD_TRACE"
+PROFILE_ENV = "SGD_PROFILE"
+RUN_ENV = "SGD_TRACE_RUN"
+
+# 이 개수만큼 이벤트가 쌓이면 프로세스별 파일로 내보냄
+FLUSH_EVENTS = 5000
+
+_STATE = None     # 현재 프로세스의 추적 상태 (꺼져 있으면 None)
+_ENV_PID = None   # 환경변수를 확인한 프로세스 (fork 된 워커는 다시 확인)
+_RUN_SEQ = itertools.count()   # 같은 프로세스에서 같은 시각에 시작한 실행 구분
+
+
+def _now_us():
+    # 프로세스끼리 비교할 수 있도록 벽시계 기준 (Chrome trace 의 ts 단위 µs)
+    return time.time_ns() // 1000
+
+
+def _new_state(directory, run_id, profile, pid):
+    state = {'dir': directory, 'run': run_id, 'pid': pid, 'events': [], 'counters': {}, 'profile': profile,
+             'profiler': None, 'lock': threading.Lock()}
+    os.makedirs(os.path.join(directory, run_id), exist_ok=True)
+    if profile == "cprofile":
+        state['profiler'] = cProfile.Profile()
+        state['profiler'].enable()
+    return state
+
+
+def _current():
+    """현재 프로세스의 추적 상태. 워커는 부모가 넘긴 환경변수로 같은 실행에 합류한다"""
+    global _STATE, _ENV_PID
+    pid = os.getpid()
+    if _STATE is not None and _STATE['pid'] == pid:
+        return _STATE
+    if _ENV_PID == pid and _STATE is None:
+        return None
+    _ENV_PID = pid
+    directory, run_id = os.environ.get(TRACE_ENV), os.environ.get(RUN_ENV)
+    _STATE = _new_state(directory, run_id, os.environ.get(PROFILE_ENV), pid) if directory and run_id else None
+    if _STATE is not None:
+        _STATE['events'].append({'name': "process_name", 'ph': "M", 'pid': pid, 'args': {'name': f"worker {pid}"}})
+    return _STATE
+
+
+def enabled():
+    return _current() is not None
+
+
+def _record(state, event):
+    with state['lock']:
+        state['events'].append(event)
+        full = len(state['events']) >= FLUSH_EVENTS
+    if full:
+        flush()
+
+
+class _Span:
+    __slots__ = ("state", "name", "cat", "args", "start")
+
+    def __init__(self, state, name, cat, args):
+        self.state, self.name, self.cat, self.args = state, name, cat, args
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        event = {'name': self.name, 'cat': self.cat, 'ph': "X", 'ts': self.start, 'dur': _now_us() - self.start,
+                 'pid': self.state['pid'], 'tid': threading.get_native_id()}
+        if self.args or exc_type is not None:
+            event['args'] = dict(self.args, error=exc_type.__name__) if exc_type is not None else self.args
+        _record(self.state, event)
+        return False
+
+
+_NULL = contextlib.nullcontext()
+
+
+def span(name, cat="compute", **args):
+    """
+    구간 시간 측정. 추적이 꺼져 있으면 아무것도 하지 않는 컨텍스트를 돌려준다.
+
+    cat 은 단계 구분 (scan, open, decode, compute, write, worker) 으로 요약의 단계별 시간이 된다.
+
+    with span("read_block", "decode", files=len(paths)):
+        ...
+    """
+    state = _current()
+    return _NULL if state is None else _Span(state, name, cat, args)
+
+
+def traced(cat="compute", name=None):
+    """함수 전체를 span 으로 감싸는 데코레이터 (이름은 함수 이름)"""
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            state = _current()
+            if state is None:
+                return func(*args, **kwargs)
+            with _Span(state, label, cat, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """누적 카운터 증가 (읽은 바이트 수 등). 프로세스별로 합산해 flush 때 기록"""
+    state = _current()
+    if state is not None:
+        with state['lock']:
+            state['counters'][name] = state['counters'].get(name, 0) + value
+
+
+def gauge(name, value):
+    """순간 값 기록 (큐 깊이, 동시 실행 수 등). Chrome trace 에서 그래프로 보임"""
+    state = _current()
+    if state is not None:
+        _record(state, {'name': name, 'ph': "C", 'ts': _now_us(), 'pid': state['pid'], 'args': {name: value}})
+
+
+def flush():
+    """
+    모아 둔 이벤트와 카운터를 {실행}/events_{pid}.jsonl 에 덧붙여 쓰는 함수.
+
+    프로세스 풀 워커는 종료 처리가 보장되지 않으므로 작업(배치)이 끝날 때마다 호출한다.
+    """
+    state = _current()
+    if state is None:
+        return
+    with state['lock']:
+        events, state['events'] = state['events'], []
+        if state['counters']:
+            events.append({'name': "counters", 'ph': "C", 'ts': _now_us(), 'pid': state['pid'],
+                           'args': dict(state['counters'])})
+    if events:
+        path = os.path.join(state['dir'], state['run'], f"events_{state['pid']}.jsonl")
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+    if state['profiler'] is not None:
+        # dump_stats 는 create_stats 로 프로파일러를 멈추므로 다시 켠다 (누적 결과라 파일은 덮어씀)
+        state['profiler'].dump_stats(os.path.join(state['dir'], state['run'], f"profile_{state['pid']}.prof"))
+        state['profiler'].enable()
+
+
+def _read_events(part_dir):
+    events = []
+    for name in sorted(os.listdir(part_dir)):
+        if name.startswith("events_") and name.endswith(".jsonl"):
+            with open(os.path.join(part_dir, name), encoding="utf-8") as f:
+                events.extend(json.loads(line) for line in f if line.strip())
+    return events
+
+
+def summarize(events, wall_us):
+    """
+    이벤트로 실행 요약을 만드는 함수.
+
+    Returns:
+        dict: stages (단계별 누적 시간), spans (이름별 횟수/합계/평균/최대), counters (프로세스 합계),
+              workers (워커별 처리 배치 수, 작업 시간, 사용률), gauges (최대/평균).
+    """
+    stages, spans, workers, gauges, counters = {}, {}, {}, {}, {}
+    for e in events:
+        if e['ph'] == "X":
+            dur_s = e['dur'] / 1e6
+            stage = stages.setdefault(e['cat'], {'count': 0, 'total_s': 0.0})
+            stage['count'] += 1
+            stage['total_s'] += dur_s
+            s = spans.setdefault(e['name'], {'cat': e['cat'], 'count': 0, 'total_s': 0.0, 'max_ms': 0.0})
+            s['count'] += 1
+            s['total_s'] += dur_s
+            s['max_ms'] = max(s['max_ms'], e['dur'] / 1e3)
+            if e['cat'] == "worker":
+                w = workers.setdefault(e['pid'], {'pid': e['pid'], 'batches': 0, 'items': 0, 'busy_s': 0.0})
+                w['batches'] += 1
+                w['items'] += (e.get('args') or {}).get('items', 0)
+                w['busy_s'] += dur_s
+        elif e['ph'] == "C":
+            if e['name'] == "counters":
+                counters[e['pid']] = e['args']   # 누적값이므로 프로세스별 마지막 값
+            else:
+                gauges.setdefault(e['name'], []).append(e['args'][e['name']])
+
+    totals = {}
+    for values in counters.values():
+        for name, value in values.items():
+            totals[name] = totals.get(name, 0) + value
+    for s in spans.values():
+        s['mean_ms'] = s['total_s'] * 1e3 / s['count']
+    wall_s = wall_us / 1e6
+    for w in workers.values():
+        w['utilization'] = w['busy_s'] / wall_s if wall_s > 0 else None
+    return {
+        'wall_s': wall_s,
+        'stages': stages,
+        'spans': dict(sorted(spans.items(), key=lambda kv: -kv[1]['total_s'])),
+        'counters': totals,
+        'workers': sorted(workers.values(), key=lambda w: w['pid']),
+        'gauges': {name: {'max': max(v), 'mean': sum(v) / len(v), 'samples': len(v)} for name, v in gauges.items()},
+    }
+
+
+def _start_pyspy(path):
+    """py-spy 가 설치되어 있으면 현재 프로세스와 자식 프로세스를 샘플링 (speedscope 형식)"""
+    exe = shutil.which("py-spy")
+    if exe is None:
+        print("⚠ py-spy 를 찾을 수 없어 샘플링 프로파일을 건너뜁니다.")
+        return None
+    return subprocess.Popen([exe, "record", "--pid", str(os.getpid()), "--subprocesses",
+                             "--format", "speedscope", "--output", path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+@contextlib.contextmanager
+def trace_run(name, directory=None, profile=None):
+    """
+    스크립트 한 번 실행의 추적 구간. main 의 데코레이터로도 쓸 수 있다.
+
+    directory 를 주거나 SGD_TRACE 환경변수가 있을 때만 켜지며, 꺼져 있으면 아무것도 하지 않는다.
+    끝나면 모든 프로세스의 이벤트를 합쳐 Chrome trace(chrome://tracing, Perfetto 에서 열기)와
+    요약 JSON 을 쓴다. profile='cprofile' 이면 프로세스별 cProfile 을 합친 .prof,
+    'pyspy' 이면 py-spy speedscope 파일을 함께 남긴다.
+
+    SGD_TRACE=1 SGD_PROFILE=cprofile python check_0_filled_files_3.py
+    """
+    global _STATE, _ENV_PID
+    setting = directory or os.environ.get(TRACE_ENV)
+    if not setting or _current() is not None:   # 꺼져 있거나 이미 바깥 실행 안
+        yield None
+        return
+    directory = TRACE_DIRECTORY if setting == "1" else setting
+    profile = profile or os.environ.get(PROFILE_ENV)
+    pid = os.getpid()
+    run_id = f"{name}_{datetime.now():%Y%m%d_%H%M%S_%f}_{pid}_{next(_RUN_SEQ)}"
+
+    # 이후 만들어지는 워커 프로세스가 같은 실행 ID 로 기록하도록 환경변수로 넘김
+    saved_env = {key: os.environ.get(key) for key in (TRACE_ENV, RUN_ENV, PROFILE_ENV)}
+    os.environ.update({TRACE_ENV: directory, RUN_ENV: run_id})
+    if profile:
+        os.environ[PROFILE_ENV] = profile
+    _STATE = _new_state(directory, run_id, profile if profile == "cprofile" else None, pid)
+    _ENV_PID = pid
+    _STATE['events'].append({'name': "process_name", 'ph': "M", 'pid': pid, 'args': {'name': f"main {name}"}})
+    pyspy_path = os.path.join(directory, f"{run_id}.speedscope.json")
+    pyspy = _start_pyspy(pyspy_path) if profile == "pyspy" else None
+
+    start = _now_us()
+    try:
+        with span(name, "run"):
+            yield run_id
+    finally:
+        wall_us = _now_us() - start
+        flush()
+        if pyspy is not None:
+            pyspy.send_signal(signal.SIGINT)
+            pyspy.wait(timeout=60)
+        state = _STATE
+        if state['profiler'] is not None:
+            state['profiler'].disable()
+        _STATE = None
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+        part_dir = os.path.join(directory, run_id)
+        events = _read_events(part_dir)
+        summary = summarize(events, wall_us)
+        summary.update(run=run_id, name=name, pid=pid, started=datetime.fromtimestamp(start / 1e6).isoformat())
+
+        profiles = [os.path.join(part_dir, n) for n in sorted(os.listdir(part_dir)) if n.endswith(".prof")]
+        if profiles:
+            summary['profile'] = os.path.join(directory, f"{run_id}.prof")
+            pstats.Stats(*profiles).dump_stats(summary['profile'])
+        if pyspy is not None and os.path.exists(pyspy_path):
+            summary['pyspy'] = pyspy_path
+
+        trace_path = os.path.join(directory, f"{run_id}.trace.json")
+        with open(trace_path, "w", encoding="utf-8") as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': "ms", 'otherData': {'run': run_id}}, f)
+        summary_path = os.path.join(directory, f"{run_id}.summary.json")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+        print(f"\n⏱ 단계별 시간 (프로세스 합계, 실행 {summary['wall_s']:.1f}초)")
+        for stage, s in sorted(summary['stages'].items(), key=lambda kv: -kv[1]['total_s']):
+            print(f" - {stage}: {s['total_s']:.2f}초 ({s['count']:,}회)")
+        for counter, value in summary['counters'].items():
+            print(f" - {counter}: {value:,}")
+        print(f"📄 추적 저장: {trace_path}")
@@ -0,0 +1,440 @@
+import os
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from sgd_grid import geometry_hash, lonlat_grid, lonlat_to_ij
+from sgd_mmap import open_sgd_data
+from sgd_trace import traced, trace_run
+
+# 사용자 정의 경로 설정
+ROOT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
+OUTPUT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/RESULTS/zonal"
+
+# 지역 경계 (GeoJSON, 경위도 EPSG:4326). 시도 경계 shp 는 ogr2ogr -t_srs EPSG:4326 -f GeoJSON 으로 변환해 둔다
+REGION_DIRECTORY = "/home/papalio/test_research/DATA/etc/regions"
+REGION_FILE = os.path.join(REGION_DIRECTORY, "sido.geojson")
+REGION_NAME_FIELD = "CTP_KOR_NM"
+
+# 격자별 지역 번호 캐시 경로
+CACHE_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA/etc/zones"
+
+# 결측값 (저장된 정수값 기준)
+MISSING_VALUE = -9990
+
+# 지구 반지름 (km, 격자 면적 계산용)
+EARTH_RADIUS_KM = 6371.00877
+
+# (시각 × 격자) 블록 하나의 최대 원소 수 (bincount 인덱스/가중치 임시 배열 크기 제한)
+BLOCK_VALUES = 1 << 22
+
+# 정수 자료 분위수를 (지역 × 값) 히스토그램으로 구할 때의 최대 구간 수 (넘으면 정렬로 계산)
+HISTOGRAM_LIMIT = 1 << 22
+
+
+def read_regions(path=REGION_FILE, name_field=REGION_NAME_FIELD):
+    """
+    GeoJSON 에서 지역 이름과 경계 고리(ring) 목록을 읽는 함수.
+
+    Polygon / MultiPolygon 만 사용하며, 같은 이름의 feature 는 한 지역으로 합친다 (섬 등).
+    구멍(내부 고리)은 짝홀 규칙으로 처리되므로 외곽/내부 구분 없이 고리만 모은다.
+
+    Returns:
+        (list, list): (지역 이름, 지역별 [(lon, lat) 배열, ...]).
+    """
+    with open(path, encoding="utf-8") as f:
+        collection = json.load(f)
+
+    names, rings = [], {}
+    for feature in collection['features']:
+        name = str(feature['properties'][name_field])
+        geometry = feature['geometry']
+        if geometry is None:
+            continue
+        if geometry['type'] == "Polygon":
+            polygons = [geometry['coordinates']]
+        elif geometry['type'] == "MultiPolygon":
+            polygons = geometry['coordinates']
+        else:
+            continue
+        if name not in rings:
+            names.append(name)
+            rings[name] = []
+        for polygon in polygons:
+            for ring in polygon:
+                xy = np.asarray(ring, dtype=np.float64)[:, :2]
+                rings[name].append((xy[:, 0], xy[:, 1]))
+    return names, [rings[name] for name in names]
+
+
+def _scanline_mask(rings_ij, nx, ny):
+    """
+    격자 좌표 (i, j) 로 바꾼 고리들을 짝홀 규칙으로 채운 (ny, nx) 마스크.
+
+    격자 중심 (열 c, 행 r) 을 지나는 수평선과 각 변의 교점을 한 번에 구해 행별로 정렬하고,
+    교점 두 개씩 사이의 격자를 누적합(diff → cumsum) 으로 채운다. 변 수 × 지나는 행 수에 비례.
+    """
+    rows, xs = [], []
+    for i, j in rings_ij:
+        i1, j1 = np.roll(i, -1), np.roll(j, -1)
+        lo = np.clip(np.ceil(np.minimum(j, j1)), 0, ny)   # 변이 지나는 행: min(j) <= r < max(j)
+        hi = np.clip(np.ceil(np.maximum(j, j1)), 0, ny)
+        n = (hi - lo).astype(np.int64)
+        if n.sum() == 0:
+            continue
+        edge = np.repeat(np.arange(i.size), n)
+        r = lo[edge] + (np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n))
+        t = (r - j[edge]) / (j1[edge] - j[edge])
+        rows.append(r.astype(np.int64))
+        xs.append(i[edge] + t * (i1[edge] - i[edge]))
+
+    mask = np.zeros((ny, nx), dtype=bool)
+    if not rows:
+        return mask
+    r = np.concatenate(rows)
+    x = np.concatenate(xs)
+    order = np.lexsort((x, r))
+    r, x = r[order], x[order]
+
+    # 행마다 교점 수는 짝수 → (0,1), (2,3), ... 사이가 내부. 중심 c 가 xa <= c < xb 인 격자
+    start = np.clip(np.ceil(x[0::2]), 0, nx).astype(np.int64)
+    stop = np.clip(np.ceil(x[1::2]), 0, nx).astype(np.int64)
+    diff = np.zeros((ny, nx + 1), dtype=np.int8)
+    np.add.at(diff, (r[0::2], start), 1)
+    np.add.at(diff, (r[0::2], stop), -1)
+    return np.cumsum(diff[:, :nx], axis=1, dtype=np.int8) > 0
+
+
+def rasterize(regions, to_ij, nx, ny):
+    """
+    지역 경계를 격자 지역 번호 배열로 바꾸는 함수.
+
+    Args:
+        regions (list): read_regions 의 지역별 고리 목록.
+        to_ij (callable): (lon, lat) → (열 i, 행 j) 실수 격자 좌표.
+        nx, ny (int): 격자 크기.
+
+    Returns:
+        np.ndarray: (ny, nx) int16, 0 은 지역 밖, k 는 regions[k-1]. 겹치면 앞 지역 우선.
+    """
+    labels = np.zeros((ny, nx), dtype=np.int16)
+    for k, rings in enumerate(regions, start=1):
+        rings_ij = [tuple(np.atleast_1d(a) for a in to_ij(lon, lat)) for lon, lat in rings]
+        mask = _scanline_mask(rings_ij, nx, ny)
+        labels[mask & (labels == 0)] = k
+    return labels
+
+
+def cell_area(lon, lat):
+    """
+    2차원 경위도 격자의 격자 면적 (km², 좌표 변환 자코비안 |∂(lon,lat)/∂(i,j)| × R² cos(lat)).
+
+    LCC 표준격자, 등간격 경위도 격자 모두 같은 식으로 계산된다.
+    """
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    dlon_j, dlon_i = np.gradient(lon)
+    dlat_j, dlat_i = np.gradient(lat)
+    return EARTH_RADIUS_KM ** 2 * np.cos(lat) * np.abs(dlon_i * dlat_j - dlon_j * dlat_i)
+
+
+def _region_key(region_path, name_field):
+    st = os.stat(region_path)
+    return f"{os.path.abspath(region_path)}:{st.st_size}:{st.st_mtime_ns}:{name_field}"
+
+
+def _load_or_build(grid_key, nx, ny, to_ij, lonlat, region_path, name_field, cache_dir):
+    """지역 번호/면적을 디스크 캐시에서 읽고, 없으면 만들어 저장"""
+    key = hashlib.sha1(f"{grid_key}|{_region_key(region_path, name_field)}".encode()).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"zones_{key}.npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            return RegionMask(cached['labels'], cached['area'], cached['names'].tolist())
+
+    names, regions = read_regions(region_path, name_field)
+    labels = rasterize(regions, to_ij, nx, ny)
+    lon, lat = lonlat()
+    area = cell_area(lon, lat).astype(np.float32)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = cache_path + ".tmp.npz"
+    np.savez(tmp_path, labels=labels, area=area, names=np.array(names))
+    os.replace(tmp_path, cache_path)
+    return RegionMask(labels, area, names)
+
+
+def sgd_regions(geom, region_path=REGION_FILE, name_field=REGION_NAME_FIELD, cache_dir=CACHE_DIRECTORY):
+    """표준격자 (LCC, sgd_grid.grid_geometry) 의 지역 마스크 (격자 정의 + 경계 파일별로 한 번만 계산)"""
+    return _load_or_build(f"sgd:{geometry_hash(geom)}", geom['nx'], geom['ny'],
+                          lambda lon, lat: lonlat_to_ij(lon, lat, geom), lambda: lonlat_grid(geom),
+                          region_path, name_field, cache_dir)
+
+
+def _axis(coord, name):
+    """등간격 1차원 좌표 → (첫 값, 간격)"""
+    step = (coord[-1] - coord[0]) / (coord.size - 1)
+    if not np.allclose(np.diff(coord), step, rtol=1e-3, atol=0):
+        raise ValueError(f"{name} 좌표가 등간격이 아닙니다.")
+    return coord[0], step
+
+
+def lonlat_regions(lon, lat, region_path=REGION_FILE, name_field=REGION_NAME_FIELD, cache_dir=CACHE_DIRECTORY):
+    """
+    등간격 경위도 격자 (예: SSP 601 × 751) 의 지역 마스크.
+
+    lon, lat 은 1차원 좌표 (nc 의 longitude, latitude) 또는 같은 격자의 2차원 배열
+    (SSP_LON.bin, SSP_LAT.bin). 2차원이면 행/열 방향으로 분리되는 격자여야 한다.
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    if lon.ndim == 2:
+        if not (np.allclose(lon, lon[:1, :]) and np.allclose(lat, lat[:, :1])):
+            raise ValueError("행/열 방향으로 분리되지 않는 2차원 경위도 격자는 지원하지 않습니다.")
+        lon, lat = lon[0], lat[:, 0]
+    lon0, dlon = _axis(lon, "경도")
+    lat0, dlat = _axis(lat, "위도")
+
+    h = hashlib.sha1()
+    h.update(lon.tobytes())
+    h.update(lat.tobytes())
+    return _load_or_build(f"lonlat:{h.hexdigest()[:16]}", lon.size, lat.size,
+                          lambda x, y: ((np.asarray(x) - lon0) / dlon, (np.asarray(y) - lat0) / dlat),
+                          lambda: np.meshgrid(lon, lat), region_path, name_field, cache_dir)
+
+
+class RegionMask:
+    """
+    격자별 지역 번호 (0: 지역 밖) 와 격자 면적.
+
+    지역 안 격자만 지역 번호 순으로 정렬해 두고 (cells), 통계는 이 격자들만
+    (시각 × 격자) 블록으로 읽어 np.bincount / reduceat 한 번씩으로 모든 지역·시각을 계산한다.
+    """
+
+    def __init__(self, labels, area, names):
+        self.labels = labels
+        self.area = area
+        self.names = list(names)
+        flat = labels.reshape(-1)
+        cells = np.flatnonzero(flat > 0)
+        cells = cells[np.argsort(flat[cells], kind="stable")]
+        self.cells = cells
+        self.cell_labels = flat[cells].astype(np.int64) - 1
+        self.cell_area = area.reshape(-1)[cells].astype(np.float64)
+        # 지역별 격자 구간 [starts[k], ends[k]) (격자가 없는 작은 지역은 빈 구간)
+        self.starts = np.searchsorted(self.cell_labels, np.arange(len(self.names)), side="left")
+        self.ends = np.searchsorted(self.cell_labels, np.arange(len(self.names)), side="right")
+
+    @property
+    def shape(self):
+        return self.labels.shape
+
+    def block_times(self):
+        """BLOCK_VALUES 안에 들어가는 시각 수"""
+        return max(1, BLOCK_VALUES // max(self.cells.size, 1))
+
+    def region_area(self):
+        """지역별 전체 면적 (km²)"""
+        return np.bincount(self.cell_labels, weights=self.cell_area, minlength=len(self.names))
+
+    def reduce(self, samples, scales=1.0, missing=MISSING_VALUE, percentiles=()):
+        """
+        지역 안 격자 값 (time, len(cells)) 에서 지역별 면적 가중 통계를 계산하는 함수.
+
+        Args:
+            samples (np.ndarray): 저장된 값 (정수값 또는 물리값), 열 순서는 self.cells.
+            scales (float | array): 시각별 data_scale (물리값이면 1).
+            missing: 결측값 (float 자료는 NaN 도 결측).
+            percentiles (tuple): 면적 가중 분위수 (0~100, 누적 면적이 q% 이상이 되는 가장 작은 값).
+
+        Returns:
+            dict: count, area, mean, min, max, p{q} → (time, 지역 수) 배열 (유효 격자가 없으면 NaN).
+        """
+        samples = np.asarray(samples)
+        n_time, n_cells = samples.shape
+        n_region = len(self.names)
+        scales = np.broadcast_to(np.asarray(scales, dtype=np.float64), (n_time,))[:, None]
+
+        valid = samples != missing
+        if np.issubdtype(samples.dtype, np.floating):
+            valid &= np.isfinite(samples)
+        weight = np.where(valid, self.cell_area, 0.0)
+
+        # 시각 t, 지역 k → t * 지역 수 + k 하나의 bincount 로 모든 시각·지역 합계
+        idx = (np.arange(n_time)[:, None] * n_region + self.cell_labels).ravel()
+        size = n_time * n_region
+        count = np.bincount(idx, weights=valid.ravel(), minlength=size).reshape(n_time, n_region)
+        area = np.bincount(idx, weights=weight.ravel(), minlength=size).reshape(n_time, n_region)
+        total = np.bincount(idx, weights=(weight * np.where(valid, samples, 0)).ravel(),
+                            minlength=size).reshape(n_time, n_region)
+
+        empty = count == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = {'count': count.astype(np.int64), 'area': area,
+                      'mean': np.where(empty, np.nan, total / area) / scales}
+
+        # 최소/최대: 지역별 격자 구간에 reduceat (결측은 비교에서 지지 않는 값으로 채움)
+        if samples.dtype.kind in "iu":
+            info = np.iinfo(samples.dtype)
+            big, small = info.max, info.min
+        else:
+            big, small = np.inf, -np.inf
+        has_cells = self.ends > self.starts   # 격자가 있는 지역의 시작 위치만 넘겨야 구간이 맞음
+        for key, fill, func in (("min", big, np.minimum), ("max", small, np.maximum)):
+            out = np.full((n_time, n_region), np.nan)
+            if n_cells:
+                out[:, has_cells] = func.reduceat(np.where(valid, samples, fill), self.starts[has_cells], axis=1)
+            out[empty] = np.nan
+            result[key] = out / scales
+
+        if percentiles:
+            q = np.asarray(percentiles, dtype=np.float64) / 100.0
+            values = np.full((len(q), n_time, n_region), np.nan)
+            for t in range(n_time):
+                values[:, t] = self._percentiles(samples[t], valid[t], q)
+            for k, p in enumerate(percentiles):
+                result[f"p{p:g}"] = values[k] / scales
+        return result
+
+    def _percentiles(self, row, valid, q):
+        """한 시각의 지역별 면적 가중 분위수 (q: 0~1) → (len(q), 지역 수), 저장된 값 단위"""
+        n_region = len(self.names)
+        v = row[valid]
+        lab = self.cell_labels[valid]
+        w = self.cell_area[valid]
+        out = np.full((len(q), n_region), np.nan)
+        if v.size == 0:
+            return out
+        has = np.bincount(lab, minlength=n_region) > 0
+
+        if v.dtype.kind in "iu" and (int(v.max()) - int(v.min()) + 1) * n_region <= HISTOGRAM_LIMIT:
+            # 정수 자료: (지역 × 값) 히스토그램을 bincount 한 번으로 → 누적 면적
+            offset = int(v.min())
+            width = int(v.max()) - offset + 1
+            hist = np.bincount(lab * width + (v.astype(np.int64) - offset), weights=w,
+                               minlength=n_region * width).reshape(n_region, width)
+            cum = np.cumsum(hist, axis=1)
+            totals = cum[:, -1]
+            for k, qk in enumerate(q):
+                target = np.maximum(qk * totals, totals * 1e-12)[:, None]
+                pos = np.minimum(np.sum(cum < target, axis=1), width - 1)
+                out[k, has] = (pos + offset)[has]
+            return out
+
+        # 그 외: 지역 → 값 순 정렬 후 전체 누적 면적에서 지역별 목표 위치 검색
+        order = np.lexsort((v, lab))
+        v, lab, w = v[order], lab[order], w[order]
+        cum = np.cumsum(w)
+        first = np.searchsorted(lab, np.arange(n_region), side="left")
+        last = np.searchsorted(lab, np.arange(n_region), side="right") - 1
+        before = np.where(first > 0, cum[np.maximum(first - 1, 0)], 0.0)
+        totals = np.where(has, cum[np.maximum(last, 0)] - before, 0.0)
+        for k, qk in enumerate(q):
+            target = before + np.maximum(qk * totals, totals * 1e-12)
+            pos = np.clip(np.searchsorted(cum, target, side="left"), first, np.maximum(last, first))
+            out[k, has] = v[np.minimum(pos, v.size - 1)][has]
+        return out
+
+
+def zonal_array(values, regions, data_scale=1.0, missing=MISSING_VALUE, percentiles=()):
+    """
+    메모리에 있는 (time, ny, nx) 배열 (PackedStack.data, xarray .values 등) 의 지역 통계.
+
+    Returns:
+        dict: RegionMask.reduce 와 같음.
+    """
+    values = np.asarray(values)
+    if values.ndim == 2:
+        values = values[None]
+    flat = values.reshape(values.shape[0], -1)
+    scales = np.broadcast_to(np.asarray(data_scale, dtype=np.float64), (flat.shape[0],))
+
+    parts = []
+    step = regions.block_times()
+    for start in range(0, flat.shape[0], step):
+        stop = start + step
+        parts.append(regions.reduce(flat[start:stop, regions.cells], scales[start:stop], missing, percentiles))
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+
+@traced("compute")
+def zonal_files(paths, regions, percentiles=(), show_progress=True):
+    """
+    표준격자 파일 목록의 지역 통계 (물리 단위, 한 번의 순회).
+
+    파일마다 memmap 에서 지역 안 격자만 정수값 그대로 읽어 block_times() 개씩 묶고,
+    묶음마다 reduce 를 한 번 호출한다. 읽을 수 없는 파일의 행은 NaN.
+
+    Returns:
+        dict: RegionMask.reduce 와 같음 ((파일 수, 지역 수) 배열).
+    """
+    step = regions.block_times()
+    parts = []
+    for start in tqdm(range(0, len(paths), step), desc="지역 통계", disable=not show_progress):
+        chunk = paths[start:start + step]
+        samples = np.full((len(chunk), regions.cells.size), MISSING_VALUE, dtype=np.int16)
+        scales = np.ones(len(chunk))
+        for k, path in enumerate(chunk):
+            try:
+                grid = open_sgd_data(path)
+            except Exception as e:
+                print(f"⚠ 파일 읽기 실패: {path} - {e}")
+                continue
+            samples[k] = grid['data'].reshape(-1)[regions.cells]
+            scales[k] = grid['data_scale']
+        parts.append(regions.reduce(samples, scales, MISSING_VALUE, percentiles))
+    if not parts:
+        return {}
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+
+def to_frame(result, times, names):
+    """reduce / zonal_files 결과 → tm, region 별 한 행의 DataFrame"""
+    n_time, n_region = result['mean'].shape
+    frame = pd.DataFrame({'tm': np.repeat(np.asarray(times), n_region),
+                          'region': np.tile(np.asarray(names, dtype=object), n_time)})
+    for key, value in result.items():
+        frame[key] = value.reshape(-1)
+    return frame
+
+
+@trace_run("sgd_zonal")
+def main():
+    from sgd_grid import read_geometry
+    from sgd_manifest import refresh_manifest, query_files
+
+    print("\n=== 표준격자 지역 평균 시계열 ===")
+    var = input("변수를 입력하세요 (rn_day, hm, ta, ws_10m) [기본값: ta]: ").strip() or "ta"
+    start = input("시작일을 입력하세요 (YYYYMMDD) [기본값: 20200101]: ").strip() or "20200101"
+    end = input("종료일을 입력하세요 (YYYYMMDD) [기본값: 20211231]: ").strip() or "20211231"
+    hour = input("시각(HH)을 입력하세요 (전체: all) [기본값: 00]: ").strip() or "00"
+    region_path = input(f"지역 경계 GeoJSON 경로 [기본값: {REGION_FILE}]: ").strip() or REGION_FILE
+    name_field = input(f"지역 이름 속성 [기본값: {REGION_NAME_FIELD}]: ").strip() or REGION_NAME_FIELD
+    percentiles = input("분위수를 입력하세요 (쉼표 구분, 없으면 빈칸) [기본값: 10,50,90]: ").strip()
+    percentiles = tuple(float(p) for p in (percentiles or "10,50,90").split(",") if p.strip())
+
+    refresh_manifest(ROOT_DIRECTORY)
+    files = query_files(ROOT_DIRECTORY, var=var, start=f"{start}0000", end=f"{end}2359")
+    if hour != "all":
+        files = files[files['tm'].str[8:10] == hour.zfill(2)]
+    if files.empty:
+        print("❌ 대상 파일이 없습니다.")
+        return
+    print(f"대상 파일: {len(files):,}개")
+
+    regions = sgd_regions(read_geometry(files['path'].iloc[0]), region_path, name_field)
+    print(f"지역 {len(regions.names)}개, 지역 안 격자 {regions.cells.size:,}개")
+
+    result = zonal_files(files['path'].tolist(), regions, percentiles)
+    frame = to_frame(result, pd.to_datetime(files['tm'], format="%Y%m%d%H%M"), regions.names)
+
+    os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
+    output_path = os.path.join(OUTPUT_DIRECTORY, f"zonal_{var}_{start}_{end}.csv")
+    frame.to_csv(output_path, index=False, encoding="utf-8-sig")
+    print(f"📊 지역 통계 저장 완료: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import pandas as pd
+
+from sgd_trace import trace_run
+
+# 사용자 정의 경로 설정
+RESULTS_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/RESULTS"
+
+# 지표별 정렬 기준 (MBE 는 0 에 가까울수록, corr 은 클수록 좋음)
+METRIC_ORDER = {
+    "rmse": "min",
+    "mae": "min",
+    "mbe": "abs",
+    "corr": "max",
+}
+
+
+def rank_metrics(df, metric="rmse", within=("by", "group")):
+    """
+    검증 지표 테이블에 순위를 매기고 정렬하는 함수.
+
+    Args:
+        df (pd.DataFrame): RMSE_vaildation_6.validate 결과.
+        metric (str): 순위 기준 지표 ('rmse', 'mae', 'mbe', 'corr').
+        within (tuple): 순위를 나눌 열 (예: 월별로 product 순위).
+
+    Returns:
+        pd.DataFrame: '{metric}_rank' 열이 추가되고 (within, 순위) 순으로 정렬된 테이블.
+    """
+    order = METRIC_ORDER[metric]
+    key = df[metric].abs() if order == "abs" else df[metric]
+    within = [c for c in within if c in df.columns]
+    ascending = order != "max"
+
+    if within:
+        key = key.groupby([df[c] for c in within])
+    rank_col = f"{metric}_rank"
+    ranked = df.assign(**{rank_col: key.rank(method="min", ascending=ascending)})
+    return ranked.sort_values(within + [rank_col], kind="stable", ignore_index=True)
+
+
+def best_products(df, metric="rmse", within=("by", "group")):
+    """그룹별 1위 자료만 추출"""
+    ranked = rank_metrics(df, metric, within)
+    return ranked[ranked[f"{metric}_rank"] == 1]
+
+
+@trace_run("sort_metrics_5")
+def main():
+    var = input("정렬할 변수를 입력하세요 (ta, rn_day) [기본값: ta]: ").strip() or "ta"
+    by = input("시간 그룹을 입력하세요 (month, season, all) [기본값: month]: ").strip() or "month"
+    metric = input("기준 지표를 입력하세요 (rmse, mae, mbe, corr) [기본값: rmse]: ").strip() or "rmse"
+
+    in_path = os.path.join(RESULTS_DIRECTORY, f"validation_{var}_{by}.csv")
+    df = pd.read_csv(in_path)
+    ranked = rank_metrics(df, metric)
+
+    out_path = os.path.join(RESULTS_DIRECTORY, f"validation_{var}_{by}_{metric}_ranked.csv")
+    ranked.to_csv(out_path, index=False)
+    print(f"정렬 결과 저장: {out_path}")
+
+    best = ranked[ranked[f"{metric}_rank"] == 1]
+    print(f"\n{by} 별 {metric.upper()} 1위 자료:")
+    print(best[["group", "product", metric]].to_string(index=False))
+    print(f"\n자료별 1위 횟수:\n{best['product'].value_counts().to_string()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import os
+import hashlib
+
+import numpy as np
+import scipy.sparse as sp
+
+from sgd_grid import read_geometry, geometry_hash, lonlat_to_ij
+from sgd_mmap import open_sgd_data
+from sgd_trace import traced
+
+# 가중치 캐시 경로
+CACHE_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA/etc/station_weights"
+
+# 결측값
+MISSING_VALUE = -9990
+
+METHODS = ("nearest", "bilinear", "idw")
+
+
+def _nearest(i, j, nx, ny):
+    """최근접 격자 (행 번호, 열 인덱스, 가중치)"""
+    ii = np.rint(i).astype(np.int64)
+    jj = np.rint(j).astype(np.int64)
+    rows = np.arange(i.size)
+    return rows, jj * nx + ii, np.ones(i.size), (ii >= 0) & (ii < nx) & (jj >= 0) & (jj < ny)
+
+
+def _bilinear(i, j, nx, ny):
+    """주변 4개 격자의 양선형 보간 가중치"""
+    i0 = np.floor(i).astype(np.int64)
+    j0 = np.floor(j).astype(np.int64)
+    fi = i - i0
+    fj = j - j0
+    di = np.array([0, 1, 0, 1])
+    dj = np.array([0, 0, 1, 1])
+    wi = np.stack([1 - fi, fi, 1 - fi, fi], axis=1)
+    wj = np.stack([1 - fj, 1 - fj, fj, fj], axis=1)
+
+    ci = i0[:, None] + di
+    cj = j0[:, None] + dj
+    rows = np.repeat(np.arange(i.size), 4)
+    inside = ((ci >= 0) & (ci < nx) & (cj >= 0) & (cj < ny)).ravel()
+    return rows, (cj * nx + ci).ravel(), (wi * wj).ravel(), inside
+
+
+def _idw(i, j, nx, ny, k, power):
+    """가까운 k개 격자의 역거리 가중치 (LCC 는 등각 투영이라 격자 좌표 거리를 그대로 사용)"""
+    r = int(np.ceil(np.sqrt(k) / 2)) + 1
+    offsets = np.arange(-r, r + 1)
+    di, dj = [a.ravel() for a in np.meshgrid(offsets, offsets)]
+
+    ci = np.rint(i).astype(np.int64)[:, None] + di
+    cj = np.rint(j).astype(np.int64)[:, None] + dj
+    dist = np.hypot(ci - i[:, None], cj - j[:, None])
+    nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    ci = np.take_along_axis(ci, nearest, axis=1)
+    cj = np.take_along_axis(cj, nearest, axis=1)
+    dist = np.take_along_axis(dist, nearest, axis=1)
+
+    w = 1.0 / np.maximum(dist, 1e-6) ** power
+    w /= w.sum(axis=1, keepdims=True)
+    rows = np.repeat(np.arange(i.size), k)
+    inside = ((ci >= 0) & (ci < nx) & (cj >= 0) & (cj < ny)).ravel()
+    return rows, (cj * nx + ci).ravel(), w.ravel(), inside
+
+
+def build_weights(geom, lons, lats, method="bilinear", k=4, power=2.0):
+    """
+    관측소 좌표에 대한 (관측소 수 × 격자 수) 희소 가중치 행렬을 만드는 함수.
+
+    격자 밖 관측소는 빈 행이 되어 추출 결과가 NaN 이 된다.
+
+    Args:
+        geom (dict): sgd_grid.grid_geometry 결과.
+        lons, lats (array): 관측소 경도, 위도.
+        method (str): 'nearest', 'bilinear', 'idw'.
+        k (int): idw 에 사용할 격자 수.
+        power (float): idw 거리 지수.
+
+    Returns:
+        scipy.sparse.csr_matrix: (len(lons), ny*nx).
+    """
+    if method not in METHODS:
+        raise ValueError(f"지원하지 않는 보간 방법: {method}")
+    nx, ny = geom['nx'], geom['ny']
+    i, j = lonlat_to_ij(lons, lats, geom)
+    i = np.atleast_1d(i)
+    j = np.atleast_1d(j)
+
+    if method == "nearest":
+        rows, cols, w, inside = _nearest(i, j, nx, ny)
+    elif method == "bilinear":
+        rows, cols, w, inside = _bilinear(i, j, nx, ny)
+    else:
+        rows, cols, w, inside = _idw(i, j, nx, ny, k, power)
+
+    return sp.csr_matrix((w[inside], (rows[inside], cols[inside])), shape=(i.size, nx * ny))
+
+
+def weights_key(geom, lons, lats, method, k=4, power=2.0):
+    """(격자 정의, 관측소 좌표, 보간 방법) 캐시 키"""
+    h = hashlib.sha1()
+    h.update(geometry_hash(geom).encode())
+    h.update(f"{method}:{k}:{power}".encode())
+    h.update(np.ascontiguousarray(lons, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(lats, dtype=np.float64).tobytes())
+    return h.hexdigest()[:16]
+
+
+def load_or_build_weights(geom, lons, lats, method="bilinear", k=4, power=2.0, cache_dir=CACHE_DIRECTORY):
+    """디스크 캐시에서 가중치를 읽고, 없으면 만들어 저장"""
+    cache_path = os.path.join(cache_dir, f"weights_{method}_{weights_key(geom, lons, lats, method, k, power)}.npz")
+    if os.path.exists(cache_path):
+        return sp.load_npz(cache_path).tocsr()
+
+    weights = build_weights(geom, lons, lats, method, k, power)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = cache_path + ".tmp.npz"
+    sp.save_npz(tmp_path, weights)
+    os.replace(tmp_path, cache_path)
+    return weights
+
+
+@traced("compute")
+def extract(weights, grids):
+    """
+    격자 묶음에서 관측소 값을 추출하는 함수 (희소 행렬곱 두 번).
+
+    결측(-9990, NaN) 격자는 제외하고 남은 가중치로 다시 정규화한다.
+
+    Args:
+        weights (csr_matrix): (관측소 수, ny*nx) 가중치.
+        grids (np.ndarray): (ny, nx) 또는 (time, ny, nx) 배열.
+
+    Returns:
+        np.ndarray: (관측소 수,) 또는 (time, 관측소 수) float64 배열.
+    """
+    grids = np.asarray(grids)
+    single = grids.ndim == 2
+    flat = grids.reshape(1 if single else grids.shape[0], -1)  # (time, ny*nx)
+
+    cols = weight_columns(weights)
+    out = _apply_columns(weights[:, cols], flat[:, cols])
+    return out[0] if single else out
+
+
+def weight_columns(weights):
+    """가중치가 0이 아닌 격자 열 (관측소 주변 격자만, 정렬됨)"""
+    return np.unique(weights.indices)
+
+
+def _apply_columns(weights, samples):
+    """
+    관측소 주변 격자 값 (time, 열 수) 에 가중치를 적용.
+
+    격자 전체가 아니라 가중치가 닿는 열만 float64 로 바꾸므로 저장된 정수값 격자를 그대로 넘겨도 된다.
+    """
+    samples = samples.T  # (열 수, time)
+    valid = samples != MISSING_VALUE
+    if np.issubdtype(samples.dtype, np.floating):
+        valid &= np.isfinite(samples)
+    values = np.where(valid, samples, 0).astype(np.float64)
+
+    num = weights @ values
+    den = weights @ valid.astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(den > 0, num / den, np.nan).T
+
+
+def extract_files(paths, weights, batch=32):
+    """
+    표준격자 파일 목록에서 관측소 값을 추출 (물리 단위, (파일 수, 관측소 수)).
+
+    파일마다 memmap 에서 관측소 주변 격자만 정수값 그대로 읽고 (격자 전체를 읽거나 변환하지 않음),
+    batch 개 파일씩 묶어 한 번의 행렬곱으로 처리한 뒤 마지막에 data_scale 로 나눈다.
+    """
+    cols = weight_columns(weights)
+    sub_weights = weights[:, cols]
+    out = np.full((len(paths), weights.shape[0]), np.nan)
+    for start in range(0, len(paths), batch):
+        chunk = paths[start:start + batch]
+        samples, scales = [], []
+        for path in chunk:
+            grid = open_sgd_data(path)
+            samples.append(grid['data'].reshape(-1)[cols])
+            scales.append(grid['data_scale'])
+        out[start:start + len(chunk)] = _apply_columns(sub_weights, np.stack(samples)) / np.array(scales)[:, None]
+    return out
+
+
+def station_weights_for_file(path, lons, lats, method="bilinear", cache_dir=CACHE_DIRECTORY, **kwargs):
+    """파일 속성으로 격자 정의를 읽어 캐시된 가중치를 반환"""
+    geom = read_geometry(path)
+    return load_or_build_weights(geom, lons, lats, method, cache_dir=cache_dir, **kwargs)
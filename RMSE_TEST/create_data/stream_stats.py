@@ -0,0 +1,222 @@
+import math
+
+import numpy as np
+
+# 워커에서 파일별로 계산하고 부모 프로세스에서 O(bins) 로 병합하는 요약 통계.
+# 모든 클래스는 add(values) 로 값을 누적하고 merge(other) 로 다른 워커 결과를 합친다.
+
+
+class FixedHistogram:
+    """고정 구간 히스토그램 (범위를 벗어난 값은 underflow/overflow 로 따로 센다)"""
+
+    def __init__(self, lo, hi, bins):
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.bins = int(bins)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @classmethod
+    def with_width(cls, lo, hi, width):
+        """구간 폭으로 생성 (예: 0.1 단위로 저장된 자료는 width=0.1 이면 손실 없음)"""
+        return cls(lo, hi, int(round((hi - lo) / width)))
+
+    @property
+    def edges(self):
+        return np.linspace(self.lo, self.hi, self.bins + 1)
+
+    @property
+    def centers(self):
+        edges = self.edges
+        return (edges[:-1] + edges[1:]) / 2
+
+    def add(self, values):
+        values = np.asarray(values).ravel()
+        self.underflow += int(np.count_nonzero(values < self.lo))
+        self.overflow += int(np.count_nonzero(values > self.hi))
+        idx = np.floor((values - self.lo) * (self.bins / (self.hi - self.lo))).astype(np.int64)
+        inside = (values >= self.lo) & (values <= self.hi)
+        idx = np.clip(idx[inside], 0, self.bins - 1)  # hi 와 같은 값은 마지막 구간
+        self.counts += np.bincount(idx, minlength=self.bins)
+        return self
+
+    def merge(self, other):
+        if (self.lo, self.hi, self.bins) != (other.lo, other.hi, other.bins):
+            raise ValueError("구간이 다른 히스토그램은 병합할 수 없음")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    def nonempty_range(self):
+        """값이 들어있는 구간의 (최소, 최대) 가장자리"""
+        nz = np.flatnonzero(self.counts)
+        if nz.size == 0:
+            return None
+        edges = self.edges
+        return edges[nz[0]], edges[nz[-1] + 1]
+
+    def quantile(self, q):
+        """구간 내 선형 보간으로 분위수 추정"""
+        total = self.counts.sum()
+        if total == 0:
+            return math.nan
+        cum = np.cumsum(self.counts)
+        target = np.clip(np.asarray(q, dtype=float), 0, 1) * total
+        i = np.searchsorted(cum, target, side="left").clip(0, self.bins - 1)
+        prev = np.where(i > 0, cum[i - 1], 0)
+        frac = np.where(self.counts[i] > 0, (target - prev) / np.maximum(self.counts[i], 1), 0)
+        width = (self.hi - self.lo) / self.bins
+        return self.lo + (i + frac) * width
+
+
+class Welford:
+    """평균/분산 누적기 (배치 단위 Chan 병렬 결합)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _combine(self, n_b, mean_b, m2_b):
+        n_a = self.count
+        n = n_a + n_b
+        if n_b == 0:
+            return
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * n_a * n_b / n
+        self.count = n
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return self
+        mean_b = float(values.mean())
+        self._combine(values.size, mean_b, float(np.square(values - mean_b).sum()))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        return self
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.count else math.nan
+
+
+class KLLSketch:
+    """
+    KLL 분위수 스케치 (Karnin-Lang-Liberty).
+
+    level h 의 원소는 가중치 2**h 를 가진다. 각 level 의 용량을 넘으면 정렬 후
+    하나 건너 하나씩 위 level 로 올려 크기를 절반으로 줄인다. 메모리는 O(k),
+    병합 가능하며 순위 오차는 대략 1/k 수준이다.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = int(k)
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.size > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                items = np.sort(items)
+                keep_odd = items.size % 2
+                rest, pairs = items[:keep_odd], items[keep_odd:]
+                promoted = pairs[self._rng.integers(0, 2)::2]
+                self.levels[level] = rest
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return self
+        self.count += values.size
+        # 큰 배치는 용량 단위로 잘라 넣어 level 0 이 과도하게 커지지 않게 함
+        step = max(self.k * 8, 1)
+        for start in range(0, values.size, step):
+            self.levels[0] = np.concatenate([self.levels[0], values[start:start + step]])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        if self.count == 0:
+            return math.nan
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(lv.size, 2 ** h, dtype=np.int64) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cum = items[order], np.cumsum(weights[order])
+        target = np.clip(np.asarray(q, dtype=float), 0, 1) * cum[-1]
+        return items[np.searchsorted(cum, target, side="left").clip(0, items.size - 1)]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_rng'] = None  # 피클 크기 최소화 (병합 후 재생성)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._rng = np.random.default_rng()
+
+
+class StreamSummary:
+    """히스토그램 + Welford + KLL 을 한 번에 누적하는 요약"""
+
+    def __init__(self, lo, hi, width, k=200):
+        self.hist = FixedHistogram.with_width(lo, hi, width)
+        self.moments = Welford()
+        self.sketch = KLLSketch(k)
+
+    def add(self, values):
+        self.hist.add(values)
+        self.moments.add(values)
+        self.sketch.add(values)
+        return self
+
+    def merge(self, other):
+        self.hist.merge(other.hist)
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        return self
+
+
+def merge_all(summaries):
+    """요약 목록을 하나로 병합 (None 은 건너뜀)"""
+    merged = None
+    for summary in summaries:
+        if summary is None:
+            continue
+        merged = summary if merged is None else merged.merge(summary)
+    return merged
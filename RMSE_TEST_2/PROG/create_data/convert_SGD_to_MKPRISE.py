@@ -0,0 +1,216 @@
+import os
+import sys
+import hashlib
+from datetime import datetime
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
+import pandas as pd
+import netCDF4 as nc
+from scipy.spatial import cKDTree
+
+# ✅ 공용 모듈(RMSE_TEST/create_data) 경로 추가
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../RMSE_TEST/create_data"))
+
+from sgd_grid import read_geometry, geometry_hash, lonlat_grid
+from sgd_manifest import refresh_manifest, query_files
+from sgd_mmap import open_static_field
+from sgd_packed import PackedGrid
+from sgd_trace import trace_run, traced, span, count, flush
+
+# ✅ 경로 설정
+ROOT_DIRECTORY = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA"
+MKPRISM_SAVE_DIR = "/home/papalio/test_research/RMSE_TEST_2/DATA/MKPRISE_TA"
+
+# ✅ 지형고도 자료 (SSP_*.bin 형식: float64, ny × nx)
+STATIC_DIR = "/home/papalio/test_research/python_edu/class0/example_0913"
+ELEVATION_FILE = os.path.join(STATIC_DIR, "SSP_Orography.bin")
+ELEVATION_LAT_FILE = os.path.join(STATIC_DIR, "SSP_LAT.bin")
+ELEVATION_LON_FILE = os.path.join(STATIC_DIR, "SSP_LON.bin")
+ELEVATION_SHAPE = (601, 751)
+
+# ✅ 보정 설정
+LAPSE_RATE = -6.5            # 기온감률 (°C/km)
+REFERENCE_HEIGHT = 500.0     # 표준격자 기온의 기준 고도 (m)
+MISSING_VALUE = -9990
+
+# ✅ 출력 설정
+BLOCK_DAYS = 8                     # 한 번에 읽어 보정할 시간 수
+CHUNK_SHAPE = (8, 256, 256)        # NetCDF 청크 (time, ny, nx)
+COMPLEVEL = 4
+LEAST_SIGNIFICANT_DIGIT = 2        # 0.01°C 까지 보존 (압축률 향상)
+TIME_UNITS = "hours since 2000-01-01 00:00:00"
+
+
+def elevation_on_sgd_grid(geom, cache_dir=MKPRISM_SAVE_DIR):
+    """
+    지형고도를 표준격자에 최근접 방식으로 옮긴 (ny, nx) float32 배열을 반환.
+
+    결과는 격자 정의 해시와 지형고도/위경도 파일(경로, 크기, mtime)로 캐시되므로
+    같은 입력이면 최초 1회만 계산하고, 지형 자료가 바뀌면 다시 계산한다.
+    """
+    sources = "|".join(_file_key(path) for path in (ELEVATION_FILE, ELEVATION_LAT_FILE, ELEVATION_LON_FILE))
+    key = hashlib.sha1(f"{geometry_hash(geom)}|{sources}".encode()).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"elevation_{key}.npy")
+    if os.path.exists(cache_path):
+        return np.load(cache_path)
+
+    orog = open_static_field(ELEVATION_FILE, ELEVATION_SHAPE)
+    src_lat = open_static_field(ELEVATION_LAT_FILE, ELEVATION_SHAPE)
+    src_lon = open_static_field(ELEVATION_LON_FILE, ELEVATION_SHAPE)
+
+    lon, lat = lonlat_grid(geom)
+
+    # 경도 간격을 위도에 맞게 줄여 거리 왜곡 보정
+    coslat = np.cos(np.radians(geom['olat']))
+    tree = cKDTree(np.column_stack([src_lon.ravel() * coslat, src_lat.ravel()]))
+    _, idx = tree.query(np.column_stack([lon.ravel() * coslat, lat.ravel()]))
+    elevation = orog.ravel()[idx].reshape(geom['ny'], geom['nx']).astype(np.float32)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(cache_path, elevation)
+    return elevation
+
+
+def _file_key(path):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def lapse_rate_correction(elevation):
+    """고도 보정량 (°C, ny × nx). 모든 시간에 같은 값을 더한다"""
+    return (LAPSE_RATE * (elevation - REFERENCE_HEIGHT) / 1000.0).astype(np.float32)
+
+
+@traced("decode")
+def read_block(paths, shape, failed):
+    """
+    파일 묶음을 (time, ny, nx) float32 °C 배열로 읽음 (-9990 → NaN).
+
+    읽을 수 없는 파일(잘림 등)은 그 날을 NaN 으로 두고 failed 에 (경로, 오류) 를 기록한다.
+    """
+    block = np.empty((len(paths),) + tuple(shape), dtype=np.float32)
+    for k, path in enumerate(paths):
+        try:
+            PackedGrid.open(path).physical(out=block[k])   # memmap 정수값, 물리 단위 변환은 block 에 바로 씀
+        except Exception as e:
+            block[k] = np.nan
+            failed.append((path, str(e)))
+            count("files_failed")
+    return block
+
+
+def create_monthly_file(save_path, times, ny, nx):
+    """월 단위 출력 파일 생성 (time 청크 + zlib 압축)"""
+    dataset = nc.Dataset(save_path, "w", format="NETCDF4")
+    dataset.createDimension("time", None)
+    dataset.createDimension("ny", ny)
+    dataset.createDimension("nx", nx)
+
+    time_var = dataset.createVariable("time", "f8", ("time",))
+    time_var.units = TIME_UNITS
+    time_var[:] = nc.date2num(list(times), TIME_UNITS)
+
+    chunks = (min(CHUNK_SHAPE[0], len(times)), min(CHUNK_SHAPE[1], ny), min(CHUNK_SHAPE[2], nx))
+    temperature = dataset.createVariable(
+        "temperature", "f4", ("time", "ny", "nx"), zlib=True, complevel=COMPLEVEL, shuffle=True,
+        chunksizes=chunks, least_significant_digit=LEAST_SIGNIFICANT_DIGIT, fill_value=np.float32(np.nan))
+    temperature.units = "C"
+    temperature.lapse_rate = LAPSE_RATE
+    temperature.reference_height = REFERENCE_HEIGHT
+    return dataset
+
+
+_correction = None
+
+
+def _init_worker(correction):
+    """워커마다 보정량 배열을 한 번만 전달받음 (작업마다 피클하지 않음)"""
+    global _correction
+    _correction = correction
+
+
+def convert_month(task):
+    """한 달 치 SGD 파일을 보정해 mkprism_ta_{YYYYMM}.nc 하나로 저장. (저장 경로, 읽기 실패 목록) 반환"""
+    month, times, paths = task
+    failed = []
+    correction = _correction
+    ny, nx = correction.shape
+    save_path = os.path.join(MKPRISM_SAVE_DIR, f"mkprism_ta_{month}.nc")
+    tmp_path = save_path + ".part"
+
+    try:
+        with create_monthly_file(tmp_path, times, ny, nx) as dataset:
+            temperature = dataset.variables["temperature"]
+            for start in range(0, len(paths), BLOCK_DAYS):
+                block = read_block(paths[start:start + BLOCK_DAYS], (ny, nx), failed)
+                with span("lapse_rate_correction", "compute"):
+                    block += correction  # (time, ny, nx) + (ny, nx) 브로드캐스트
+                with span("write_block", "write", times=len(block)):
+                    temperature[start:start + len(block)] = block
+        os.replace(tmp_path, save_path)
+        count("bytes_written", os.path.getsize(save_path))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        flush()   # Pool 워커의 추적 기록을 월 작업마다 내보냄
+    return save_path, failed
+
+
+def build_tasks(start_date, end_date):
+    """인덱스에서 일 자료(00시) 파일을 찾아 월 단위 작업으로 묶음"""
+    refresh_manifest(ROOT_DIRECTORY)
+    files = query_files(ROOT_DIRECTORY, var="ta", start=start_date, end=end_date)
+    files = files[files['tm'].str.endswith("0000")]
+    files = files.assign(month=files['tm'].str[:6],
+                         time=pd.to_datetime(files['tm'], format="%Y%m%d%H%M"))
+
+    tasks = []
+    for month, group in files.groupby('month', sort=True):
+        tasks.append((month, group['time'].dt.to_pydatetime(), group['path'].tolist()))
+    return tasks
+
+
+def first_geometry(tasks):
+    """격자 정의를 읽을 수 있는 첫 번째 파일의 격자 정의 (없으면 None)"""
+    for _, _, paths in tasks:
+        for path in paths:
+            try:
+                return read_geometry(path)
+            except Exception:
+                continue
+    return None
+
+
+@trace_run("convert_SGD_to_MKPRISE")
+def main():
+    start_date = datetime(2020, 1, 1)
+    end_date = datetime(2021, 12, 31)
+    os.makedirs(MKPRISM_SAVE_DIR, exist_ok=True)
+
+    tasks = build_tasks(start_date, end_date)
+    if not tasks:
+        print("🚨 변환할 SGD 파일이 없습니다.")
+        return
+
+    # ✅ 격자 정의와 지형 보정량은 한 번만 계산
+    geom = first_geometry(tasks)
+    if geom is None:
+        print("🚨 격자 정의를 읽을 수 있는 SGD 파일이 없습니다.")
+        return
+    correction = lapse_rate_correction(elevation_on_sgd_grid(geom))
+
+    num_workers = min(cpu_count(), 4, len(tasks))  # 작업당 메모리 ≈ BLOCK_DAYS × 16MB
+    print(f"🚀 월 단위 변환 시작 ({len(tasks)}개월, 프로세스 {num_workers}개)")
+
+    with Pool(num_workers, initializer=_init_worker, initargs=(correction,)) as pool:
+        for save_path, failed in pool.imap_unordered(convert_month, tasks):
+            print(f"📁 저장 완료: {save_path}")
+            for path, error in failed:
+                print(f"  ⚠ 읽기 실패 (NaN 으로 저장): {path}: {error}")
+
+    print("🎉 모든 변환 완료!")
+
+
+if __name__ == "__main__":
+    main()
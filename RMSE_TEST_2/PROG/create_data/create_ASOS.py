@@ -0,0 +1,50 @@
+import datetime
+import glob
+import os
+import sys
+
+# ✅ data_api.py가 있는 경로 추가
+sys.path.append("/home/papalio/test_research/python_edu/test_2024/test_2024/DATA")
+
+# ✅ 공용 모듈(RMSE_TEST/create_data) 경로 추가
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../RMSE_TEST/create_data"))
+
+from obs_ingest import RAW_DIRECTORY, download_raw, download_stations, ingest_files
+from sgd_trace import trace_run
+
+NETWORK = "asos"
+
+@trace_run("create_ASOS")
+def main():
+    # 기본 설정
+    start_date = datetime.datetime(2020, 1, 1)
+    end_date = datetime.datetime(2021, 12, 31)
+
+    concurrency = 8  # 동시 다운로드 수
+    local_dir = None   # 로컬 샘플/내려받은 파일 폴더 (지정하면 다운로드 없이 폴더의 *.txt, *.csv 만 적재)
+
+    if local_dir:
+        paths = sorted(glob.glob(os.path.join(local_dir, "**", "*.txt"), recursive=True)
+                       + glob.glob(os.path.join(local_dir, "**", "*.csv"), recursive=True))
+        print(f"로컬 파일 {len(paths)}개 적재")
+    else:
+        # ✅ data_api.py에서 key 변수 가져오기
+        from data_api import key2
+
+        # 지점 정보 (위경도, 지점명) 갱신
+        stations = download_stations(NETWORK, key2)
+        print(f"{NETWORK.upper()} 지점 {len(stations[stations['network'] == NETWORK]):,}개")
+
+        # ASOS 시간자료 원본 다운로드 (비동기 + keep-alive 연결 풀, 이미 받은 구간은 건너뜀)
+        paths, failed = download_raw(NETWORK, start_date, end_date, key2, concurrency=concurrency)
+        if failed:
+            print(f"{len(failed)}개 구간 다운로드 실패 (다시 실행하면 빠진 구간만 받음)")
+
+    # 연/월 파티션 Parquet 저장소에 적재 (관측소·시간 순 정렬)
+    result = ingest_files(paths, NETWORK)
+    print(f"📁 {result['rows']:,}행 적재 완료 (원본: {RAW_DIRECTORY})")
+    for path, error in list(result['failed'].items())[:10]:
+        print(f"  ❌ {path}: {error}")
+
+if __name__ == "__main__":
+    main()
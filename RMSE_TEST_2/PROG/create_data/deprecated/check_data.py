@@ -2,8 +2,14 @@ import os
 import numpy as np
 import xarray as xr
 import matplotlib.pyplot as plt
-from multiprocessing import Pool, cpu_count
-import tqdm
+import sys
+
+# ✅ 공용 모듈(RMSE_TEST/create_data) 경로 추가
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../../RMSE_TEST/create_data"))
+
+from stream_stats import StreamSummary, merge_all
+from sgd_executor import bounded_map
+from sgd_packed import PackedGrid
 
 
 # ✅ 데이터 경로 설정
@@ -28,41 +34,51 @@ datasets = {
     "MKPRISE": mkprism_dir
 }
 
+# ✅ 히스토그램 구간 (자료 해상도 0.1°C 단위, 이상치 기준 ±100°C 와 동일한 범위)
+HIST_RANGE = (-100.0, 100.0)
+HIST_WIDTH = 0.1
+
 # ✅ 파일을 병렬로 처리하는 함수
 def process_file(args):
     name, data_path, nc_file = args
     file_path = os.path.join(data_path, nc_file)
     
     try:
+        # ✅ 파일 크기 저장 (KB 단위 변환)
+        file_size = os.path.getsize(file_path) / 1024
+
+        if name == "SGD":
+            # ✅ SGD 는 저장된 정수값 그대로 검사 (결측/이상치 비교는 정수 기준값으로, float 변환 없음)
+            grid = PackedGrid.open(file_path)
+            missing_count = grid.count_missing()
+            outlier_count = grid.count("<", HIST_RANGE[0]) + grid.count(">", HIST_RANGE[1])
+
+            # ✅ 요약에 넣을 유효값만 °C 로 변환
+            summary = StreamSummary(*HIST_RANGE, HIST_WIDTH).add(grid.valid_values())
+            return nc_file, file_size, missing_count, outlier_count, summary
+
         ds = xr.open_dataset(file_path)
 
         # ✅ 변수 선택 (OBS & MK-PRISM은 `temperature` 사용)
-        var_name = "temperature" if name in ["OBS", "MKPRISE"] else "data"
+        var_name = "temperature"
         if var_name not in ds:
             return None  # 데이터 변수 없으면 스킵
 
-        # ✅ 데이터 로드 및 변환
-        data_values = ds[var_name].values.astype(np.float32).flatten()
-
-        # ✅ SGD 데이터 스케일 변환 (스케일 적용 필요)
-        if name == "SGD":
-            scale_factor = ds[var_name].attrs.get("data_scale", 1.0)
-            data_values /= scale_factor
-
-        # ✅ MK-PRISM 데이터 `float64 → float32` 변환
-        if name == "MKPRISE":
-            data_values = data_values.astype(np.float32)
+        # ✅ 이미 float32 이면 복사 없이 사용
+        data_values = np.asarray(ds[var_name].values, dtype=np.float32).ravel()
 
         # ✅ 결측값 처리 (-9990을 결측치로 가정)
-        missing_count = np.sum(data_values == -9990)
+        missing_mask = data_values == -9990
+        missing_count = np.sum(missing_mask)
 
         # ✅ 이상치 (-100°C 이하, 100°C 이상 값) 개수 저장
         outlier_count = np.sum((data_values < -100) | (data_values > 100))
 
-        # ✅ 파일 크기 저장 (KB 단위 변환)
-        file_size = os.path.getsize(file_path) / 1024
+        # ✅ 값 전체 대신 병합 가능한 요약(히스토그램, 평균/분산, 분위수)만 반환
+        valid_values = data_values[~missing_mask & ~np.isnan(data_values)]
+        summary = StreamSummary(*HIST_RANGE, HIST_WIDTH).add(valid_values)
 
-        return file_size, missing_count, outlier_count, data_values.tolist()
+        return nc_file, file_size, missing_count, outlier_count, summary
     
     except Exception as e:
         print(f"❌ {nc_file} 처리 중 오류 발생: {e}")
@@ -79,21 +95,25 @@ for name, data_path in datasets.items():
         print(f"🚨 {name} 데이터 없음! ({data_path})")
         continue
 
-    # ✅ 병렬 처리 설정
-    num_workers = min(4, cpu_count())  # 최대 8개 프로세스 사용
+    # ✅ 병렬 처리 (제출 창 제한 + 배치 처리, 프로세스 수는 CPU/I/O 측정으로 자동 조정)
     pool_args = [(name, data_path, nc_file) for nc_file in nc_files]
+    results = [r for r in bounded_map(process_file, pool_args, desc=name) if r is not None]
 
-    with Pool(processes=num_workers) as pool:
-        results = pool.map(process_file, pool_args)
-
-    # ✅ 결과 필터링 (None 값 제거)
-    results = [r for r in results if r is not None]
+    # ✅ 완료 순서로 들어오므로 파일명 순으로 정렬 (그래프의 파일 인덱스 유지)
+    results.sort(key=lambda r: r[0])
+    if not results:
+        print(f"🚨 {name} 데이터 처리 결과 없음!")
+        continue
 
     # ✅ 데이터 크기, 결측치, 이상치 및 전체 데이터 추출
-    file_sizes = [r[0] for r in results]
-    missing_counts = [r[1] for r in results]
-    outlier_counts = [r[2] for r in results]
-    all_values = np.concatenate([r[3] for r in results])
+    file_sizes = [r[1] for r in results]
+    missing_counts = [r[2] for r in results]
+    outlier_counts = [r[3] for r in results]
+    summary = merge_all(r[4] for r in results)
+    moments = summary.moments
+    p01, p50, p99 = summary.sketch.quantile([0.01, 0.5, 0.99])
+    print(f"📈 {name} 통계: 개수 {moments.count:,}, 평균 {moments.mean:.2f}, 표준편차 {moments.std:.2f}, "
+          f"최소 {moments.min:.2f}, 최대 {moments.max:.2f}, 1%/50%/99% {p01:.2f}/{p50:.2f}/{p99:.2f}")
 
     # ✅ 크기 분포 시각화
     plt.figure(figsize=(10, 5))
@@ -122,8 +142,12 @@ for name, data_path in datasets.items():
     print(f"📊 {name} 데이터 결측치 및 이상치 분포 저장 완료: {data_plot_path}")
 
     # ✅ 전체 데이터 값의 분포 (히스토그램)
+    # 0.1 단위 세부 구간 빈도를 가중치로 다시 100개 구간으로 묶음 (±100°C 범위 안의 값)
+    hist = summary.hist
+    value_range = hist.nonempty_range()
     plt.figure(figsize=(10, 5))
-    plt.hist(all_values, bins=100, color='skyblue', edgecolor='black', alpha=0.7)
+    plt.hist(hist.centers, bins=100, range=value_range, weights=hist.counts,
+             color='skyblue', edgecolor='black', alpha=0.7)
     plt.xlabel("온도 값 (°C)")
     plt.ylabel("빈도수")
     plt.title(f"{name} 데이터 온도 분포")
@@ -1,11 +1,17 @@
 import xarray as xr
 import numpy as np
 import os
+import sys
 import pandas as pd
 from scipy.spatial import cKDTree
 from datetime import datetime, timedelta
 from multiprocessing import Pool, cpu_count
 
+# 공용 모듈(RMSE_TEST/create_data) 경로 추가
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../../RMSE_TEST/create_data"))
+
+from sgd_packed import PackedGrid
+
 # ✅ 저장 경로 설정
 mkprism_save_dir = "/home/papalio/test_research/RMSE_TEST_2/DATA/MKPRISE_TA"
 os.makedirs(mkprism_save_dir, exist_ok=True)
@@ -38,11 +44,8 @@ def process_sgd_file(current_date):
 
     print(f"✅ 변환 중: {file_path}")
 
-    # ✅ NetCDF 파일 로드
-    ds = xr.open_dataset(file_path)
-    data = ds["data"].values.astype(np.float32)
-    data[data == -9990] = np.nan  # 결측값 처리
-    data /= ds["data"].attrs["data_scale"]  # 스케일 적용
+    # ✅ 저장된 정수값을 memmap 으로 열고 보정 직전에 한 번만 °C 로 변환 (결측 -9990 → NaN)
+    data = PackedGrid.open(file_path).physical()
 
     # ✅ MK-PRISM 보정 (고도 보정 적용)
     lapse_rate = -6.5  # 기온감률 (°C/km)
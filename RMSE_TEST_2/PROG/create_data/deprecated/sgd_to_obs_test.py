@@ -1,67 +1,36 @@
 import xarray as xr
 import numpy as np
 import os
-import pandas as pd
-from scipy.spatial import cKDTree
+import sys
+
+# 공용 모듈(RMSE_TEST/create_data) 경로 추가
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../../RMSE_TEST/create_data"))
+
+from station_extract import station_weights_for_file, extract_files
+from obs_ingest import load_stations
 
 # 저장 경로 설정
 obs_save_dir = "/home/papalio/test_research/RMSE_TEST_2/DATA/OBS_TA"
 os.makedirs(obs_save_dir, exist_ok=True)
 
-# 가상의 시도 중심 좌표 (17개 시도)
-stations = {
-    "서울": (37.5665, 126.9780),
-    "부산": (35.1796, 129.0756),
-    "대구": (35.8714, 128.6014),
-    "인천": (37.4563, 126.7052),
-    "광주": (35.1595, 126.8526),
-    "대전": (36.3504, 127.3845),
-    "울산": (35.5384, 129.3114),
-    "세종": (36.4802, 127.2890),
-    "경기": (37.4138, 127.5183),
-    "강원": (37.8228, 128.1555),
-    "충북": (36.6357, 127.4912),
-    "충남": (36.6588, 126.6728),
-    "전북": (35.7175, 127.1530),
-    "전남": (34.8679, 126.9910),
-    "경북": (36.5760, 128.5056),
-    "경남": (35.4606, 128.2132),
-    "제주": (33.4996, 126.5312)
-}
+# 관측소 목록 (create_ASOS.py 가 만든 지점 테이블: stn_id, stn_name, lat, lon)
+stations = load_stations("asos")
 
 # 파일 경로 설정
 file_path = "/home/papalio/test_research/python_edu/test_2024/test_2024/DATA/org/sgd/2020/01/01/sfc_grid_ta_202001010000.nc"
 
-# NetCDF 파일 로드
-ds = xr.open_dataset(file_path)
-data = ds["data"].values.astype(np.float32)
-data[data == -9990] = np.nan  # 결측값 처리
-data /= ds["data"].attrs["data_scale"]  # 스케일 적용
-
-# 격자 크기 및 위치 정보
-grid_size = ds.attrs["grid_size"]  # 0.5° 격자
-grid_nx = int(ds.attrs["grid_nx"])
-grid_ny = int(ds.attrs["grid_ny"])
-map_slon = ds.attrs["map_slon"]
-map_slat = ds.attrs["map_slat"]
-
-# 격자 중심점 좌표 생성
-lons = np.linspace(map_slon, map_slon + grid_size * (grid_nx - 1), grid_nx)
-lats = np.linspace(map_slat, map_slat + grid_size * (grid_ny - 1), grid_ny)
-lon_grid, lat_grid = np.meshgrid(lons, lats)
-
-# KDTree를 이용한 최근접 보간
-tree = cKDTree(list(zip(lat_grid.ravel(), lon_grid.ravel())))
-station_coords = np.array(list(stations.values()))
-_, idxs = tree.query(station_coords)
+# 관측소 좌표에 대한 보간 가중치 (격자 정의 + 관측소 목록 별로 한 번만 계산, 디스크 캐시)
+station_lats = stations["lat"].to_numpy(dtype=np.float64)
+station_lons = stations["lon"].to_numpy(dtype=np.float64)
+weights = station_weights_for_file(file_path, station_lons, station_lats, method="nearest")
 
-# 최근접 격자 데이터 추출
-obs_temps = data.ravel()[idxs]
+# 최근접 격자 데이터 추출 (파일 목록을 넘기면 여러 파일을 한 번에 처리)
+obs_temps = extract_files([file_path], weights)[0].astype(np.float32)
 
 # Xarray Dataset 생성 및 저장
 obs_ds = xr.Dataset(
     {"temperature": (["station"], obs_temps)},
-    coords={"station": list(stations.keys())}
+    coords={"station": stations["stn_id"].to_numpy(), "stn_name": ("station", stations["stn_name"].to_numpy())}
 )
 obs_ds.to_netcdf(os.path.join(obs_save_dir, "obs_ta_202001010000.nc"))
 
@@ -0,0 +1,214 @@
+import os
+from contextlib import contextmanager
+
+import numpy as np
+import xarray as xr
+import dask
+from dask.utils import parse_bytes
+
+# 기본 경로 (test_6.ipynb 와 같은 AR6 SSP 일자료)
+INPUT_DIRECTORY = "/home/papalio/test_research/python_edu/class0/example_0914"
+OUTPUT_DIRECTORY = "/home/papalio/test_research/python_edu/class0/example_0914/index"
+
+# AR6_{scenario}_5ENSMN_skorea_{VAR}_gridraw_daily_{year}.nc
+FILE_PATTERN = "AR6_{scenario}_5ENSMN_skorea_{var}_gridraw_daily_{year}.nc"
+
+# 입력 이름 → (파일 변수명, 단위 변환 함수)
+INPUTS = {
+    'ta': ("TA", None),                       # °C
+    'rhm': ("RHM", None),                     # %
+    'ws': ("WS", lambda v: v * 3.6),          # m/s → km/h
+}
+
+# 로컬 클러스터 기본값 (워커 수 × 메모리 한도가 전체 메모리 예산)
+CLUSTER_DEFAULTS = {'n_workers': 4, 'threads_per_worker': 2, 'memory_limit': "4GB"}
+
+# 청크 하나(입력 + 출력 블록)가 워커 메모리의 이 비율을 넘지 않도록 시간 청크를 정함
+CHUNK_MEMORY_FRACTION = 0.05
+
+# 등록된 지수: 이름 → {'func', 'inputs', 'months', 'attrs'}
+INDICES = {}
+
+
+def register_index(name, inputs, months=None, **attrs):
+    """
+    지수 계산식을 등록하는 데코레이터.
+
+    계산식은 numpy 블록(청크 하나)을 받아 같은 모양의 배열을 돌려주는 함수여야 한다.
+    dask 가 청크마다 한 번씩 호출하므로 중간값(1.8*T 등)은 청크 크기로만 만들어진다.
+
+    Args:
+        name (str): 지수 이름 (출력 변수명).
+        inputs (tuple): INPUTS 의 입력 이름 순서.
+        months (tuple): 계산할 월 (None 이면 전체 기간).
+        attrs: 출력 변수 속성 (units, long_name 등).
+    """
+    def decorator(func):
+        INDICES[name] = {'func': func, 'inputs': tuple(inputs), 'months': months, 'attrs': attrs}
+        return func
+    return decorator
+
+
+@register_index("THI", ("ta", "rhm"), long_name="temperature-humidity index")
+def get_THI(T, RH):
+    f = 1.8 * T
+    out = (1 - RH / 100) * (f - 26)
+    out *= -0.55
+    out += f
+    out += 32
+    return out
+
+
+@register_index("DI", ("ta", "rhm"), months=(6, 7, 8, 9), long_name="discomfort index")
+def get_DI(T, RH):
+    # 9/5 * T - 0.55 * (1 - RH/100) * (9/5 * T - 26) + 32 (THI 와 같은 식)
+    return get_THI(T, RH)
+
+
+@register_index("WCH", ("ta", "ws"), months=(1, 2, 11, 12), units="C", long_name="wind chill")
+def get_WCH(T, V):
+    v = V ** 0.16
+    out = 0.3965 * T
+    out -= 11.37
+    out *= v
+    out += 0.6215 * T
+    out += 13.12
+    return out
+
+
+def input_path(directory, scenario, var, year):
+    """입력 파일 경로"""
+    return os.path.join(directory, FILE_PATTERN.format(scenario=scenario, var=INPUTS[var][0], year=year))
+
+
+def time_chunk_for_budget(ny, nx, n_arrays, memory_limit, itemsize=8, fraction=CHUNK_MEMORY_FRACTION):
+    """워커 메모리 한도에 맞는 시간 청크 길이 (하루 한 장 = ny*nx)"""
+    limit = parse_bytes(memory_limit) if isinstance(memory_limit, str) else int(memory_limit)
+    per_step = ny * nx * itemsize * n_arrays
+    return max(1, int(limit * fraction // per_step))
+
+
+def open_inputs(directory, scenario, years, needed, time_chunk=None, memory_limit=CLUSTER_DEFAULTS['memory_limit']):
+    """
+    필요한 입력을 연도 파일 여러 개에 걸쳐 지연(lazy) 로드하고 시간/격자를 맞추는 함수.
+
+    Returns:
+        dict: 입력 이름 → DataArray (dask 배열, 단위 변환 포함, 공통 시간축).
+    """
+    arrays = {}
+    for var in needed:
+        paths = [input_path(directory, scenario, var, year) for year in years]
+        missing = [p for p in paths if not os.path.exists(p)]
+        if missing:
+            raise FileNotFoundError(f"입력 파일 없음: {missing[0]} 외 {len(missing) - 1}개")
+        ds = xr.open_mfdataset(paths, combine="by_coords", chunks={}, parallel=True)
+        da = ds[INPUTS[var][0]]
+        convert = INPUTS[var][1]
+        arrays[var] = convert(da) if convert is not None else da
+
+    # 공통 시간축으로 맞춘 뒤 모든 입력에 같은 청크를 적용 (블록 단위 계산이 서로 맞물리도록)
+    aligned = xr.align(*arrays.values(), join="inner")
+    sample = aligned[0]
+    if time_chunk is None:
+        ny, nx = sample.shape[-2:]
+        time_chunk = time_chunk_for_budget(ny, nx, len(aligned) + 1, memory_limit)
+    chunks = {"time": time_chunk}
+    chunks.update({dim: -1 for dim in sample.dims if dim != "time"})
+    return {var: da.chunk(chunks) for var, da in zip(arrays, aligned)}
+
+
+def compute_index(name, inputs):
+    """
+    등록된 지수를 지연 계산 DataArray 로 만드는 함수 (실제 계산은 저장 시점).
+
+    계산식은 apply_ufunc 로 청크마다 한 번 호출되어 하나의 블록 연산으로 그래프에 들어간다.
+    """
+    spec = INDICES[name]
+    args = [inputs[var] for var in spec['inputs']]
+    if spec['months'] is not None:
+        keep = args[0]['time'].dt.month.isin(spec['months'])
+        args = [a.sel(time=keep) for a in args]
+
+    def kernel(*blocks):
+        return spec['func'](*blocks).astype(np.float32, copy=False)
+
+    out = xr.apply_ufunc(kernel, *args, dask="parallelized", output_dtypes=[np.float32], keep_attrs=False)
+    out.name = name
+    out.attrs.update(spec['attrs'])
+    return out
+
+
+@contextmanager
+def local_cluster(**kwargs):
+    """
+    로컬 dask 클러스터를 한 번만 띄워 여러 계산에 재사용하는 컨텍스트.
+
+    셀마다 Client 를 새로 만들지 않고, 워커 수/스레드/메모리 한도를 한 곳에서 설정한다.
+    """
+    from dask.distributed import Client, LocalCluster
+
+    options = dict(CLUSTER_DEFAULTS)
+    options.update(kwargs)
+    with LocalCluster(**options) as cluster, Client(cluster) as client:
+        print(client)
+        yield client
+
+
+def output_path(directory, name, scenario, year):
+    """지수 출력 파일 경로: {index}_{scenario}_{year}.nc"""
+    return os.path.join(directory, f"{name}_{scenario}_{year}.nc")
+
+
+def run_indices(scenarios, years, names=None, input_dir=INPUT_DIRECTORY, output_dir=OUTPUT_DIRECTORY,
+                time_chunk=None, memory_limit=CLUSTER_DEFAULTS['memory_limit'], overwrite=False):
+    """
+    시나리오 × 연도별로 지수를 계산해 연도 단위 파일로 저장하는 함수.
+
+    한 연도의 모든 지수는 한 번의 dask.compute 로 함께 계산되어 입력을 한 번만 읽는다.
+    연도 단위로 저장하므로 메모리 사용량은 전체 기간과 무관하게 청크 크기로 제한되고,
+    이미 저장된 연도는 건너뛰어 중단 후 다시 실행할 수 있다.
+
+    Returns:
+        list: 새로 저장한 파일 경로.
+    """
+    names = list(names or INDICES)
+    needed = sorted({var for name in names for var in INDICES[name]['inputs']})
+    os.makedirs(output_dir, exist_ok=True)
+
+    written = []
+    for scenario in scenarios:
+        for year in years:
+            targets = {name: output_path(output_dir, name, scenario, year) for name in names}
+            todo = [name for name, path in targets.items() if overwrite or not os.path.exists(path)]
+            if not todo:
+                continue
+
+            inputs = open_inputs(input_dir, scenario, [year], needed, time_chunk, memory_limit)
+            writes = []
+            for name in todo:
+                encoding = {name: {'zlib': True, 'complevel': 4, 'dtype': "float32"}}
+                writes.append(compute_index(name, inputs).to_netcdf(
+                    targets[name] + ".part", encoding=encoding, compute=False))
+            dask.compute(*writes)
+
+            for name in todo:
+                os.replace(targets[name] + ".part", targets[name])
+                written.append(targets[name])
+            print(f"📁 {scenario} {year}: {', '.join(todo)} 저장 완료")
+    return written
+
+
+def main():
+    print("\n=== 기후 지수(THI, DI, WCH) 계산 ===")
+    scenarios = (input("시나리오를 입력하세요 (쉼표 구분) [기본값: SSP585]: ").strip() or "SSP585").split(",")
+    start_year = int(input("시작 연도를 입력하세요 [기본값: 2021]: ").strip() or 2021)
+    end_year = int(input("종료 연도를 입력하세요 [기본값: 2100]: ").strip() or 2100)
+    n_workers = int(input(f"워커 수를 입력하세요 [기본값: {CLUSTER_DEFAULTS['n_workers']}]: ").strip()
+                    or CLUSTER_DEFAULTS['n_workers'])
+
+    with local_cluster(n_workers=n_workers):
+        run_indices([s.strip() for s in scenarios], range(start_year, end_year + 1))
+
+
+if __name__ == "__main__":
+    main()